@@ -6,9 +6,14 @@ __version__ = "0.3.0"
 
 from cyclops.core import (
     Agent,
+    Session,
     AgentConfig,
     AgentHooks,
     AgentResponse,
+    CompletionCache,
+    ContextWindow,
+    InMemoryCompletionCache,
+    SQLiteCompletionCache,
     Message,
     Memory,
     InMemoryStorage,
@@ -16,6 +21,8 @@ from cyclops.core import (
 )
 from cyclops.toolkit import (
     BaseTool,
+    TTLCache,
+    ToolTimeoutError,
     tool,
     ToolResult,
     ToolRegistry,
@@ -33,14 +40,21 @@ from cyclops.observability import TelemetryHooks
 
 __all__ = [
     "Agent",
+    "Session",
     "AgentConfig",
     "AgentHooks",
     "AgentResponse",
+    "CompletionCache",
+    "ContextWindow",
+    "InMemoryCompletionCache",
+    "SQLiteCompletionCache",
     "Message",
     "Memory",
     "InMemoryStorage",
     "FileStorage",
     "BaseTool",
+    "TTLCache",
+    "ToolTimeoutError",
     "tool",
     "ToolResult",
     "ToolRegistry",
@@ -1,17 +1,62 @@
 """Core agent framework components"""
 
-from cyclops.core.agent import Agent
+from cyclops.core.agent import Agent, Session
+from cyclops.core.cache import (
+    CompletionCache,
+    InMemoryCompletionCache,
+    SQLiteCompletionCache,
+)
+from cyclops.core.context import (
+    ContextWindow,
+    ContextStrategy,
+    DropOldest,
+    KeepToolPairs,
+    SummarizeOlder,
+)
+from cyclops.core.hedging import HedgingPolicy
 from cyclops.core.hooks import AgentHooks
-from cyclops.core.types import AgentConfig, Message, AgentResponse, ToolCall
+from cyclops.core.pricing import ModelPricing, get_pricing, register_pricing
+from cyclops.core.rate_limit import RateLimiter, shared_rate_limiter
+from cyclops.core.tool_mode import ToolModeCache
+from cyclops.core.batch import BatchRun
+from cyclops.core.types import (
+    AgentConfig,
+    Message,
+    AgentResponse,
+    IterationUsage,
+    ToolCall,
+    BatchItem,
+    BatchResponse,
+)
 from cyclops.core.memory import Memory, InMemoryStorage, FileStorage
 
 __all__ = [
     "Agent",
+    "Session",
     "AgentConfig",
     "AgentHooks",
+    "HedgingPolicy",
+    "CompletionCache",
+    "InMemoryCompletionCache",
+    "SQLiteCompletionCache",
+    "ContextWindow",
+    "ContextStrategy",
+    "DropOldest",
+    "KeepToolPairs",
+    "SummarizeOlder",
     "Message",
     "AgentResponse",
+    "IterationUsage",
     "ToolCall",
+    "BatchItem",
+    "BatchResponse",
+    "BatchRun",
+    "ModelPricing",
+    "get_pricing",
+    "register_pricing",
+    "RateLimiter",
+    "shared_rate_limiter",
+    "ToolModeCache",
     "Memory",
     "InMemoryStorage",
     "FileStorage",
@@ -2,43 +2,190 @@
 
 import asyncio
 import concurrent.futures
+import functools
 import inspect
 import json
-from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Type
+import threading
+import time
+import uuid
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Type,
+)
 
 import litellm
-
-from cyclops.core.types import AgentConfig, AgentResponse, ToolCall
+from pydantic import ValidationError
+
+from cyclops.core.batch import BatchRun
+from cyclops.core.cache import areplay_stream, completion_cache_key, replay_stream
+from cyclops.core.hedging import (
+    HedgingPolicy,
+    cancelled_hedge_response,
+    prefetched,
+    run_hedged,
+)
+from cyclops.core.history import ConversationHistory
+from cyclops.core.pricing import get_pricing
+from cyclops.core.prompt_cache import cached_token_counts, mark_messages, mark_tools
+from cyclops.core.streaming import (
+    NaiveToolCallDetector,
+    StreamedToolCall,
+    StreamedTurn,
+    aclose_stream,
+    acoalesce,
+    close_stream,
+    coalesce,
+)
+from cyclops.core.single_flight import SingleFlight, is_deterministic
+from cyclops.core.structured import (
+    StructuredStream,
+    extraction_tool_for,
+    parse_structured,
+    response_format_for,
+    supports_json_schema,
+)
+from cyclops.core.tool_mode import (
+    ToolModeCache,
+    is_tool_unsupported_error,
+    supports_native_tools,
+)
+from cyclops.core.types import (
+    AgentConfig,
+    AgentResponse,
+    BatchItem,
+    BatchResponse,
+    IterationUsage,
+    ToolCall,
+)
+from cyclops.toolkit.tool import BaseTool, Tool, ToolTimeoutError
+from cyclops.utils.loop import run_sync
 
 _MAX_ITER_MSG = "Reached maximum tool call iterations."
 _DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant."
-_TOOL_UNSUPPORTED_KEYWORDS = ("tool", "function", "unsupported")
+_SCHEMA_CACHE_SIZE = 128
+_TIMEOUT_ERRORS = (TimeoutError, asyncio.TimeoutError, concurrent.futures.TimeoutError)
+
+
+def _tool_to_openai_format(tool) -> Dict[str, Any]:
+    """Convert a Tool to OpenAI function-calling format."""
+    if isinstance(tool, BaseTool):
+        return tool.openai_schema
+    return {
+        "type": "function",
+        "function": {
+            "name": tool.name,
+            "description": tool.description,
+            "parameters": tool.definition.to_json_schema(),
+        },
+    }
+
+
+@functools.lru_cache(maxsize=_SCHEMA_CACHE_SIZE)
+def _tools_schema_for(tools: tuple) -> List[Dict[str, Any]]:
+    """OpenAI-format schema list for a tool set, shared by every Agent using it.
+
+    Keyed on tool identity, so a changed tool list is a cache miss. Callers
+    must treat the returned list as read-only.
+    """
+    return [_tool_to_openai_format(t) for t in tools]
+
+
+@functools.lru_cache(maxsize=_SCHEMA_CACHE_SIZE)
+def _tools_prompt_for(tools: tuple) -> str:
+    """Naive-mode tools prompt for a tool set, cached like _tools_schema_for."""
+    if not tools:
+        return ""
+
+    lines = ["\n\nYou have access to the following tools:\n"]
+    for tool in tools:
+        lines.append(f"- {tool.name}: {tool.description}")
+        if tool.definition.parameters:
+            lines.append("  Parameters:")
+            for param in tool.definition.parameters.values():
+                lines.append(
+                    f"    - {param.name} ({param.type}): {param.description or 'No description'}"
+                )
+    lines.append(
+        '\nTo use a tool, respond with JSON: {"tool": "tool_name", "args": {...}}'
+    )
+    lines.append(
+        "To use several tools at once, respond with a JSON array of such objects: "
+        '[{"tool": "tool_a", "args": {...}}, {"tool": "tool_b", "args": {...}}]'
+    )
+    lines.append(
+        "After using tools, you'll receive the results and can provide a final answer.\n"
+    )
+    return "\n".join(lines)
+
+
+def _naive_tool_calls(calls: List[Dict[str, Any]]) -> List[StreamedToolCall]:
+    """Wrap parsed naive-mode calls so the native tool executors accept them."""
+    wrapped = []
+    for i, call in enumerate(calls):
+        tc = StreamedToolCall(f"naive_{i}", str(call["tool"]))
+        tc.function.arguments = json.dumps(call.get("args") or {})
+        wrapped.append(tc)
+    return wrapped
+
+
+def _start_thread(func) -> concurrent.futures.Future:
+    """Start ``func`` on a daemon thread and return a future for its result.
+
+    A running Python function cannot be interrupted, so a caller that stops
+    waiting abandons the thread. Being a daemon it does not keep the
+    process alive.
+    """
+    future: concurrent.futures.Future = concurrent.futures.Future()
 
+    def target():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
 
-def _run_coroutine_sync(coro) -> Any:
-    """Run a coroutine synchronously without blocking an active event loop.
+    threading.Thread(target=target, daemon=True, name="cyclops-tool").start()
+    return future
 
-    Uses a ThreadPoolExecutor when a loop is active (e.g. Jupyter, nested async)
-    so the caller's loop is never blocked or re-entered.
-    """
-    try:
-        asyncio.get_running_loop()
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
-            return pool.submit(asyncio.run, coro).result()
-    except RuntimeError:
-        return asyncio.run(coro)
 
+def _call_in_thread(func, timeout: float) -> Any:
+    """Call ``func`` on a daemon thread, waiting at most ``timeout`` seconds.
+    On timeout the thread is abandoned and TimeoutError is raised."""
+    return _start_thread(func).result(timeout)
 
-def _is_tool_unsupported_error(e: Exception) -> bool:
-    error_str = str(e).lower()
-    return any(kw in error_str for kw in _TOOL_UNSUPPORTED_KEYWORDS)
+
+def _blocking_tool_call(tool, args: dict) -> Optional[functools.partial]:
+    """The call running a tool's body, if it blocks instead of awaiting."""
+    if isinstance(tool, Tool) and not tool._is_async:
+        return functools.partial(tool.func, **args)
+    if not inspect.iscoroutinefunction(tool.execute):
+        return functools.partial(tool.execute, **args)
+    return None
+
+
+def _timeout_error(error: Exception, tool_name: str, timeout: Optional[float]):
+    """Report a timeout caused by a time limit as ToolTimeoutError."""
+    if timeout is not None and isinstance(error, _TIMEOUT_ERRORS):
+        return ToolTimeoutError(tool_name, timeout)
+    return error
 
 
 class Agent:
     """LLM agent implementation"""
 
-    # Class-level cache for detected tool modes per model
-    _tool_mode_cache: Dict[str, str] = {}
+    # Tool modes learned from failed requests, shared by every Agent and
+    # persisted so other processes skip the failing request too
+    _tool_mode_cache: ToolModeCache = ToolModeCache.from_env()
+    # Identical in-flight completions, shared by every agent in the process
+    _single_flight: SingleFlight = SingleFlight()
 
     def __init__(
         self,
@@ -47,18 +194,65 @@ class Agent:
         memory=None,
     ):
         self.config = config
-        self._history: List[Dict[str, Any]] = []
         self.tools = tools or []
         self._tools_by_name: Dict[str, Any] = {t.name: t for t in self.tools}
+        self._tool_set_key: tuple = tuple(self.tools)
         self.memory = memory
+        self._sessions: Dict[str, "Session"] = {}
+        self._sessions_lock = threading.Lock()
+        self._marked_tools: Optional[tuple] = None  # (schema list, marked copy)
+        self._init_conversation_state()
+
+    def _init_conversation_state(self) -> None:
+        """Per-conversation state; everything else is shared by _fork()."""
+        self._history = ConversationHistory()
+        # (response, latency, from_cache) per completion while a
+        # run_with_response is in progress, else None
+        self._usage_log: Optional[List[tuple]] = None
+        # response_format sent with each tool-less completion of a structured run
+        self._response_format: Optional[Dict[str, Any]] = None
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    def _fork(self) -> "Agent":
+        """A fresh conversation sharing this agent's config, tools and caches."""
+        clone = object.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        clone._init_conversation_state()
+        return clone
 
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
 
+    def session(self, session_id: Optional[str] = None) -> "Session":
+        """Return the conversation ``session_id``, creating it on first use.
+
+        Sessions share this agent's config, tools and caches and own only
+        their history, so one Agent can serve many concurrent conversations.
+        Without an id a new session with a generated id is created.
+        """
+        with self._sessions_lock:
+            if session_id is None:
+                session_id = uuid.uuid4().hex
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = Session(self, session_id)
+            return session
+
+    def end_session(self, session_id: str) -> bool:
+        """Forget a session. Returns False if it did not exist."""
+        with self._sessions_lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    @property
+    def sessions(self) -> List[str]:
+        """Ids of the open sessions."""
+        return list(self._sessions)
+
     def reset(self) -> None:
         """Clear conversation history."""
-        self._history = []
+        self._history.clear()
 
     @property
     def messages(self) -> List[Dict[str, Any]]:
@@ -66,126 +260,194 @@ class Agent:
         return list(self._history)
 
     def run(self, input_message: str, response_model: Optional[Type] = None) -> Any:
-        """Run the agent synchronously. Returns str or Pydantic model instance."""
+        """Run the agent synchronously. Returns str or Pydantic model instance.
+
+        With ``response_model``, models that accept a JSON-schema
+        ``response_format`` are constrained to it on completions sent without
+        tools. Otherwise the final answer is parsed, tolerating prose around
+        the JSON, and if that fails it is extracted with one forced tool call.
+        """
         if self.config.hooks:
             self.config.hooks.on_run_start(input_message)
-        if not self.tools:
-            content = self._run_no_tools(input_message)
-        else:
-            tool_mode = self._get_tool_mode()
-            if tool_mode == "naive":
-                content = self._run_naive(input_message)
+        self._response_format = self._structured_format(response_model)
+        try:
+            if not self.tools:
+                content = self._run_no_tools(input_message)
             else:
-                try:
-                    content = self._run_with_tools(input_message)
-                except Exception as e:
-                    if not _is_tool_unsupported_error(e):
-                        raise
-                    self._tool_mode_cache[self.config.model] = "naive"
+                tool_mode = self._get_tool_mode()
+                if tool_mode == "naive":
                     content = self._run_naive(input_message)
+                else:
+                    try:
+                        content = self._run_with_tools(input_message)
+                    except Exception as e:
+                        if not self._fall_back_to_naive(e):
+                            raise
+                        content = self._run_naive(input_message)
+        finally:
+            self._response_format = None
 
         if self.config.hooks:
             self.config.hooks.on_run_end(content)
         if response_model is not None:
-            return response_model.model_validate_json(content)
+            return self._parse_structured(content, response_model)
         return content
 
     async def arun(
         self, input_message: str, response_model: Optional[Type] = None
     ) -> Any:
-        """Run the agent asynchronously. Returns str or Pydantic model instance."""
+        """Run the agent asynchronously. Returns str or Pydantic model instance.
+
+        ``response_model`` is handled as in run().
+        """
         if self.config.hooks:
             self.config.hooks.on_run_start(input_message)
-        if not self.tools:
-            content = await self._arun_no_tools(input_message)
-        else:
-            tool_mode = self._get_tool_mode()
-            if tool_mode == "naive":
-                content = await self._arun_naive(input_message)
+        self._response_format = self._structured_format(response_model)
+        try:
+            if not self.tools:
+                content = await self._arun_no_tools(input_message)
             else:
-                try:
-                    content = await self._arun_with_tools(input_message)
-                except Exception as e:
-                    if not _is_tool_unsupported_error(e):
-                        raise
-                    self._tool_mode_cache[self.config.model] = "naive"
+                tool_mode = self._get_tool_mode()
+                if tool_mode == "naive":
                     content = await self._arun_naive(input_message)
+                else:
+                    try:
+                        content = await self._arun_with_tools(input_message)
+                    except Exception as e:
+                        if not self._fall_back_to_naive(e):
+                            raise
+                        content = await self._arun_naive(input_message)
+        finally:
+            self._response_format = None
 
         if self.config.hooks:
             self.config.hooks.on_run_end(content)
         if response_model is not None:
-            return response_model.model_validate_json(content)
+            return await self._aparse_structured(content, response_model)
         return content
 
     def run_with_response(self, input_message: str) -> AgentResponse:
         """Run and return a full AgentResponse with cost/token metadata."""
+        cache_start = (self._cache_hits, self._cache_misses)
+        usage_log = self._usage_log = []
         if self.config.hooks:
             self.config.hooks.on_run_start(input_message)
-        if not self.tools:
-            content, raw_response = self._run_no_tools_tracked(input_message)
-            tool_calls: List[ToolCall] = []
-        else:
-            tool_mode = self._get_tool_mode()
-            if tool_mode == "naive":
-                content = self._run_naive(input_message)
-                raw_response = None
-                tool_calls = []
-            else:
-                try:
-                    content, raw_response, tool_calls = self._run_with_tools_tracked(
-                        input_message
-                    )
-                except Exception as e:
-                    if not _is_tool_unsupported_error(e):
-                        raise
-                    self._tool_mode_cache[self.config.model] = "naive"
-                    content = self._run_naive(input_message)
-                    raw_response = None
-                    tool_calls = []
+        try:
+            content, tool_calls = self._run_tracked(input_message)
+        finally:
+            self._usage_log = None
 
-        response = self._build_agent_response(content, raw_response, tool_calls)
+        response = self._build_agent_response(
+            content, tool_calls, usage_log, cache_start
+        )
         if self.config.hooks:
             self.config.hooks.on_run_end(response.content)
         return response
 
+    def _run_tracked(self, input_message: str):
+        """Returns (content, tool_calls) for run_with_response."""
+        if not self.tools:
+            content, _ = self._run_no_tools_tracked(input_message)
+            return content, []
+        if self._get_tool_mode() == "naive":
+            return self._run_naive(input_message), []
+        try:
+            content, _, tool_calls = self._run_with_tools_tracked(input_message)
+        except Exception as e:
+            if not self._fall_back_to_naive(e):
+                raise
+            return self._run_naive(input_message), []
+        return content, tool_calls
+
     async def arun_with_response(self, input_message: str) -> AgentResponse:
         """Run async and return a full AgentResponse with cost/token metadata."""
+        cache_start = (self._cache_hits, self._cache_misses)
+        usage_log = self._usage_log = []
         if self.config.hooks:
             self.config.hooks.on_run_start(input_message)
-        if not self.tools:
-            content, raw_response = await self._arun_no_tools_tracked(input_message)
-            tool_calls: List[ToolCall] = []
-        else:
-            tool_mode = self._get_tool_mode()
-            if tool_mode == "naive":
-                content = await self._arun_naive(input_message)
-                raw_response = None
-                tool_calls = []
-            else:
-                try:
-                    (
-                        content,
-                        raw_response,
-                        tool_calls,
-                    ) = await self._arun_with_tools_tracked(input_message)
-                except Exception as e:
-                    if not _is_tool_unsupported_error(e):
-                        raise
-                    self._tool_mode_cache[self.config.model] = "naive"
-                    content = await self._arun_naive(input_message)
-                    raw_response = None
-                    tool_calls = []
+        try:
+            content, tool_calls = await self._arun_tracked(input_message)
+        finally:
+            self._usage_log = None
 
-        response = self._build_agent_response(content, raw_response, tool_calls)
+        response = self._build_agent_response(
+            content, tool_calls, usage_log, cache_start
+        )
         if self.config.hooks:
             self.config.hooks.on_run_end(response.content)
         return response
 
+    async def _arun_tracked(self, input_message: str):
+        """Returns (content, tool_calls) for arun_with_response."""
+        if not self.tools:
+            content, _ = await self._arun_no_tools_tracked(input_message)
+            return content, []
+        if self._get_tool_mode() == "naive":
+            return await self._arun_naive(input_message), []
+        try:
+            content, _, tool_calls = await self._arun_with_tools_tracked(input_message)
+        except Exception as e:
+            if not self._fall_back_to_naive(e):
+                raise
+            return await self._arun_naive(input_message), []
+        return content, tool_calls
+
+    def run_many(
+        self, inputs: Sequence[str], max_concurrency: int = 8
+    ) -> BatchResponse:
+        """Run each input in its own conversation on a bounded thread pool.
+
+        Per-item errors are recorded on the BatchItem instead of raised.
+        Returns items in input order plus aggregated token and cost totals.
+        """
+
+        def _run_one(index: int, text: str) -> BatchItem:
+            try:
+                response = self._fork().run_with_response(text)
+            except Exception as e:
+                return BatchItem(
+                    index=index, input=text, error=f"{type(e).__name__}: {e}"
+                )
+            return BatchItem(index=index, input=text, response=response)
+
+        inputs = list(inputs)
+        if not inputs:
+            return BatchResponse()
+        workers = max(1, min(max_concurrency, len(inputs)))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            items = list(pool.map(_run_one, range(len(inputs)), inputs))
+        return BatchResponse.from_items(items)
+
+    def arun_many(self, inputs: Sequence[str], max_concurrency: int = 8) -> BatchRun:
+        """Run each input in its own conversation with bounded concurrency.
+
+        Iterate the returned BatchRun with ``async for`` to receive items as
+        they complete, or ``await batch.collect()`` for the full BatchResponse.
+        """
+        return BatchRun(self, inputs, max_concurrency)
+
     def stream(self, input_message: str) -> Iterator[str]:
-        """Stream output tokens. True token streaming for native mode; naive mode yields full response as one chunk.
+        """Stream output tokens as they arrive, in both native and naive tool mode.
+
+        With tools, every turn of the tool loop is streamed in a single pass and
+        content deltas are yielded as they arrive. In naive mode the tool-call
+        JSON is held back, and the turn's stream is closed as soon as it ends.
+
+        With AgentConfig.stream_coalesce_chars / stream_coalesce_interval set,
+        deltas are batched into larger chunks.
 
         on_run_end is NOT fired for streaming — exhaust the iterator yourself if needed.
         """
+        deltas = self._stream_deltas(input_message)
+        if self._coalesces_stream():
+            deltas = coalesce(
+                deltas,
+                self.config.stream_coalesce_chars,
+                self.config.stream_coalesce_interval,
+            )
+        yield from deltas
+
+    def _stream_deltas(self, input_message: str) -> Iterator[str]:
         if self.config.hooks:
             self.config.hooks.on_run_start(input_message)
         if not self.tools:
@@ -193,23 +455,49 @@ class Agent:
         else:
             tool_mode = self._get_tool_mode()
             if tool_mode == "naive":
-                yield self._run_naive(input_message)
+                yield from self._stream_naive(input_message)
             else:
+                produced = False
                 try:
-                    self._run_with_tools_prepare(input_message)
+                    for chunk in self._stream_with_tools(input_message):
+                        produced = True
+                        yield chunk
                 except Exception as e:
-                    if not _is_tool_unsupported_error(e):
+                    if produced or not self._fall_back_to_naive(e):
                         raise
-                    self._tool_mode_cache[self.config.model] = "naive"
-                    yield self._run_naive(input_message)
-                    return
-                yield from self._stream_final_answer()
+                    yield from self._stream_naive(input_message)
 
     async def astream(self, input_message: str) -> AsyncIterator[str]:
-        """Async stream output tokens. True token streaming for native mode; naive mode yields full response as one chunk.
+        """Async stream output tokens as they arrive, in both native and naive tool mode.
+
+        With tools, every turn of the tool loop is streamed in a single pass and
+        content deltas are yielded as they arrive. In naive mode the tool-call
+        JSON is held back, and the turn's stream is closed as soon as it ends.
+
+        With coalescing configured, deltas are read ahead into a queue of at
+        most AgentConfig.stream_queue_size entries and batched. A consumer
+        that falls behind stops the reads once the queue is full.
 
         on_run_end is NOT fired for streaming — exhaust the iterator yourself if needed.
         """
+        deltas = self._astream_deltas(input_message)
+        if self._coalesces_stream():
+            deltas = acoalesce(
+                deltas,
+                self.config.stream_coalesce_chars,
+                self.config.stream_coalesce_interval,
+                self.config.stream_queue_size,
+            )
+        async for chunk in deltas:
+            yield chunk
+
+    def _coalesces_stream(self) -> bool:
+        return (
+            self.config.stream_coalesce_chars is not None
+            or self.config.stream_coalesce_interval is not None
+        )
+
+    async def _astream_deltas(self, input_message: str) -> AsyncIterator[str]:
         if self.config.hooks:
             self.config.hooks.on_run_start(input_message)
         if not self.tools:
@@ -218,18 +506,43 @@ class Agent:
         else:
             tool_mode = self._get_tool_mode()
             if tool_mode == "naive":
-                yield await self._arun_naive(input_message)
+                async for chunk in self._astream_naive(input_message):
+                    yield chunk
             else:
+                produced = False
                 try:
-                    await self._arun_with_tools_prepare(input_message)
+                    async for chunk in self._astream_with_tools(input_message):
+                        produced = True
+                        yield chunk
                 except Exception as e:
-                    if not _is_tool_unsupported_error(e):
+                    if produced or not self._fall_back_to_naive(e):
                         raise
-                    self._tool_mode_cache[self.config.model] = "naive"
-                    yield await self._arun_naive(input_message)
-                    return
-                async for chunk in self._astream_final_answer():
-                    yield chunk
+                    async for chunk in self._astream_naive(input_message):
+                        yield chunk
+
+    async def astream_structured(
+        self, input_message: str, response_model: Type
+    ) -> AsyncIterator[Any]:
+        """Stream a structured answer as it is generated.
+
+        For a Pydantic model, yields progressively more complete partial
+        instances (built with ``model_construct``, unvalidated) and finally
+        the validated instance. For ``List[Model]``, yields each validated
+        item as soon as its JSON object closes.
+
+        The run is driven by astream(), so tools work as usual, and the JSON
+        schema is sent as in run() when the model supports it.
+        """
+        parser = StructuredStream(response_model)
+        self._response_format = self._structured_format(response_model)
+        try:
+            async for chunk in self.astream(input_message):
+                for value in parser.feed(chunk):
+                    yield value
+        finally:
+            self._response_format = None
+        for value in parser.close():
+            yield value
 
     # ------------------------------------------------------------------
     # Sync internals — no tools
@@ -297,8 +610,8 @@ class Agent:
                 return content, last_response, all_tool_calls
 
             self._append_tool_call_message(msg)
-            for tc in msg.tool_calls:
-                result = self._execute_tool_sync(tc)
+            results = self._execute_tool_calls_sync(msg.tool_calls)
+            for tc, result in zip(msg.tool_calls, results):
                 args = (
                     json.loads(tc.function.arguments)
                     if isinstance(tc.function.arguments, str)
@@ -313,10 +626,18 @@ class Agent:
 
         return _MAX_ITER_MSG, last_response, all_tool_calls
 
-    def _run_with_tools_prepare(self, input_message: str) -> None:
-        """Run the tool loop without streaming; history is ready for final stream."""
+    def _stream_with_tools(self, input_message: str) -> Iterator[str]:
+        """Single-pass streaming tool loop.
+
+        Every completion is streamed; tool-call deltas are assembled as they
+        arrive, and the final turn's content goes straight to the caller.
+        With AgentConfig.speculative_tools, each call is started on a worker
+        thread as soon as its arguments are complete, while the rest of the
+        turn is still streaming.
+        """
         self._history.append({"role": "user", "content": input_message})
         tools_schema = self._get_tools_schema()
+        turn_timeout = self.config.tool_iteration_timeout
 
         for _ in range(self.config.max_iterations):
             response = self._completion(
@@ -324,39 +645,54 @@ class Agent:
                 tools=tools_schema,
                 temperature=self.config.temperature,
                 max_tokens=self.config.max_tokens,
+                stream=True,
             )
-            msg = response.choices[0].message
-
-            if not msg.tool_calls:
-                content = msg.content or ""
-                self._history.append({"role": "assistant", "content": content})
-                return
+            turn = StreamedTurn()
+            pool = None
+            if self.config.speculative_tools:
+                pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=max(1, self.config.max_tool_workers)
+                )
+            started: Dict[int, Any] = {}
+            try:
+                for chunk in response:
+                    delta = turn.feed(chunk)
+                    if delta:
+                        yield delta
+                    if pool is not None:
+                        for tc in turn.take_complete_calls():
+                            started[id(tc)] = self._start_tool_call_sync(
+                                pool, tc, turn_timeout
+                            )
+
+                if not turn.tool_calls:
+                    self._history.append(
+                        {"role": "assistant", "content": turn.content or ""}
+                    )
+                    return
 
-            self._append_tool_call_message(msg)
-            for tc in msg.tool_calls:
-                result = self._execute_tool_sync(tc)
+                self._append_tool_call_message(turn)
+                if pool is None:
+                    results = self._execute_tool_calls_sync(turn.tool_calls)
+                else:
+                    entries = [
+                        (
+                            started[id(tc)]
+                            if id(tc) in started
+                            else self._start_tool_call_sync(pool, tc, turn_timeout)
+                        )
+                        for tc in turn.tool_calls
+                    ]
+                    results = self._collect_tool_results_sync(entries, turn_timeout)
+            finally:
+                if pool is not None:
+                    # Drops queued speculative calls if the stream failed.
+                    pool.shutdown(wait=False, cancel_futures=True)
+            for tc, result in zip(turn.tool_calls, results):
                 self._append_tool_result(tc, result)
 
         self._history.append({"role": "assistant", "content": _MAX_ITER_MSG})
-
-    def _stream_final_answer(self) -> Iterator[str]:
-        """Stream a fresh final answer, replacing the pre-computed one from the tool loop."""
-        if self._history and self._history[-1].get("role") == "assistant":
-            self._history.pop()
-
-        response = self._completion(
-            messages=self._build_messages(),
-            temperature=self.config.temperature,
-            max_tokens=self.config.max_tokens,
-            stream=True,
-        )
-        collected = []
-        for chunk in response:
-            delta = chunk.choices[0].delta.content or ""
-            if delta:
-                collected.append(delta)
-                yield delta
-        self._history.append({"role": "assistant", "content": "".join(collected)})
+        yield _MAX_ITER_MSG
 
     # ------------------------------------------------------------------
     # Naive tool calling (prompt-based) — sync
@@ -375,23 +711,63 @@ class Agent:
                 max_tokens=self.config.max_tokens,
             )
             content = response.choices[0].message.content or ""
-            tool_call = self._parse_naive_tool_call(content)
+            tool_calls = self._parse_naive_tool_calls(content)
 
-            if not tool_call:
+            if not tool_calls:
                 self._history.append({"role": "assistant", "content": content})
                 return content
 
-            tool_name = tool_call["tool"]
-            tool_args = tool_call.get("args", {})
-            tool = self._tools_by_name.get(tool_name)
-            result = self._invoke_tool_sync(tool, tool_name, tool_args)
+            calls = _naive_tool_calls(tool_calls)
+            results = self._execute_tool_calls_sync(calls)
+            self._append_naive_results(calls, results)
+
+        return _MAX_ITER_MSG
+
+    def _stream_naive(self, input_message: str) -> Iterator[str]:
+        """Streaming naive tool loop.
+
+        Prose is yielded as it arrives. From the first character of a
+        ``{"tool": ...}`` object the text is held back, and once the object
+        closes the stream is closed so the provider stops generating.
+        """
+        self._history.append({"role": "user", "content": input_message})
+        system_prompt = (
+            self.config.system_prompt or _DEFAULT_SYSTEM_PROMPT
+        ) + self._build_tools_prompt()
 
-            self._history.append(
-                {"role": "assistant", "content": f"[Used tool: {tool_name}]"}
+        for _ in range(self.config.max_iterations):
+            response = self._completion(
+                messages=self._build_messages(system_prompt_override=system_prompt),
+                temperature=self.config.temperature,
+                max_tokens=self.config.max_tokens,
+                stream=True,
             )
-            self._history.append({"role": "user", "content": f"Tool result: {result}"})
+            detector = NaiveToolCallDetector()
+            try:
+                for chunk in response:
+                    if not chunk.choices:
+                        continue
+                    text = detector.feed(chunk.choices[0].delta.content or "")
+                    if text:
+                        yield text
+                    if detector.done:
+                        break
+            finally:
+                close_stream(response)
+
+            if detector.tool_calls is None:
+                rest = detector.flush()
+                if rest:
+                    yield rest
+                self._history.append({"role": "assistant", "content": detector.text})
+                return
 
-        return _MAX_ITER_MSG
+            calls = _naive_tool_calls(detector.tool_calls)
+            results = self._execute_tool_calls_sync(calls)
+            self._append_naive_results(calls, results)
+
+        self._history.append({"role": "assistant", "content": _MAX_ITER_MSG})
+        yield _MAX_ITER_MSG
 
     # ------------------------------------------------------------------
     # Async internals — no tools
@@ -458,9 +834,7 @@ class Agent:
                 return content, last_response, all_tool_calls
 
             self._append_tool_call_message(msg)
-            results = await asyncio.gather(
-                *[self._execute_tool_async(tc) for tc in msg.tool_calls]
-            )
+            results = await self._execute_tool_calls_async(msg.tool_calls)
             for tc, result in zip(msg.tool_calls, results):
                 args = (
                     json.loads(tc.function.arguments)
@@ -476,7 +850,13 @@ class Agent:
 
         return _MAX_ITER_MSG, last_response, all_tool_calls
 
-    async def _arun_with_tools_prepare(self, input_message: str) -> None:
+    async def _astream_with_tools(self, input_message: str) -> AsyncIterator[str]:
+        """Async single-pass streaming tool loop. See _stream_with_tools.
+
+        With AgentConfig.speculative_tools, each call starts as a task as soon
+        as its arguments are complete. The tasks are cancelled if the stream
+        fails or the caller stops iterating.
+        """
         self._history.append({"role": "user", "content": input_message})
         tools_schema = self._get_tools_schema()
 
@@ -486,41 +866,40 @@ class Agent:
                 tools=tools_schema,
                 temperature=self.config.temperature,
                 max_tokens=self.config.max_tokens,
+                stream=True,
             )
-            msg = response.choices[0].message
-
-            if not msg.tool_calls:
-                content = msg.content or ""
-                self._history.append({"role": "assistant", "content": content})
+            turn = StreamedTurn()
+            started: Dict[int, asyncio.Future] = {}
+            try:
+                async for chunk in response:
+                    delta = turn.feed(chunk)
+                    if delta:
+                        yield delta
+                    if self.config.speculative_tools:
+                        for tc in turn.take_complete_calls():
+                            started[id(tc)] = asyncio.ensure_future(
+                                self._execute_tool_async(tc)
+                            )
+            except BaseException:
+                for task in started.values():
+                    task.cancel()
+                if started:
+                    await asyncio.gather(*started.values(), return_exceptions=True)
+                raise
+
+            if not turn.tool_calls:
+                self._history.append(
+                    {"role": "assistant", "content": turn.content or ""}
+                )
                 return
 
-            self._append_tool_call_message(msg)
-            results = await asyncio.gather(
-                *[self._execute_tool_async(tc) for tc in msg.tool_calls]
-            )
-            for tc, result in zip(msg.tool_calls, results):
+            self._append_tool_call_message(turn)
+            results = await self._execute_tool_calls_async(turn.tool_calls, started)
+            for tc, result in zip(turn.tool_calls, results):
                 self._append_tool_result(tc, result)
 
         self._history.append({"role": "assistant", "content": _MAX_ITER_MSG})
-
-    async def _astream_final_answer(self) -> AsyncIterator[str]:
-        """Async stream a fresh final answer, replacing the pre-computed one from the tool loop."""
-        if self._history and self._history[-1].get("role") == "assistant":
-            self._history.pop()
-
-        response = await self._acompletion(
-            messages=self._build_messages(),
-            temperature=self.config.temperature,
-            max_tokens=self.config.max_tokens,
-            stream=True,
-        )
-        collected = []
-        async for chunk in response:
-            delta = chunk.choices[0].delta.content or ""
-            if delta:
-                collected.append(delta)
-                yield delta
-        self._history.append({"role": "assistant", "content": "".join(collected)})
+        yield _MAX_ITER_MSG
 
     # ------------------------------------------------------------------
     # Naive tool calling (prompt-based) — async
@@ -539,46 +918,64 @@ class Agent:
                 max_tokens=self.config.max_tokens,
             )
             content = response.choices[0].message.content or ""
-            tool_call = self._parse_naive_tool_call(content)
+            tool_calls = self._parse_naive_tool_calls(content)
 
-            if not tool_call:
+            if not tool_calls:
                 self._history.append({"role": "assistant", "content": content})
                 return content
 
-            tool_name = tool_call["tool"]
-            tool_args = tool_call.get("args", {})
-            tool = self._tools_by_name.get(tool_name)
-
-            if not tool:
-                result = f"Error: Tool '{tool_name}' not found"
-            elif (
-                self.config.hooks is not None
-                and self.config.hooks.on_tool_start(tool_name, tool_args) == "deny"
-            ):
-                result = f"[Tool '{tool_name}' was not approved]"
-            else:
-                try:
-                    result = str(await tool.execute(**tool_args))
-                    if self.config.hooks:
-                        self.config.hooks.on_tool_end(tool_name, tool_args, result)
-                except Exception as e:
-                    if self.config.hooks:
-                        self.config.hooks.on_tool_error(tool_name, tool_args, e)
-                    result = f"Error executing {tool_name}: {str(e)}"
+            calls = _naive_tool_calls(tool_calls)
+            results = await self._execute_tool_calls_async(calls)
+            self._append_naive_results(calls, results)
+
+        return _MAX_ITER_MSG
+
+    async def _astream_naive(self, input_message: str) -> AsyncIterator[str]:
+        self._history.append({"role": "user", "content": input_message})
+        system_prompt = (
+            self.config.system_prompt or _DEFAULT_SYSTEM_PROMPT
+        ) + self._build_tools_prompt()
 
-            self._history.append(
-                {"role": "assistant", "content": f"[Used tool: {tool_name}]"}
+        for _ in range(self.config.max_iterations):
+            response = await self._acompletion(
+                messages=self._build_messages(system_prompt_override=system_prompt),
+                temperature=self.config.temperature,
+                max_tokens=self.config.max_tokens,
+                stream=True,
             )
-            self._history.append({"role": "user", "content": f"Tool result: {result}"})
+            detector = NaiveToolCallDetector()
+            try:
+                async for chunk in response:
+                    if not chunk.choices:
+                        continue
+                    text = detector.feed(chunk.choices[0].delta.content or "")
+                    if text:
+                        yield text
+                    if detector.done:
+                        break
+            finally:
+                await aclose_stream(response)
+
+            if detector.tool_calls is None:
+                rest = detector.flush()
+                if rest:
+                    yield rest
+                self._history.append({"role": "assistant", "content": detector.text})
+                return
 
-        return _MAX_ITER_MSG
+            calls = _naive_tool_calls(detector.tool_calls)
+            results = await self._execute_tool_calls_async(calls)
+            self._append_naive_results(calls, results)
+
+        self._history.append({"role": "assistant", "content": _MAX_ITER_MSG})
+        yield _MAX_ITER_MSG
 
     # ------------------------------------------------------------------
     # Tool execution helpers
     # ------------------------------------------------------------------
 
-    def _invoke_tool_sync(self, tool, tool_name: str, args: dict) -> str:
-        """Execute a resolved tool synchronously, applying hook gates."""
+    def _gate_tool(self, tool, tool_name: str, args: dict) -> Optional[str]:
+        """Return a refusal result if the tool is missing or denied, else None."""
         if not tool:
             return f"Error: Tool '{tool_name}' not found"
         if (
@@ -586,22 +983,129 @@ class Agent:
             and self.config.hooks.on_tool_start(tool_name, args) == "deny"
         ):
             return f"[Tool '{tool_name}' was not approved]"
-        try:
-            if inspect.iscoroutinefunction(tool.execute):
-                result = _run_coroutine_sync(tool.execute(**args))
+        return None
+
+    def _tool_succeeded(self, tool_name: str, args: dict, result: str) -> str:
+        if self.config.hooks:
+            self.config.hooks.on_tool_end(tool_name, args, result)
+        return result
+
+    def _tool_failed(self, tool_name: str, args: dict, error: Exception) -> str:
+        if self.config.hooks:
+            self.config.hooks.on_tool_error(tool_name, args, error)
+        return f"Error executing {tool_name}: {str(error)}"
+
+    def _tool_cache_get(self, tool, tool_name: str, args: dict) -> tuple:
+        """Look up an approved call in the tool's result cache.
+
+        Returns (key, cached result). The result is None on a miss or when
+        the tool has no cache.
+        """
+        cache = tool.cache if isinstance(tool, BaseTool) else None
+        if cache is None:
+            return None, None
+        key = cache.make_key(args)
+        hit, result = cache.get(key)
+        if self.config.hooks:
+            if hit:
+                self.config.hooks.on_tool_cache_hit(tool_name, args, cache.stats)
             else:
-                result = tool.execute(**args)
-            result_str = str(result)
-            if self.config.hooks:
-                self.config.hooks.on_tool_end(tool_name, args, result_str)
-            return result_str
+                self.config.hooks.on_tool_cache_miss(tool_name, args, cache.stats)
+        return key, (str(result) if hit else None)
+
+    @staticmethod
+    def _tool_cache_set(tool, key, result: str) -> None:
+        if key is not None:
+            tool.cache.set(key, result)
+
+    def _tool_timeout(self, tool, limit: Optional[float] = None) -> Optional[float]:
+        """Time limit for one call: the tool's own timeout, else
+        AgentConfig.tool_timeout, capped by ``limit`` (time left in the turn).
+        """
+        timeout = tool.timeout if isinstance(tool, BaseTool) else None
+        if timeout is None:
+            timeout = self.config.tool_timeout
+        if limit is not None:
+            timeout = limit if timeout is None else min(timeout, limit)
+        return timeout
+
+    def _call_tool_sync(self, tool, args: dict, timeout: Optional[float] = None) -> str:
+        """Run an approved tool on the current thread. Raises on tool errors.
+
+        Plain-function tools are called inline; coroutine tools run on the
+        shared background loop so loop-bound resources persist across calls.
+        With a timeout, coroutine tools are cancelled when it expires, while
+        plain functions run on a helper thread that is abandoned.
+        """
+        call = _blocking_tool_call(tool, args)
+        if call is None:
+            return str(run_sync(tool.execute(**args), timeout))
+        result = call() if timeout is None else _call_in_thread(call, timeout)
+        return str(result)
+
+    @staticmethod
+    async def _call_tool_async(tool, args: dict, timeout: Optional[float]) -> str:
+        """Run an approved tool on the event loop. Raises on tool errors.
+
+        Coroutine tools are cancelled when the timeout expires. With a
+        timeout, plain functions run on a helper thread so the loop keeps
+        going while they block, and the thread is abandoned on expiry.
+        """
+        call = _blocking_tool_call(tool, args)
+        if call is None:
+            return str(await asyncio.wait_for(tool.execute(**args), timeout))
+        if timeout is None:
+            return str(call())
+        return str(
+            await asyncio.wait_for(asyncio.wrap_future(_start_thread(call)), timeout)
+        )
+
+    def _invoke_tool_sync(
+        self, tool, tool_name: str, args: dict, limit: Optional[float] = None
+    ) -> str:
+        """Execute a resolved tool synchronously, applying hook gates."""
+        refusal = self._gate_tool(tool, tool_name, args)
+        if refusal is not None:
+            return refusal
+        key, cached = self._tool_cache_get(tool, tool_name, args)
+        if cached is not None:
+            return self._tool_succeeded(tool_name, args, cached)
+        timeout = self._tool_timeout(tool, limit)
+        try:
+            result = self._call_tool_sync(tool, args, timeout)
         except Exception as e:
-            if self.config.hooks:
-                self.config.hooks.on_tool_error(tool_name, args, e)
-            return f"Error executing {tool_name}: {str(e)}"
+            return self._tool_failed(
+                tool_name, args, _timeout_error(e, tool_name, timeout)
+            )
+        self._tool_cache_set(tool, key, result)
+        return self._tool_succeeded(tool_name, args, result)
 
-    def _execute_tool_sync(self, tool_call) -> str:
-        """Execute a tool call synchronously."""
+    async def _invoke_tool_async(
+        self, tool, tool_name: str, args: dict, limit: Optional[float] = None
+    ) -> str:
+        """Execute a resolved tool asynchronously, applying hook gates.
+
+        A tool that overruns its timeout is cancelled, or abandoned on its
+        helper thread if it is a plain function.
+        """
+        refusal = self._gate_tool(tool, tool_name, args)
+        if refusal is not None:
+            return refusal
+        key, cached = self._tool_cache_get(tool, tool_name, args)
+        if cached is not None:
+            return self._tool_succeeded(tool_name, args, cached)
+        timeout = self._tool_timeout(tool, limit)
+        try:
+            result = await self._call_tool_async(tool, args, timeout)
+        except Exception as e:
+            return self._tool_failed(
+                tool_name, args, _timeout_error(e, tool_name, timeout)
+            )
+        self._tool_cache_set(tool, key, result)
+        return self._tool_succeeded(tool_name, args, result)
+
+    def _resolve_tool_call(self, tool_call):
+        """Return (tool_name, tool, args) for a LiteLLM tool call object."""
         tool_name = tool_call.function.name
         tool_args = tool_call.function.arguments
         tool = self._tools_by_name.get(tool_name)
@@ -609,34 +1113,162 @@ class Agent:
             args = json.loads(tool_args) if isinstance(tool_args, str) else tool_args
         except Exception:
             args = {}
+        return tool_name, tool, args
+
+    def _execute_tool_sync(self, tool_call) -> str:
+        """Execute a tool call synchronously."""
+        tool_name, tool, args = self._resolve_tool_call(tool_call)
         return self._invoke_tool_sync(tool, tool_name, args)
 
-    async def _execute_tool_async(self, tool_call) -> str:
-        """Execute a tool call asynchronously."""
-        tool_name = tool_call.function.name
-        tool_args = tool_call.function.arguments
-        tool = self._tools_by_name.get(tool_name)
-        if not tool:
-            return f"Error: Tool '{tool_name}' not found"
+    def _execute_tool_calls_sync(self, tool_calls) -> List[str]:
+        """Execute one turn's tool calls, in a thread pool when max_tool_workers > 1.
+
+        on_tool_start gates and on_tool_end / on_tool_error hooks always fire on
+        the calling thread, so hooks never need to be thread-safe. Only the tool
+        bodies run on worker threads. Results are returned in call order.
+
+        Calls still running when AgentConfig.tool_iteration_timeout expires get
+        a timeout result. Calls that finished in time keep theirs.
+        """
+        workers = min(self.config.max_tool_workers, len(tool_calls))
+        turn_timeout = self.config.tool_iteration_timeout
+        if workers <= 1:
+            if turn_timeout is None:
+                return [self._execute_tool_sync(tc) for tc in tool_calls]
+            deadline = time.monotonic() + turn_timeout
+            results = []
+            for tc in tool_calls:
+                tool_name, tool, args = self._resolve_tool_call(tc)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    error = ToolTimeoutError(tool_name, turn_timeout)
+                    results.append(self._tool_failed(tool_name, args, error))
+                else:
+                    results.append(
+                        self._invoke_tool_sync(tool, tool_name, args, remaining)
+                    )
+            return results
+
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
         try:
-            args = json.loads(tool_args) if isinstance(tool_args, str) else tool_args
-        except Exception:
-            args = {}
-        if (
-            self.config.hooks is not None
-            and self.config.hooks.on_tool_start(tool_name, args) == "deny"
-        ):
-            return f"[Tool '{tool_name}' was not approved]"
+            entries = [
+                self._start_tool_call_sync(pool, tc, turn_timeout) for tc in tool_calls
+            ]
+            return self._collect_tool_results_sync(entries, turn_timeout)
+        finally:
+            # Overrunning calls are abandoned rather than waited for.
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _start_tool_call_sync(self, pool, tool_call, turn_timeout: Optional[float]):
+        """Gate one call on the calling thread and submit its body to ``pool``.
+
+        Returns the final result string if the call needs no execution
+        (missing, denied or cached), else a pending entry for
+        _collect_tool_results_sync.
+        """
+        tool_name, tool, args = self._resolve_tool_call(tool_call)
+        refusal = self._gate_tool(tool, tool_name, args)
+        if refusal is not None:
+            return refusal
+        key, cached = self._tool_cache_get(tool, tool_name, args)
+        if cached is not None:
+            return self._tool_succeeded(tool_name, args, cached)
+        timeout = self._tool_timeout(tool, turn_timeout)
+        fut = pool.submit(self._call_tool_sync, tool, args, timeout)
+        return fut, tool, tool_name, args, key, timeout
+
+    def _collect_tool_results_sync(
+        self, entries: list, turn_timeout: Optional[float]
+    ) -> List[str]:
+        """Wait for started calls and fire their end/error hooks on this thread.
+
+        Calls still running after ``turn_timeout`` get a timeout result.
+        """
+        results: List[Optional[str]] = [
+            e if isinstance(e, str) else None for e in entries
+        ]
+        pending: Dict[concurrent.futures.Future, tuple] = {
+            e[0]: (i,) + e[1:] for i, e in enumerate(entries) if not isinstance(e, str)
+        }
+
+        def finish(fut: concurrent.futures.Future) -> None:
+            i, tool, tool_name, args, key, timeout = pending[fut]
+            try:
+                result = fut.result()
+            except Exception as e:
+                error = _timeout_error(e, tool_name, timeout)
+                results[i] = self._tool_failed(tool_name, args, error)
+            else:
+                self._tool_cache_set(tool, key, result)
+                results[i] = self._tool_succeeded(tool_name, args, result)
+
         try:
-            result = await tool.execute(**args)
-            result_str = str(result)
-            if self.config.hooks:
-                self.config.hooks.on_tool_end(tool_name, args, result_str)
-            return result_str
-        except Exception as e:
-            if self.config.hooks:
-                self.config.hooks.on_tool_error(tool_name, args, e)
-            return f"Error executing {tool_name}: {str(e)}"
+            for fut in concurrent.futures.as_completed(pending, turn_timeout):
+                finish(fut)
+        except concurrent.futures.TimeoutError:
+            # as_completed only times out when a turn timeout was given
+            assert turn_timeout is not None
+            for fut, (i, _, tool_name, args, _, _) in pending.items():
+                if results[i] is not None:
+                    continue
+                if fut.done():
+                    finish(fut)
+                else:
+                    fut.cancel()
+                    error = ToolTimeoutError(tool_name, turn_timeout)
+                    results[i] = self._tool_failed(tool_name, args, error)
+        filled = [r for r in results if r is not None]
+        assert len(filled) == len(results), "every tool call gets a result"
+        return filled
+
+    async def _execute_tool_async(self, tool_call) -> str:
+        """Execute a tool call asynchronously."""
+        tool_name, tool, args = self._resolve_tool_call(tool_call)
+        return await self._invoke_tool_async(tool, tool_name, args)
+
+    async def _execute_tool_calls_async(
+        self, tool_calls, started: Optional[Dict[int, asyncio.Future]] = None
+    ) -> List[str]:
+        """Execute one turn's tool calls concurrently. Results keep call order.
+
+        ``started`` maps id(tool_call) to calls already running speculatively.
+        Calls still running when AgentConfig.tool_iteration_timeout expires are
+        cancelled and get a timeout result. Calls that finished keep theirs.
+        """
+        started = started or {}
+        turn_timeout = self.config.tool_iteration_timeout
+        if turn_timeout is None:
+            return list(
+                await asyncio.gather(
+                    *[
+                        started.get(id(tc)) or self._execute_tool_async(tc)
+                        for tc in tool_calls
+                    ]
+                )
+            )
+
+        resolved = [self._resolve_tool_call(tc) for tc in tool_calls]
+        tasks = [
+            started.get(id(tc))
+            or asyncio.ensure_future(
+                self._invoke_tool_async(tool, tool_name, args, turn_timeout)
+            )
+            for tc, (tool_name, tool, args) in zip(tool_calls, resolved)
+        ]
+        _, overdue = await asyncio.wait(tasks, timeout=turn_timeout)
+        for task in overdue:
+            task.cancel()
+        if overdue:
+            await asyncio.gather(*overdue, return_exceptions=True)
+
+        results = []
+        for task, (tool_name, _, args) in zip(tasks, resolved):
+            if task.cancelled():
+                error = ToolTimeoutError(tool_name, turn_timeout)
+                results.append(self._tool_failed(tool_name, args, error))
+            else:
+                results.append(task.result())
+        return results
 
     # ------------------------------------------------------------------
     # History helpers
@@ -661,6 +1293,21 @@ class Agent:
             }
         )
 
+    def _append_naive_results(self, calls, results: List[str]) -> None:
+        """Record a naive turn's tool calls and all their results as one exchange."""
+        names = [tc.function.name for tc in calls]
+        if len(calls) == 1:
+            used = f"[Used tool: {names[0]}]"
+            content = f"Tool result: {results[0]}"
+        else:
+            used = f"[Used tools: {', '.join(names)}]"
+            content = "Tool results:\n" + "\n".join(
+                f"{i}. {name}: {result}"
+                for i, (name, result) in enumerate(zip(names, results), 1)
+            )
+        self._history.append({"role": "assistant", "content": used})
+        self._history.append({"role": "user", "content": content})
+
     def _append_tool_result(self, tc, result: str) -> None:
         self._history.append(
             {
@@ -678,134 +1325,402 @@ class Agent:
     def _build_messages(
         self, system_prompt_override: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Build message list for LiteLLM, optionally prepending a system prompt."""
-        messages = list(self._history)
+        """Build message list for LiteLLM, optionally prepending a system prompt.
+
+        Returns the history's live request list rather than a copy.
+        """
         sys = system_prompt_override or self.config.system_prompt
-        if sys:
-            messages = [{"role": "system", "content": sys}] + messages
-        return messages
+        return self._history.request_messages(sys)
 
     # ------------------------------------------------------------------
     # Tool schema helpers
     # ------------------------------------------------------------------
 
+    def _tool_set(self) -> tuple:
+        """Current tools as a hashable key; refreshes the name index on change."""
+        tools = tuple(self.tools)
+        if tools != self._tool_set_key:
+            self._tool_set_key = tools
+            self._tools_by_name = {t.name: t for t in tools}
+        return tools
+
     def _get_tools_schema(self) -> List[Dict[str, Any]]:
-        return [self._tool_to_openai_format(t) for t in self.tools]
+        try:
+            return _tools_schema_for(self._tool_set())
+        except TypeError:  # unhashable duck-typed tool
+            return [self._tool_to_openai_format(t) for t in self.tools]
 
     def _tool_to_openai_format(self, tool) -> Dict[str, Any]:
         """Convert a Tool to OpenAI function-calling format."""
-        return {
-            "type": "function",
-            "function": {
-                "name": tool.name,
-                "description": tool.description,
-                "parameters": tool.definition.to_json_schema(),
-            },
-        }
+        return _tool_to_openai_format(tool)
 
     # ------------------------------------------------------------------
     # Tool mode detection
     # ------------------------------------------------------------------
 
     def _get_tool_mode(self) -> str:
+        """Configured mode, else LiteLLM's model metadata, else a learned mode."""
         if self.config.tool_mode in ("native", "naive"):
             return self.config.tool_mode
-        if self.config.model in self._tool_mode_cache:
-            return self._tool_mode_cache[self.config.model]
-        return "native"
+        if supports_native_tools(self.config.model) is False:
+            return "naive"
+        return self._tool_mode_cache.get(self.config.model) or "native"
+
+    def _fall_back_to_naive(self, error: Exception) -> bool:
+        """Whether a failed native request should be retried in naive mode.
+
+        The mode is remembered only when the model metadata does not claim
+        tool support; otherwise the error is more likely a one-off and just
+        this run falls back.
+        """
+        if not is_tool_unsupported_error(error):
+            return False
+        # The model has to write tool JSON now, so it can't be held to a schema.
+        self._response_format = None
+        if supports_native_tools(self.config.model) is None:
+            self._tool_mode_cache.set(self.config.model, "naive")
+        return True
 
     # ------------------------------------------------------------------
-    # Naive tool prompt helpers
+    # Structured output
     # ------------------------------------------------------------------
 
-    def _build_tools_prompt(self) -> str:
-        if not self.tools:
-            return ""
-
-        tools_desc = "\n\nYou have access to the following tools:\n\n"
-        for tool in self.tools:
-            tools_desc += f"- {tool.name}: {tool.description}\n"
-            if tool.definition.parameters:
-                tools_desc += "  Parameters:\n"
-                for param in tool.definition.parameters.values():
-                    tools_desc += f"    - {param.name} ({param.type}): {param.description or 'No description'}\n"
-
-        tools_desc += (
-            '\nTo use a tool, respond with JSON: {"tool": "tool_name", "args": {...}}\n'
+    def _structured_format(self, response_model: Any) -> Optional[Dict]:
+        """JSON-schema response_format for a structured run, if the model takes one."""
+        if response_model is None or not supports_json_schema(self.config.model):
+            return None
+        if self.tools and self._get_tool_mode() == "naive":
+            return None
+        return response_format_for(response_model)
+
+    def _extraction_request(self, response_model: Any) -> Dict[str, Any]:
+        """Completion kwargs that force the final answer into a tool call."""
+        tool = extraction_tool_for(response_model)
+        name = tool["function"]["name"]
+        messages = list(self._build_messages())
+        messages.append(
+            {
+                "role": "user",
+                "content": f"Return your final answer with the {name} tool.",
+            }
+        )
+        return dict(
+            messages=messages,
+            tools=[tool],
+            tool_choice={"type": "function", "function": {"name": name}},
+            temperature=self.config.temperature,
+            max_tokens=self.config.max_tokens,
         )
-        tools_desc += "After using a tool, you'll receive the result and can provide a final answer.\n"
-        return tools_desc
 
-    def _parse_naive_tool_call(self, content: str):
+    @staticmethod
+    def _extracted_arguments(response: Any) -> str:
+        message = response.choices[0].message
+        tool_calls = getattr(message, "tool_calls", None) or []
+        if tool_calls:
+            return tool_calls[0].function.arguments
+        return message.content or ""
+
+    def _parse_structured(self, content: str, response_model: Type) -> Any:
         try:
-            parsed = json.loads(content.strip())
-            if "tool" in parsed and "args" in parsed:
-                return parsed
-        except json.JSONDecodeError:
-            pass
-
-        start = content.find("{")
-        if start == -1:
-            return None
+            return parse_structured(response_model, content)
+        except ValidationError:
+            if self._get_tool_mode() == "naive":
+                raise
+        response = self._completion(**self._extraction_request(response_model))
+        return parse_structured(response_model, self._extracted_arguments(response))
+
+    async def _aparse_structured(self, content: str, response_model: Type) -> Any:
+        try:
+            return parse_structured(response_model, content)
+        except ValidationError:
+            if self._get_tool_mode() == "naive":
+                raise
+        response = await self._acompletion(**self._extraction_request(response_model))
+        return parse_structured(response_model, self._extracted_arguments(response))
 
-        brace_count = 0
-        for i in range(start, len(content)):
-            if content[i] == "{":
-                brace_count += 1
-            elif content[i] == "}":
-                brace_count -= 1
-                if brace_count == 0:
-                    try:
-                        parsed = json.loads(content[start : i + 1])
-                        if "tool" in parsed and "args" in parsed:
-                            return parsed
-                    except json.JSONDecodeError:
-                        pass
-                    break
-        return None
+    # ------------------------------------------------------------------
+    # Naive tool prompt helpers
+    # ------------------------------------------------------------------
+
+    def _build_tools_prompt(self) -> str:
+        try:
+            return _tools_prompt_for(self._tool_set())
+        except TypeError:  # unhashable duck-typed tool
+            return _tools_prompt_for.__wrapped__(tuple(self.tools))
+
+    def _parse_naive_tool_calls(self, content: str) -> Optional[List[Dict[str, Any]]]:
+        detector = NaiveToolCallDetector()
+        detector.feed(content)
+        return detector.tool_calls
 
     # ------------------------------------------------------------------
     # LiteLLM wrappers
     # ------------------------------------------------------------------
 
     def _completion(self, **kwargs):
+        # Some providers (Anthropic) enforce response_format as a forced tool
+        # call, which would keep the model from calling ours.
+        if self._response_format is not None and not kwargs.get("tools"):
+            kwargs.setdefault("response_format", self._response_format)
         messages = kwargs.get("messages", [])
+        if self.config.context_window is not None:
+            self.config.context_window.fit(
+                self._history, messages, kwargs.get("tools"), self.config.model
+            )
+        cache_key, cached = self._cache_lookup(kwargs)
+        if cached is not None:
+            if kwargs.get("stream"):
+                return replay_stream(cached)
+            self._record_usage(cached, 0.0, cache_hit=True)
+            return cached
+        reserved = self._rate_limit_acquire(kwargs)
         if self.config.hooks:
             self.config.hooks.on_llm_start(messages)
+        started = time.perf_counter()
         try:
+            request = self._provider_request(kwargs)
             if self.config.router:
                 response = self.config.router.completion(
-                    model=self.config.model, **kwargs
+                    model=self.config.model, **request
                 )
             else:
-                response = litellm.completion(model=self.config.model, **kwargs)
+                response = litellm.completion(model=self.config.model, **request)
         except Exception as e:
+            self._rate_limit_settle(reserved, None, failed=True)
             if self.config.hooks:
                 self.config.hooks.on_llm_error(e)
             raise
-        if not kwargs.get("stream") and self.config.hooks:
-            self.config.hooks.on_llm_end(response)
+        if not kwargs.get("stream"):
+            self._rate_limit_settle(reserved, response)
+            self._record_usage(response, time.perf_counter() - started)
+            if self.config.hooks:
+                self.config.hooks.on_llm_end(response)
+        if cache_key is not None and self.config.cache is not None:
+            if kwargs.get("stream"):
+                return self.config.cache.wrap_stream(cache_key, response, messages)
+            self.config.cache.set(cache_key, response)
         return response
 
     async def _acompletion(self, **kwargs):
+        # Some providers (Anthropic) enforce response_format as a forced tool
+        # call, which would keep the model from calling ours.
+        if self._response_format is not None and not kwargs.get("tools"):
+            kwargs.setdefault("response_format", self._response_format)
         messages = kwargs.get("messages", [])
+        if self.config.context_window is not None:
+            await self.config.context_window.afit(
+                self._history, messages, kwargs.get("tools"), self.config.model
+            )
+        cache_key, cached = self._cache_lookup(kwargs)
+        if cached is not None:
+            if kwargs.get("stream"):
+                return areplay_stream(cached)
+            self._record_usage(cached, 0.0, cache_hit=True)
+            return cached
+        if self.config.single_flight and is_deterministic(kwargs):
+            return await self._asingle_flight(kwargs, messages, cache_key)
+        return await self._aprovider_call(kwargs, messages, cache_key)
+
+    async def _aprovider_call(
+        self,
+        kwargs: Dict[str, Any],
+        messages: List[Dict[str, Any]],
+        cache_key: Optional[str],
+    ) -> Any:
+        """The part of _acompletion that reaches the provider: rate limit,
+        hooks, hedging, usage and the completion cache."""
+        reserved = await self._arate_limit_acquire(kwargs)
         if self.config.hooks:
             self.config.hooks.on_llm_start(messages)
+        started = time.perf_counter()
         try:
-            if self.config.router:
-                response = await self.config.router.acompletion(
-                    model=self.config.model, **kwargs
+            request = self._provider_request(kwargs)
+            if self.config.hedging is not None:
+                response = await self._ahedged_completion(
+                    request, kwargs, self.config.hedging
                 )
             else:
-                response = await litellm.acompletion(model=self.config.model, **kwargs)
+                response = await self._aprovider_completion(request)
         except Exception as e:
+            self._rate_limit_settle(reserved, None, failed=True)
             if self.config.hooks:
                 self.config.hooks.on_llm_error(e)
             raise
-        if not kwargs.get("stream") and self.config.hooks:
-            self.config.hooks.on_llm_end(response)
+        if not kwargs.get("stream"):
+            self._rate_limit_settle(reserved, response)
+            self._record_usage(response, time.perf_counter() - started)
+            if self.config.hooks:
+                self.config.hooks.on_llm_end(response)
+        if cache_key is not None and self.config.cache is not None:
+            if kwargs.get("stream"):
+                return self.config.cache.awrap_stream(cache_key, response, messages)
+            self.config.cache.set(cache_key, response)
+        return response
+
+    async def _asingle_flight(
+        self,
+        kwargs: Dict[str, Any],
+        messages: List[Dict[str, Any]],
+        cache_key: Optional[str],
+    ) -> Any:
+        """Share the provider call with identical requests already in flight
+        (AgentConfig.single_flight). A request that joins another's call is
+        logged as a coalesced iteration, which is not billed."""
+        key = (
+            bool(kwargs.get("stream")),
+            cache_key or completion_cache_key(self.config.model, kwargs),
+        )
+
+        def call() -> Awaitable[Any]:
+            return self._aprovider_call(kwargs, messages, cache_key)
+
+        if kwargs.get("stream"):
+            stream, _ = await self._single_flight.stream(key, call)
+            return stream
+        started = time.perf_counter()
+        response, shared = await self._single_flight.call(key, call)
+        if shared:
+            self._record_usage(response, time.perf_counter() - started, coalesced=True)
         return response
 
+    async def _aprovider_completion(self, request: Dict[str, Any]) -> Any:
+        if self.config.router:
+            return await self.config.router.acompletion(
+                model=self.config.model, **request
+            )
+        return await litellm.acompletion(model=self.config.model, **request)
+
+    async def _ahedged_completion(
+        self, request: Dict[str, Any], kwargs: Dict[str, Any], policy: HedgingPolicy
+    ) -> Any:
+        """Provider call under AgentConfig.hedging. Streams race on their
+        first chunk. A losing request is logged as a hedge iteration.
+
+        The caller settles its rate-limit reservation against the winner;
+        the hedge's reservation is settled here against the loser.
+        """
+        stream = bool(kwargs.get("stream"))
+        hedge_reserved = 0
+        hedge_sent = False
+
+        async def attempt(hedge: bool) -> Any:
+            nonlocal hedge_reserved, hedge_sent
+            if hedge:
+                hedge_reserved = await self._arate_limit_acquire(kwargs)
+                hedge_sent = True
+            response = await self._aprovider_completion(request)
+            return await prefetched(response) if stream else response
+
+        try:
+            outcome = await run_hedged(attempt, policy.threshold(self.config.model))
+        except Exception:
+            self._rate_limit_settle(hedge_reserved, None, failed=True)
+            raise
+        # The primary's latency, which is a lower bound if a hedge beat it
+        policy.observe(self.config.model, outcome.latencies[0])
+        if outcome.hedged:
+            loser_latency = outcome.latencies[1 - outcome.winner]
+            if stream:
+                if outcome.loser is not None:
+                    await aclose_stream(outcome.loser)
+            elif outcome.loser is not None:
+                self._rate_limit_settle(hedge_reserved, outcome.loser)
+                self._record_usage(outcome.loser, loser_latency, hedge=True)
+            elif hedge_sent:
+                # Cancelled after it reached the provider, which may bill it
+                loser = cancelled_hedge_response(outcome.result)
+                self._rate_limit_settle(hedge_reserved, loser)
+                self._record_usage(loser, loser_latency, hedge=True)
+        return outcome.result
+
+    def _estimated_tokens(self, request: Dict[str, Any]) -> int:
+        """Rough token cost of a request for the rate limiter: its prompt
+        plus ``max_tokens``."""
+        try:
+            tokens = litellm.token_counter(
+                model=self.config.model,
+                messages=request.get("messages", []),
+                tools=request.get("tools"),
+            )
+        except Exception:
+            tokens = len(json.dumps(request.get("messages", []), default=str)) // 4
+        return tokens + (request.get("max_tokens") or 0)
+
+    def _rate_limit_acquire(self, request: Dict[str, Any]) -> int:
+        """Wait for the configured rate limiter. Returns the tokens reserved."""
+        limiter = self.config.rate_limiter
+        if limiter is None:
+            return 0
+        tokens = self._estimated_tokens(request) if limiter.tpm is not None else 0
+        limiter.acquire(tokens)
+        return tokens
+
+    async def _arate_limit_acquire(self, request: Dict[str, Any]) -> int:
+        limiter = self.config.rate_limiter
+        if limiter is None:
+            return 0
+        tokens = self._estimated_tokens(request) if limiter.tpm is not None else 0
+        await limiter.aacquire(tokens)
+        return tokens
+
+    def _rate_limit_settle(
+        self, reserved: int, response: Any, failed: bool = False
+    ) -> None:
+        """Replace the token estimate with the reported usage. A failed
+        request keeps its request slot but uses no tokens. Streams keep the
+        estimate."""
+        limiter = self.config.rate_limiter
+        if limiter is None or not reserved:
+            return
+        if failed:
+            limiter.settle(reserved, 0)
+            return
+        total = getattr(getattr(response, "usage", None), "total_tokens", None)
+        if isinstance(total, int):
+            limiter.settle(reserved, total)
+
+    def _record_usage(self, response: Any, latency: float, **flags: bool) -> None:
+        """Log a completion for AgentResponse. ``flags`` are IterationUsage
+        booleans: cache_hit, hedge or coalesced."""
+        if self._usage_log is not None:
+            self._usage_log.append((response, latency, flags))
+
+    def _provider_request(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Request kwargs as sent to the provider.
+
+        With AgentConfig.prompt_caching, cache-control breakpoints are added
+        to the system prompt, the tool block and the newest message. The
+        history is not modified.
+        """
+        if not self.config.prompt_caching:
+            return kwargs
+        request = dict(kwargs)
+        request["messages"] = mark_messages(kwargs.get("messages", []))
+        tools = kwargs.get("tools")
+        if tools:
+            # Schema lists are cached per tool set, so the marked copy is too.
+            if self._marked_tools is None or self._marked_tools[0] is not tools:
+                self._marked_tools = (tools, mark_tools(tools))
+            request["tools"] = self._marked_tools[1]
+        return request
+
+    def _cache_lookup(self, request: Dict[str, Any]):
+        """Return (key, cached_response); both None when caching is off."""
+        cache = self.config.cache
+        if cache is None:
+            return None, None
+        key = completion_cache_key(self.config.model, request)
+        cached = cache.get(key)
+        if cached is None:
+            self._cache_misses += 1
+            if self.config.hooks:
+                self.config.hooks.on_cache_miss(key)
+        else:
+            self._cache_hits += 1
+            if self.config.hooks:
+                self.config.hooks.on_cache_hit(key)
+        return key, cached
+
     # ------------------------------------------------------------------
     # AgentResponse builder
     # ------------------------------------------------------------------
@@ -813,34 +1728,105 @@ class Agent:
     def _build_agent_response(
         self,
         content: str,
-        raw_response,
         tool_calls: List[ToolCall],
+        usage_log: List[tuple],
+        cache_start: tuple = (0, 0),
     ) -> AgentResponse:
-        prompt_tokens = None
-        completion_tokens = None
-        tokens_used = None
-        cost = None
-
-        if raw_response is not None:
-            try:
-                usage = raw_response.usage
-                prompt_tokens = getattr(usage, "prompt_tokens", None)
-                completion_tokens = getattr(usage, "completion_tokens", None)
-                tokens_used = getattr(usage, "total_tokens", None)
-            except AttributeError:
-                pass
-
-            try:
-                cost = litellm.completion_cost(completion_response=raw_response)
-            except Exception:
-                pass
-
-        return AgentResponse(
+        iterations = [
+            self._iteration_usage(i, response, latency, flags)
+            for i, (response, latency, flags) in enumerate(usage_log)
+        ]
+        # Totals cover provider calls only; cache hits and requests that
+        # shared another's call cost nothing.
+        billed = [it for it in iterations if not (it.cache_hit or it.coalesced)]
+
+        def total(field: str):
+            values = [getattr(it, field) for it in billed]
+            values = [v for v in values if v is not None]
+            return sum(values) if values else None
+
+        def compute_cost() -> Optional[float]:
+            for it, (response, _, _) in zip(iterations, usage_log):
+                if not (it.cache_hit or it.coalesced):
+                    it.cost = self._completion_cost(response, it)
+            return total("cost")
+
+        response = AgentResponse(
             content=content,
             tool_calls=tool_calls,
             model=self.config.model,
-            tokens_used=tokens_used,
-            cost=cost,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=completion_tokens,
+            tokens_used=total("total_tokens"),
+            prompt_tokens=total("prompt_tokens"),
+            completion_tokens=total("completion_tokens"),
+            cached_tokens=total("cached_tokens"),
+            cache_creation_tokens=total("cache_creation_tokens"),
+            cache_hits=self._cache_hits - cache_start[0],
+            cache_misses=self._cache_misses - cache_start[1],
+            iterations=iterations,
         )
+        if self.config.lazy_cost:
+            response._cost_factory = compute_cost
+        else:
+            response.cost = compute_cost()
+        return response
+
+    @staticmethod
+    def _iteration_usage(
+        index: int, response: Any, latency: float, flags: Dict[str, bool]
+    ) -> IterationUsage:
+        def _int(value: Any) -> Optional[int]:
+            return value if isinstance(value, int) else None
+
+        usage = getattr(response, "usage", None)
+        cached_tokens, cache_creation_tokens = cached_token_counts(usage)
+        return IterationUsage(
+            index=index,
+            latency=latency,
+            prompt_tokens=_int(getattr(usage, "prompt_tokens", None)),
+            completion_tokens=_int(getattr(usage, "completion_tokens", None)),
+            total_tokens=_int(getattr(usage, "total_tokens", None)),
+            cached_tokens=cached_tokens,
+            cache_creation_tokens=cache_creation_tokens,
+            cost=0.0 if flags.get("cache_hit") or flags.get("coalesced") else None,
+            **flags,
+        )
+
+    def _completion_cost(self, response: Any, usage: IterationUsage) -> Optional[float]:
+        """Cost from integer token counts and the cached pricing table.
+
+        Falls back to litellm.completion_cost for models without a price.
+        """
+        pricing = get_pricing(self.config.model)
+        if pricing is None and isinstance(getattr(response, "model", None), str):
+            pricing = get_pricing(response.model)
+        if (
+            pricing is not None
+            and usage.prompt_tokens is not None
+            and usage.completion_tokens is not None
+        ):
+            return pricing.cost(
+                usage.prompt_tokens,
+                usage.completion_tokens,
+                usage.cached_tokens or 0,
+                usage.cache_creation_tokens or 0,
+            )
+        try:
+            return litellm.completion_cost(completion_response=response)
+        except Exception:
+            return None
+
+
+class Session(Agent):
+    """One conversation on a shared Agent.
+
+    Created via ``agent.session(id)``. A session shares the agent's config,
+    tools list, schema cache and completion cache. It has its own history
+    and counters and the same run/stream API as Agent. Concurrent runs
+    should use different sessions. One session runs one turn at a time.
+    """
+
+    def __init__(self, agent: Agent, session_id: str):
+        self.__dict__.update(agent.__dict__)
+        self.agent = agent
+        self.id = session_id
+        self._init_conversation_state()
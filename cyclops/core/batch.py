@@ -0,0 +1,65 @@
+"""Bounded-concurrency batch execution for agents"""
+
+import asyncio
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional, Sequence
+
+from cyclops.core.types import BatchItem, BatchResponse
+
+if TYPE_CHECKING:
+    from cyclops.core.agent import Agent
+
+
+class BatchRun:
+    """Async iterator over a batch, yielding each BatchItem as it completes.
+
+    Each input runs in its own conversation; at most ``max_concurrency``
+    run at once. A failing input produces an item with ``error`` set and
+    does not stop the batch. ``response`` holds the aggregated
+    BatchResponse once iteration finishes; ``await batch.collect()`` runs
+    the whole batch and returns it directly.
+    """
+
+    def __init__(self, agent: "Agent", inputs: Sequence[str], max_concurrency: int):
+        self._agent = agent
+        self._inputs = list(inputs)
+        self._max_concurrency = max(1, max_concurrency)
+        self._items: List[BatchItem] = []
+        self.response: Optional[BatchResponse] = None
+
+    def __aiter__(self) -> AsyncIterator[BatchItem]:
+        return self._iterate()
+
+    async def collect(self) -> BatchResponse:
+        async for _ in self:
+            pass
+        assert self.response is not None
+        return self.response
+
+    async def _run_one(self, index: int, text: str) -> BatchItem:
+        try:
+            response = await self._agent._fork().arun_with_response(text)
+        except Exception as e:
+            return BatchItem(index=index, input=text, error=f"{type(e).__name__}: {e}")
+        return BatchItem(index=index, input=text, response=response)
+
+    async def _iterate(self) -> AsyncIterator[BatchItem]:
+        pending = iter(enumerate(self._inputs))
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def _worker() -> None:
+            # Workers share one iterator, so inputs are pulled only as slots free up.
+            for index, text in pending:
+                await results.put(await self._run_one(index, text))
+
+        n_workers = min(self._max_concurrency, len(self._inputs))
+        workers = [asyncio.create_task(_worker()) for _ in range(n_workers)]
+        try:
+            for _ in range(len(self._inputs)):
+                item = await results.get()
+                self._items.append(item)
+                yield item
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        self.response = BatchResponse.from_items(self._items)
@@ -0,0 +1,240 @@
+"""Completion response caching"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import litellm
+from litellm.types.utils import Delta, ModelResponseStream, StreamingChoices
+
+from cyclops.core.streaming import aclose_stream, close_stream
+
+# Request kwargs that don't change the completion itself
+_UNKEYED_PARAMS = ("messages", "stream", "stream_options")
+_MESSAGE_KEYS = ("role", "content", "tool_calls", "tool_call_id", "name")
+
+
+def _normalize_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        k: message[k] for k in _MESSAGE_KEYS if k in message and message[k] is not None
+    }
+
+
+def completion_cache_key(model: str, request: Dict[str, Any]) -> str:
+    """Stable key over model, normalized messages, tool schema and sampling params.
+
+    ``stream`` is excluded, so a streamed request can be served from a
+    non-streamed response and vice versa.
+    """
+    payload = {
+        "model": model,
+        "messages": [_normalize_message(m) for m in request.get("messages", [])],
+        "params": {
+            k: v
+            for k, v in request.items()
+            if k not in _UNKEYED_PARAMS and v is not None
+        },
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def replay_chunks(response: Any) -> List[ModelResponseStream]:
+    """Turn a complete response into stream chunks so a cache hit can be streamed."""
+    message = response.choices[0].message
+    tool_calls = [
+        {
+            "index": i,
+            "id": tc.id,
+            "type": "function",
+            "function": {
+                "name": tc.function.name,
+                "arguments": tc.function.arguments,
+            },
+        }
+        for i, tc in enumerate(message.tool_calls or [])
+    ]
+    delta = Delta(content=message.content, tool_calls=tool_calls or None)
+    finish_reason = response.choices[0].finish_reason or "stop"
+    return [
+        ModelResponseStream(
+            model=response.model,
+            choices=[StreamingChoices(delta=delta, finish_reason=finish_reason)],
+        )
+    ]
+
+
+def replay_stream(response: Any) -> Iterator[ModelResponseStream]:
+    return iter(replay_chunks(response))
+
+
+async def areplay_stream(response: Any) -> AsyncIterator[ModelResponseStream]:
+    for chunk in replay_chunks(response):
+        yield chunk
+
+
+class CacheStats:
+    """Hit/miss counters for a cache."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class CompletionCache(ABC):
+    """Abstract completion cache. Backends store full (non-streamed) responses."""
+
+    def __init__(self) -> None:
+        self.stats = CacheStats()
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[Any]:
+        """Return the cached response for key, or None."""
+
+    @abstractmethod
+    def set(self, key: str, response: Any) -> None:
+        """Store a complete response under key."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove all entries."""
+
+    def get(self, key: str) -> Optional[Any]:
+        response = self._get(key)
+        if response is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return response
+
+    def wrap_stream(
+        self, key: str, stream: Iterator[Any], messages: List[Dict[str, Any]]
+    ) -> Iterator[Any]:
+        """Pass a live stream through and cache the assembled response once it ends.
+
+        Closing the wrapper early closes the provider stream and caches nothing.
+        """
+        chunks: List[Any] = []
+        try:
+            for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            close_stream(stream)
+        self._store_chunks(key, chunks, messages)
+
+    async def awrap_stream(
+        self, key: str, stream: AsyncIterator[Any], messages: List[Dict[str, Any]]
+    ) -> AsyncIterator[Any]:
+        chunks: List[Any] = []
+        try:
+            async for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            await aclose_stream(stream)
+        self._store_chunks(key, chunks, messages)
+
+    def _store_chunks(
+        self, key: str, chunks: List[Any], messages: List[Dict[str, Any]]
+    ) -> None:
+        if not chunks:
+            return
+        response = litellm.stream_chunk_builder(chunks, messages=messages)
+        if response is not None:
+            self.set(key, response)
+
+
+class InMemoryCompletionCache(CompletionCache):
+    """Thread-safe in-process LRU cache with optional TTL (seconds)."""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, response = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def set(self, key: str, response: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCompletionCache(CompletionCache):
+    """Persistent cache in a SQLite file, shareable between processes."""
+
+    def __init__(self, path: str, ttl: Optional[float] = None):
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions "
+                "(key TEXT PRIMARY KEY, created_at REAL NOT NULL, response TEXT NOT NULL)"
+            )
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, response FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            created_at, data = row
+            if self.ttl is not None and time.time() - created_at > self.ttl:
+                with self._conn:
+                    self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                return None
+        return litellm.ModelResponse(**json.loads(data))
+
+    def set(self, key: str, response: Any) -> None:
+        data = response.model_dump_json()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, created_at, response) "
+                "VALUES (?, ?, ?)",
+                (key, time.time(), data),
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM completions")
+
+    def close(self) -> None:
+        self._conn.close()
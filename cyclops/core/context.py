@@ -0,0 +1,253 @@
+"""Token-budgeted context window management for long conversations"""
+
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+import litellm
+
+from cyclops.core.history import ConversationHistory
+
+logger = logging.getLogger(__name__)
+
+_SUMMARY_PROMPT = (
+    "Summarize the following conversation so it can replace the original "
+    "messages. Keep facts, decisions, open questions and tool results that "
+    "later turns may rely on. Be concise."
+)
+_SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def _format_transcript(messages: List[Dict[str, Any]]) -> str:
+    lines = []
+    for m in messages:
+        content = m.get("content")
+        if m.get("tool_calls"):
+            calls = ", ".join(
+                f"{tc['function']['name']}({tc['function']['arguments']})"
+                for tc in m["tool_calls"]
+            )
+            content = f"{content or ''} [called {calls}]".strip()
+        lines.append(f"{m.get('role')}: {content or ''}")
+    return "\n".join(lines)
+
+
+class ContextStrategy(ABC):
+    """Decides which older messages to evict when a request is over budget."""
+
+    @abstractmethod
+    def select(
+        self, messages: List[Dict[str, Any]], counts: List[int], excess: int
+    ) -> int:
+        """Return how many leading messages to evict to free ``excess`` tokens.
+
+        ``messages`` holds only the evictable part of the history; the current
+        turn is never offered.
+        """
+
+    def replacement(
+        self, evicted: List[Dict[str, Any]], model: str
+    ) -> List[Dict[str, Any]]:
+        """Messages to insert in place of the evicted prefix. Default: none."""
+        return []
+
+    async def areplacement(
+        self, evicted: List[Dict[str, Any]], model: str
+    ) -> List[Dict[str, Any]]:
+        return self.replacement(evicted, model)
+
+
+class DropOldest(ContextStrategy):
+    """Evict the oldest messages until the request fits."""
+
+    def select(
+        self, messages: List[Dict[str, Any]], counts: List[int], excess: int
+    ) -> int:
+        freed = 0
+        for i, n in enumerate(counts):
+            if freed >= excess:
+                return i
+            freed += n
+        return len(counts)
+
+
+class KeepToolPairs(DropOldest):
+    """Like DropOldest, but never separates tool results from their tool call.
+
+    Providers reject a "tool" message whose assistant tool_calls message is
+    gone, so the cut is moved forward past any orphaned results.
+    """
+
+    def select(
+        self, messages: List[Dict[str, Any]], counts: List[int], excess: int
+    ) -> int:
+        cut = super().select(messages, counts, excess)
+        while cut < len(messages) and messages[cut].get("role") == "tool":
+            cut += 1
+        return cut
+
+
+class SummarizeOlder(KeepToolPairs):
+    """Replace older turns with an LLM-written summary.
+
+    At least ``fraction`` of the evictable tokens are summarized at once, so
+    summaries are produced occasionally rather than on every request.
+    Uses the agent's model unless ``model`` or a custom ``summarizer`` is given.
+    """
+
+    def __init__(
+        self,
+        fraction: float = 0.5,
+        model: Optional[str] = None,
+        summarizer: Optional[Callable[[List[Dict[str, Any]]], str]] = None,
+    ):
+        self.fraction = fraction
+        self.model = model
+        self.summarizer = summarizer
+
+    def select(
+        self, messages: List[Dict[str, Any]], counts: List[int], excess: int
+    ) -> int:
+        target = max(excess, int(sum(counts) * self.fraction))
+        return super().select(messages, counts, target)
+
+    def _summary_request(self, evicted: List[Dict[str, Any]], model: str):
+        return {
+            "model": self.model or model,
+            "messages": [
+                {"role": "system", "content": _SUMMARY_PROMPT},
+                {"role": "user", "content": _format_transcript(evicted)},
+            ],
+            "temperature": 0,
+        }
+
+    def _summary_message(self, summary: str) -> List[Dict[str, Any]]:
+        return [{"role": "user", "content": _SUMMARY_PREFIX + summary}]
+
+    def replacement(
+        self, evicted: List[Dict[str, Any]], model: str
+    ) -> List[Dict[str, Any]]:
+        if self.summarizer is not None:
+            return self._summary_message(self.summarizer(evicted))
+        response = litellm.completion(**self._summary_request(evicted, model))
+        return self._summary_message(response.choices[0].message.content or "")
+
+    async def areplacement(
+        self, evicted: List[Dict[str, Any]], model: str
+    ) -> List[Dict[str, Any]]:
+        if self.summarizer is not None:
+            return self._summary_message(self.summarizer(evicted))
+        response = await litellm.acompletion(**self._summary_request(evicted, model))
+        return self._summary_message(response.choices[0].message.content or "")
+
+
+class ContextWindow:
+    """Keeps each request within a prompt-token budget.
+
+    Before every completion the agent asks the window to fit its history.
+    Per-message token counts are memoized on the history, so each message is
+    counted once. When the request (system prompt + tools + history) exceeds
+    ``max_tokens``, the strategy evicts older messages from the history
+    itself. Everything from the latest user message onward is kept.
+
+    Usage:
+        AgentConfig(model=..., context_window=ContextWindow(8000))
+        ContextWindow(8000, strategy=SummarizeOlder())
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        strategy: Optional[ContextStrategy] = None,
+        token_counter: Optional[Callable[[Dict[str, Any], str], int]] = None,
+    ):
+        self.max_tokens = max_tokens
+        self.strategy = strategy or KeepToolPairs()
+        self._token_counter = token_counter
+        self._tools_tokens: Optional[tuple] = None  # (tools list, count)
+        self._system_tokens: Optional[tuple] = None  # ((model, prompt), count)
+
+    def count_message(self, message: Dict[str, Any], model: str) -> int:
+        if self._token_counter is not None:
+            return self._token_counter(message, model)
+        return litellm.token_counter(model=model, messages=[message])
+
+    def _count_tools(self, tools: Optional[List[Dict[str, Any]]], model: str) -> int:
+        if not tools:
+            return 0
+        # Tool schema lists are cached and shared, so identity is a good key.
+        if self._tools_tokens is None or self._tools_tokens[0] is not tools:
+            n = litellm.token_counter(model=model, text=json.dumps(tools))
+            self._tools_tokens = (tools, n)
+        return self._tools_tokens[1]
+
+    def _count_system(self, messages: List[Dict[str, Any]], model: str) -> int:
+        """Tokens in the messages ahead of the history (the system prompt).
+        The prompt rarely changes, so its count is kept per model and text."""
+        if not messages:
+            return 0
+        key = (model, json.dumps(messages, sort_keys=True, default=str))
+        if self._system_tokens is None or self._system_tokens[0] != key:
+            n = sum(self.count_message(m, model) for m in messages)
+            self._system_tokens = (key, n)
+        return self._system_tokens[1]
+
+    def _plan(
+        self,
+        history: ConversationHistory,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict[str, Any]]],
+        model: str,
+    ) -> Optional[tuple]:
+        """Return (evictable messages, eviction count) or None if within budget."""
+        counts = history.token_counts(lambda m: self.count_message(m, model))
+        overhead = self._count_tools(tools, model) + self._count_system(
+            messages[: len(messages) - len(history)], model
+        )
+        excess = overhead + sum(counts) - self.max_tokens
+        if excess <= 0:
+            return None
+
+        protected = len(history) - 1
+        while protected > 0 and history[protected].get("role") != "user":
+            protected -= 1
+        evictable = [history[i] for i in range(protected)]
+        cut = self.strategy.select(evictable, counts[:protected], excess)
+        if cut <= 0:
+            logger.warning(
+                "Context is %d tokens over budget but nothing can be evicted", excess
+            )
+            return None
+        return evictable, cut
+
+    def fit(
+        self,
+        history: ConversationHistory,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict[str, Any]]],
+        model: str,
+    ) -> int:
+        """Evict from ``history`` until the request fits. Returns messages evicted."""
+        plan = self._plan(history, messages, tools, model)
+        if plan is None:
+            return 0
+        evictable, cut = plan
+        history.replace_prefix(cut, self.strategy.replacement(evictable[:cut], model))
+        return cut
+
+    async def afit(
+        self,
+        history: ConversationHistory,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict[str, Any]]],
+        model: str,
+    ) -> int:
+        """Async fit; summarizing strategies call the model without blocking."""
+        plan = self._plan(history, messages, tools, model)
+        if plan is None:
+            return 0
+        evictable, cut = plan
+        replacement = await self.strategy.areplacement(evictable[:cut], model)
+        history.replace_prefix(cut, replacement)
+        return cut
@@ -0,0 +1,173 @@
+"""Hedged completion requests: a duplicate call when the first one is slow"""
+
+import asyncio
+import threading
+from collections import deque
+from types import SimpleNamespace
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+)
+
+from cyclops.core.streaming import aclose_stream
+
+
+class HedgingPolicy:
+    """When AgentConfig.hedging sends a duplicate completion request.
+
+    Once ``min_samples`` latencies have been observed for a model, an async
+    request that has not returned after the ``percentile`` of the last
+    ``window`` latencies gets one duplicate. The first response wins and
+    the other request is cancelled. ``delay`` fixes the threshold instead
+    of learning it; ``min_delay`` keeps fast models from hedging on jitter.
+
+    Latency is the time to the full response, or to the first chunk of a
+    stream. Share one policy between agents to pool their observations.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        min_samples: int = 20,
+        window: int = 200,
+        delay: Optional[float] = None,
+        min_delay: float = 0.0,
+    ):
+        if not 0 < percentile < 1:
+            raise ValueError("percentile must be between 0 and 1")
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self.delay = delay
+        self.min_delay = min_delay
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def threshold(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging a request to ``model``, or None
+        while too few latencies have been observed."""
+        if self.delay is not None:
+            return self.delay
+        with self._lock:
+            samples = sorted(self._latencies.get(model, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(self.percentile * len(samples)))
+        return max(self.min_delay, samples[index])
+
+    def observe(self, model: str, latency: float) -> None:
+        with self._lock:
+            samples = self._latencies.get(model)
+            if samples is None:
+                samples = self._latencies[model] = deque(maxlen=self.window)
+            samples.append(latency)
+
+
+class HedgeOutcome(NamedTuple):
+    result: Any
+    hedged: bool
+    # Seconds each attempt ran until it finished or was cancelled
+    latencies: List[float]
+    winner: int
+    # Result of the losing attempt if it finished successfully too
+    loser: Any = None
+
+
+async def run_hedged(
+    attempt: Callable[[bool], Awaitable[Any]], delay: Optional[float]
+) -> HedgeOutcome:
+    """Await ``attempt(False)``. If it is still running after ``delay``
+    seconds, start ``attempt(True)`` as well and return the first success;
+    the slower attempt is cancelled. Raises the primary's error if every
+    attempt fails."""
+    loop = asyncio.get_running_loop()
+    tasks: List[asyncio.Future] = []
+    latencies: List[float] = []
+
+    def start(hedge: bool) -> None:
+        index, started = len(tasks), loop.time()
+        latencies.append(0.0)
+
+        def finished(_):
+            latencies[index] = loop.time() - started
+
+        task = asyncio.ensure_future(attempt(hedge))
+        task.add_done_callback(finished)
+        tasks.append(task)
+
+    start(False)
+    try:
+        if delay is not None:
+            await asyncio.wait(tasks, timeout=delay)
+            if not tasks[0].done():
+                start(True)
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for index, task in enumerate(tasks):
+                if task in done and not task.cancelled() and task.exception() is None:
+                    return _outcome(tasks, latencies, index)
+        return HedgeOutcome(tasks[0].result(), len(tasks) > 1, latencies, 0)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _outcome(
+    tasks: List[asyncio.Future], latencies: List[float], winner: int
+) -> HedgeOutcome:
+    loser = None
+    for index, task in enumerate(tasks):
+        if index != winner and task.done() and not task.cancelled():
+            if task.exception() is None:
+                loser = task.result()
+    return HedgeOutcome(
+        tasks[winner].result(), len(tasks) > 1, latencies, winner, loser
+    )
+
+
+def cancelled_hedge_response(winner: Any) -> Any:
+    """Usage stand-in for a request cancelled after losing the race. The
+    provider may still bill its prompt, so it counts the winner's prompt
+    tokens and no completion tokens."""
+    prompt = getattr(getattr(winner, "usage", None), "prompt_tokens", None)
+    prompt = prompt if isinstance(prompt, int) else None
+    usage = SimpleNamespace(
+        prompt_tokens=prompt, completion_tokens=0, total_tokens=prompt
+    )
+    return SimpleNamespace(usage=usage, model=getattr(winner, "model", None))
+
+
+async def prefetched(stream: Any) -> AsyncIterator[Any]:
+    """Wait for a stream's first chunk and return a stream that yields it
+    followed by the rest, so a hedge races on time to first chunk."""
+    try:
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        return _replay([], stream)
+    except BaseException:  # including cancellation by the winning attempt
+        await aclose_stream(stream)
+        raise
+    return _replay([first], stream)
+
+
+async def _replay(head: List[Any], stream: Any) -> AsyncIterator[Any]:
+    try:
+        for chunk in head:
+            yield chunk
+        if head:
+            async for chunk in stream:
+                yield chunk
+    finally:
+        await aclose_stream(stream)
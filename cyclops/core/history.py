@@ -0,0 +1,93 @@
+"""Conversation history buffer for agents"""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+
+class ConversationHistory:
+    """Store of LiteLLM-format message dicts, optimized for appending.
+
+    Building a request does not copy the conversation. Without a system
+    prompt the backing list is sent as-is. With one, a second list of the
+    form ``[system] + conversation`` is created on first use and then
+    extended in step with every append. Each turn therefore costs O(1)
+    instead of O(n).
+
+    The lists returned by request_messages() are owned by the history.
+    Treat them as read-only and copy them if you need a snapshot.
+    """
+
+    def __init__(self, messages: Optional[Iterable[Dict[str, Any]]] = None):
+        self._messages: List[Dict[str, Any]] = list(messages or [])
+        self._framed: Optional[List[Dict[str, Any]]] = None
+        # id(message) -> token count; safe because the list keeps each message alive
+        self._token_counts: Dict[int, int] = {}
+
+    def append(self, message: Dict[str, Any]) -> None:
+        self._messages.append(message)
+        if self._framed is not None:
+            self._framed.append(message)
+
+    def extend(self, messages: Iterable[Dict[str, Any]]) -> None:
+        for message in messages:
+            self.append(message)
+
+    def pop(self, index: int = -1) -> Dict[str, Any]:
+        message = self._messages.pop(index)
+        if self._framed is not None:
+            self._framed.pop(index if index < 0 else index + 1)
+        self._token_counts.pop(id(message), None)
+        return message
+
+    def replace_prefix(
+        self, count: int, replacement: Iterable[Dict[str, Any]] = ()
+    ) -> List[Dict[str, Any]]:
+        """Remove the first ``count`` messages, insert ``replacement``, return the removed."""
+        removed = self._messages[:count]
+        new = list(replacement)
+        self._messages[:count] = new
+        if self._framed is not None:
+            self._framed[1 : count + 1] = new
+        for message in removed:
+            self._token_counts.pop(id(message), None)
+        return removed
+
+    def clear(self) -> None:
+        self._messages.clear()
+        self._framed = None
+        self._token_counts.clear()
+
+    def token_counts(self, counter: Callable[[Dict[str, Any]], int]) -> List[int]:
+        """Per-message token counts, calling ``counter`` only for new messages."""
+        memo = self._token_counts
+        counts = []
+        for message in self._messages:
+            n = memo.get(id(message))
+            if n is None:
+                n = memo[id(message)] = counter(message)
+            counts.append(n)
+        return counts
+
+    def request_messages(
+        self, system_prompt: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Return the message list for a completion request without copying."""
+        if not system_prompt:
+            return self._messages
+        if self._framed is None:
+            self._framed = [{"role": "system", "content": system_prompt}]
+            self._framed.extend(self._messages)
+        elif self._framed[0]["content"] != system_prompt:
+            self._framed[0] = {"role": "system", "content": system_prompt}
+        return self._framed
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._messages)
+
+    def __getitem__(self, index):
+        return self._messages[index]
+
+    def __bool__(self) -> bool:
+        return bool(self._messages)
@@ -19,7 +19,11 @@ class AgentHooks:
         """Fired when a non-streaming run completes (not called for stream/astream)."""
 
     def on_llm_start(self, messages: List[Dict[str, Any]]) -> None:
-        """Fired before each LiteLLM completion call."""
+        """Fired before each LiteLLM completion call.
+
+        messages is the agent's live request list, not a copy. Treat it as
+        read-only and copy it if you keep it beyond the call.
+        """
 
     def on_llm_end(self, response: Any) -> None:
         """Fired after each non-streaming LiteLLM completion call."""
@@ -27,6 +31,12 @@ class AgentHooks:
     def on_llm_error(self, error: Exception) -> None:
         """Fired when a LiteLLM call raises."""
 
+    def on_cache_hit(self, key: str) -> None:
+        """Fired when a completion is served from AgentConfig.cache."""
+
+    def on_cache_miss(self, key: str) -> None:
+        """Fired when AgentConfig.cache has no entry and the provider is called."""
+
     def on_tool_start(self, tool_name: str, args: Dict[str, Any]) -> Optional[str]:
         """Fired before each tool execution.
 
@@ -34,6 +44,20 @@ class AgentHooks:
         """
         return "allow"
 
+    def on_tool_cache_hit(
+        self, tool_name: str, args: Dict[str, Any], stats: Any
+    ) -> None:
+        """Fired when an approved tool call is served from the tool's cache.
+
+        stats is the cache's ToolCacheStats (hits, misses, hit_rate).
+        on_tool_end still fires with the cached result.
+        """
+
+    def on_tool_cache_miss(
+        self, tool_name: str, args: Dict[str, Any], stats: Any
+    ) -> None:
+        """Fired when a cached tool has no entry for the call and runs."""
+
     def on_tool_end(self, tool_name: str, args: Dict[str, Any], result: str) -> None:
         """Fired after successful tool execution."""
 
@@ -0,0 +1,102 @@
+"""Per-model token pricing, resolved once per model and cached"""
+
+import threading
+from typing import Dict, Optional
+
+import litellm
+
+
+class ModelPricing:
+    """USD cost per token for one model.
+
+    Cache rates fall back to the input rate when the provider has no
+    separate price.
+    """
+
+    __slots__ = ("input", "output", "cache_read", "cache_creation")
+
+    def __init__(
+        self,
+        input: float,
+        output: float,
+        cache_read: Optional[float] = None,
+        cache_creation: Optional[float] = None,
+    ):
+        self.input = input
+        self.output = output
+        self.cache_read = input if cache_read is None else cache_read
+        self.cache_creation = input if cache_creation is None else cache_creation
+
+    def cost(
+        self,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached_tokens: int = 0,
+        cache_creation_tokens: int = 0,
+    ) -> float:
+        """Cost of one completion. ``prompt_tokens`` includes the cached ones."""
+        uncached = max(prompt_tokens - cached_tokens - cache_creation_tokens, 0)
+        return (
+            uncached * self.input
+            + cached_tokens * self.cache_read
+            + cache_creation_tokens * self.cache_creation
+            + completion_tokens * self.output
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"ModelPricing(input={self.input}, output={self.output}, "
+            f"cache_read={self.cache_read}, cache_creation={self.cache_creation})"
+        )
+
+
+_lock = threading.Lock()
+_registered: Dict[str, ModelPricing] = {}
+_resolved: Dict[str, Optional[ModelPricing]] = {}
+
+
+def _from_litellm(model: str) -> Optional[ModelPricing]:
+    try:
+        info = litellm.get_model_info(model)
+    except Exception:
+        return None
+    input_rate = info.get("input_cost_per_token")
+    output_rate = info.get("output_cost_per_token")
+    if input_rate is None or output_rate is None:
+        return None
+    return ModelPricing(
+        input_rate,
+        output_rate,
+        info.get("cache_read_input_token_cost"),
+        info.get("cache_creation_input_token_cost"),
+    )
+
+
+def get_pricing(model: str) -> Optional[ModelPricing]:
+    """Pricing for ``model``, or None if unknown.
+
+    Registered prices win; otherwise LiteLLM's model map is consulted once
+    and the result (including a miss) is cached for the process.
+    """
+    with _lock:
+        if model in _registered:
+            return _registered[model]
+        if model in _resolved:
+            return _resolved[model]
+    pricing = _from_litellm(model)
+    with _lock:
+        _resolved[model] = pricing
+    return pricing
+
+
+def register_pricing(model: str, pricing: ModelPricing) -> None:
+    """Set or override the pricing for a model, e.g. a fine-tune or proxy alias."""
+    with _lock:
+        _registered[model] = pricing
+
+
+def clear_pricing_cache() -> None:
+    """Forget resolved and registered prices."""
+    with _lock:
+        _registered.clear()
+        _resolved.clear()
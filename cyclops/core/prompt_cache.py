@@ -0,0 +1,67 @@
+"""Cache-control breakpoints for provider-side prompt caching"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+_EPHEMERAL = {"type": "ephemeral"}
+
+
+def _mark_message(message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Copy of message with a breakpoint on its last content part, or None."""
+    content = message.get("content")
+    if isinstance(content, str) and content:
+        parts = [{"type": "text", "text": content, "cache_control": _EPHEMERAL}]
+    elif isinstance(content, list) and content:
+        parts = list(content)
+        parts[-1] = {**parts[-1], "cache_control": _EPHEMERAL}
+    else:
+        return None
+    return {**message, "content": parts}
+
+
+def mark_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return a new request list with breakpoints on the system prompt and the
+    newest message that has content.
+
+    The newest message is marked so the following request, which extends the
+    same prefix, can read everything before it from the provider's cache.
+    The history's own dicts are never modified.
+    """
+    marked = list(messages)
+    first = 0
+    if marked and marked[0].get("role") == "system":
+        marked[0] = _mark_message(marked[0]) or marked[0]
+        first = 1
+    for i in range(len(marked) - 1, first - 1, -1):
+        message = _mark_message(marked[i])
+        if message is not None:
+            marked[i] = message
+            break
+    return marked
+
+
+def mark_tools(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return a copy of a tool schema list with a breakpoint on the last tool,
+    which caches the whole tool block."""
+    if not tools:
+        return tools
+    return tools[:-1] + [{**tools[-1], "cache_control": _EPHEMERAL}]
+
+
+def cached_token_counts(usage: Any) -> Tuple[Optional[int], Optional[int]]:
+    """(tokens read from, tokens written to) the provider's prompt cache.
+
+    OpenAI reports reads in prompt_tokens_details.cached_tokens; Anthropic
+    reports cache_read_input_tokens / cache_creation_input_tokens.
+    """
+
+    def _int(value: Any) -> Optional[int]:
+        return value if isinstance(value, int) else None
+
+    details = getattr(usage, "prompt_tokens_details", None)
+    read = _int(getattr(usage, "cache_read_input_tokens", None))
+    if read is None:
+        read = _int(getattr(details, "cached_tokens", None))
+    written = _int(getattr(usage, "cache_creation_input_tokens", None))
+    if written is None:
+        written = _int(getattr(details, "cache_creation_tokens", None))
+    return read, written
@@ -0,0 +1,124 @@
+"""Client-side request and token rate limiting for completions"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+_WINDOW = 60.0
+
+
+class _Bucket:
+    """Token bucket refilled at ``per_minute`` per minute, holding at most one
+    minute's worth. The level may go negative: that is capacity promised to
+    callers who are still waiting for it."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / _WINDOW
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def charge(self, amount: float) -> float:
+        """What take() reserves for ``amount``: an oversized request waits
+        for a full bucket instead of forever."""
+        return min(amount, self.capacity)
+
+    def take(self, amount: float, now: float) -> float:
+        """Reserve ``amount`` and return the seconds until it is covered."""
+        self._refill(now)
+        self.level -= self.charge(amount)
+        return max(0.0, -self.level / self.rate)
+
+    def give(self, amount: float, now: float) -> None:
+        """Return ``amount`` to the bucket; a negative amount charges it."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for completions.
+
+    Pass the same instance as ``AgentConfig.rate_limiter`` to every agent
+    that shares a quota, or use shared_rate_limiter() to get one per model
+    or API key. Callers reserve capacity in arrival order and sleep until
+    their share has refilled, so a burst of calls is spread out first come,
+    first served instead of running into 429s.
+
+    The token cost of a call is estimated up front (prompt tokens plus
+    ``max_tokens``) and corrected with the usage the provider reports.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        if rpm is not None and rpm <= 0 or tpm is not None and tpm <= 0:
+            raise ValueError("rpm and tpm must be positive")
+        self.rpm = rpm
+        self.tpm = tpm
+        self._lock = threading.Lock()
+        self._requests = _Bucket(rpm) if rpm is not None else None
+        self._tokens = _Bucket(tpm) if tpm is not None else None
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self._requests is not None:
+                wait = self._requests.take(1, now)
+            if self._tokens is not None and tokens:
+                wait = max(wait, self._tokens.take(tokens, now))
+            return wait
+
+    def _refund(self, requests: int, tokens: int) -> None:
+        """Give back what _reserve() charged for ``requests`` and ``tokens``."""
+        with self._lock:
+            now = time.monotonic()
+            if self._requests is not None and requests:
+                self._requests.give(self._requests.charge(requests), now)
+            if self._tokens is not None and tokens:
+                self._tokens.give(self._tokens.charge(tokens), now)
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until one request of about ``tokens`` tokens may be sent."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        """Async acquire(). A cancelled waiter gives its reservation back."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._refund(1, tokens)
+                raise
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Correct a reservation of ``estimated`` tokens once the real usage
+        is known. ``actual=None`` keeps the estimate."""
+        if self._tokens is None or actual is None or actual == estimated:
+            return
+        with self._lock:
+            charged = self._tokens.charge(estimated)
+            self._tokens.give(charged - actual, time.monotonic())
+
+
+_shared: Dict[str, RateLimiter] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_rate_limiter(
+    key: str, rpm: Optional[float] = None, tpm: Optional[float] = None
+) -> RateLimiter:
+    """The process-wide RateLimiter for ``key``, e.g. a model name or an API
+    key. Created with ``rpm``/``tpm`` on first use; later calls return the
+    same instance and ignore the limits."""
+    with _shared_lock:
+        limiter = _shared.get(key)
+        if limiter is None:
+            limiter = _shared[key] = RateLimiter(rpm=rpm, tpm=tpm)
+        return limiter
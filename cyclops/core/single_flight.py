@@ -0,0 +1,184 @@
+"""Single-flight sharing of identical in-flight completion requests"""
+
+import asyncio
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from cyclops.core.streaming import aclose_stream
+
+
+def is_deterministic(request: Dict[str, Any]) -> bool:
+    """Whether identical requests should get the same answer: greedy
+    sampling and a single choice."""
+    return request.get("temperature") == 0 and (request.get("n") or 1) == 1
+
+
+_Key = Tuple[int, Hashable]
+
+
+class _Call:
+    def __init__(self, key: _Key, task: asyncio.Future):
+        self.key = key
+        self.task = task
+        self.waiters = 0
+
+
+class _Stream:
+    """One provider stream read into a buffer that every subscriber replays
+    from the start at its own pace."""
+
+    def __init__(self, key: _Key) -> None:
+        self.key = key
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.opened: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.pump: Optional[asyncio.Future] = None
+        self._changed = asyncio.Event()
+
+    def notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self) -> None:
+        await self._changed.wait()
+
+
+class SingleFlight:
+    """Shares one provider call between concurrent identical requests.
+
+    The first request for a key (the leader) makes the call; requests with
+    the same key that arrive while it is in flight wait for its result
+    instead of sending their own. A stream is read once and fanned out:
+    each subscriber gets every chunk from the first. The call is cancelled
+    only when everyone waiting on it has gone away. Keys are scoped to the
+    running event loop.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[_Key, Union[_Call, _Stream]] = {}
+
+    def _key(self, key: Hashable) -> _Key:
+        return id(asyncio.get_running_loop()), key
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def call(
+        self, key: Hashable, fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """Await ``fn()`` or the identical call already in flight.
+
+        Returns (result, shared); ``shared`` is False for the leader.
+        """
+        scoped = self._key(key)
+        found = self._flights.get(scoped)
+        shared = isinstance(found, _Call)
+        if isinstance(found, _Call):
+            flight = found
+        else:
+            flight = _Call(scoped, asyncio.ensure_future(fn()))
+            self._flights[scoped] = flight
+            flight.task.add_done_callback(lambda _: self._forget(flight))
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self._forget(flight)
+                flight.task.cancel()
+
+    async def stream(
+        self, key: Hashable, open_stream: Callable[[], Awaitable[Any]]
+    ) -> Tuple[AsyncIterator[Any], bool]:
+        """Subscribe to the stream ``open_stream()`` returns, or to the
+        identical one already in flight.
+
+        Returns (stream, shared). Errors opening the stream are raised here
+        for the leader; subscribers who joined meanwhile get them while
+        iterating.
+        """
+        scoped = self._key(key)
+        found = self._flights.get(scoped)
+        shared = isinstance(found, _Stream)
+        if isinstance(found, _Stream):
+            flight = found
+        else:
+            flight = _Stream(scoped)
+            self._flights[scoped] = flight
+            flight.pump = asyncio.ensure_future(self._pump(flight, open_stream))
+        flight.subscribers += 1
+        if not shared:
+            try:
+                await asyncio.shield(flight.opened)
+            except BaseException:
+                self._unsubscribe(flight)
+                raise
+        return self._subscribe(flight), shared
+
+    async def _pump(
+        self, flight: _Stream, open_stream: Callable[[], Awaitable[Any]]
+    ) -> None:
+        source = None
+        try:
+            source = await open_stream()
+            flight.opened.set_result(None)
+            async for chunk in source:
+                flight.chunks.append(chunk)
+                flight.notify()
+        except BaseException as e:
+            flight.error = e
+            if not isinstance(e, Exception):
+                flight.opened.cancel()
+                raise
+            if not flight.opened.done():
+                flight.opened.set_exception(e)
+                flight.opened.exception()  # retrieved here if no leader waits
+        finally:
+            flight.done = True
+            flight.notify()
+            self._forget(flight)
+            if source is not None:
+                await aclose_stream(source)
+
+    async def _subscribe(self, flight: _Stream) -> AsyncIterator[Any]:
+        index = 0
+        try:
+            while True:
+                if index < len(flight.chunks):
+                    yield flight.chunks[index]
+                    index += 1
+                elif flight.done:
+                    if isinstance(flight.error, Exception):
+                        raise flight.error
+                    if flight.error is not None:
+                        raise RuntimeError("shared completion stream was cancelled")
+                    return
+                else:
+                    await flight.wait()
+        finally:
+            self._unsubscribe(flight)
+
+    def _unsubscribe(self, flight: _Stream) -> None:
+        flight.subscribers -= 1
+        if flight.subscribers == 0 and not flight.done:
+            self._forget(flight)
+            if flight.pump is not None:
+                flight.pump.cancel()
+
+    def _forget(self, flight: Union[_Call, _Stream]) -> None:
+        """Stop new requests from joining ``flight``."""
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
@@ -0,0 +1,386 @@
+"""Helpers for consuming LiteLLM completion streams in the agent tool loop"""
+
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set
+
+
+def _is_json_object(text: str) -> bool:
+    if not text.rstrip().endswith("}"):
+        return False
+    try:
+        return isinstance(json.loads(text), dict)
+    except ValueError:
+        return False
+
+
+class StreamedFunction:
+    """Function name and (possibly partial) JSON arguments of a streamed tool call."""
+
+    def __init__(self, name: str = "", arguments: str = ""):
+        self.name = name
+        self.arguments = arguments
+
+
+class StreamedToolCall:
+    """A tool call assembled from stream deltas.
+
+    Exposes the same ``id`` / ``function.name`` / ``function.arguments``
+    shape as LiteLLM's non-streaming tool calls, so the agent's tool
+    helpers accept either.
+    """
+
+    def __init__(self, id: str = "", name: str = ""):
+        self.id = id
+        self.type = "function"
+        self.function = StreamedFunction(name)
+
+
+class StreamedTurn:
+    """Accumulates one streamed assistant turn: content text plus tool calls."""
+
+    def __init__(self) -> None:
+        self._content: List[str] = []
+        self._calls: Dict[int, StreamedToolCall] = {}
+        self._taken: Set[int] = set()
+
+    def feed(self, chunk: Any) -> str:
+        """Consume one stream chunk and return its content delta ("" if none)."""
+        if not chunk.choices:
+            return ""
+        delta = chunk.choices[0].delta
+        for tc_delta in getattr(delta, "tool_calls", None) or []:
+            self._add_tool_call_delta(tc_delta)
+        text = delta.content or ""
+        if text:
+            self._content.append(text)
+        return text
+
+    def _add_tool_call_delta(self, tc_delta: Any) -> None:
+        index = getattr(tc_delta, "index", None)
+        tc_id = getattr(tc_delta, "id", None)
+        if index is None:
+            # Providers that omit the index send a fresh id for each new call.
+            is_new = not self._calls or (
+                tc_id and all(c.id != tc_id for c in self._calls.values())
+            )
+            index = len(self._calls) if is_new else max(self._calls)
+
+        call = self._calls.get(index)
+        if call is None:
+            call = self._calls[index] = StreamedToolCall()
+        if tc_id:
+            call.id = tc_id
+        fn = getattr(tc_delta, "function", None)
+        if fn is not None:
+            if getattr(fn, "name", None) and not call.function.name:
+                call.function.name = fn.name
+            if getattr(fn, "arguments", None):
+                call.function.arguments += fn.arguments
+
+    def take_complete_calls(self) -> List[StreamedToolCall]:
+        """Return tool calls whose arguments are final, each exactly once.
+
+        A call is final once its arguments parse as a JSON object (a complete
+        object cannot be extended) or once a later call has started.
+        """
+        if not self._calls:
+            return []
+        last = max(self._calls)
+        ready = []
+        for index in sorted(self._calls):
+            if index in self._taken:
+                continue
+            call = self._calls[index]
+            if not call.function.name:
+                continue
+            if index == last and not _is_json_object(call.function.arguments):
+                continue
+            self._taken.add(index)
+            ready.append(call)
+        return ready
+
+    @property
+    def content(self) -> Optional[str]:
+        return "".join(self._content) if self._content else None
+
+    @property
+    def tool_calls(self) -> List[StreamedToolCall]:
+        return [self._calls[i] for i in sorted(self._calls)]
+
+
+_FENCE_TAIL = re.compile(r"`{1,3}[\w-]*\s*$")
+_OPENERS = re.compile(r"[\[{]")
+
+
+def _is_naive_call(value: Any) -> bool:
+    return isinstance(value, dict) and "tool" in value and "args" in value
+
+
+class NaiveToolCallDetector:
+    """Incrementally separates prose from naive-mode tool calls in streamed text.
+
+    feed() returns the text that can be shown right away. From a ``{`` or
+    ``[`` that may open a JSON value, text is held back until the value
+    closes. A ``{"tool": ..., "args": ...}`` object, or an array of them,
+    becomes ``tool_calls`` and nothing after it is passed through. Any other
+    value is released as prose. A Markdown code fence right before the tool
+    calls is swallowed. Brackets inside JSON strings are handled, unlike a
+    plain brace count.
+    """
+
+    def __init__(self) -> None:
+        self.tool_calls: Optional[List[Dict[str, Any]]] = None
+        self._text: List[str] = []
+        self._held = ""  # prose held back because it may open a code fence
+        self._obj: Optional[List[str]] = None  # candidate JSON text
+        self._depth = 0
+        self._expect = ""  # characters allowed next, skipping whitespace
+        self._in_str = False
+        self._escaped = False
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return "".join(self._text)
+
+    @property
+    def done(self) -> bool:
+        """True once tool calls have been parsed; the rest can be discarded."""
+        return self.tool_calls is not None
+
+    def feed(self, text: str) -> str:
+        if self.done or not text:
+            return ""
+        self._text.append(text)
+        out: List[str] = []
+        i, n = 0, len(text)
+        while i < n and not self.done:
+            if self._obj is None:
+                match = _OPENERS.search(text, i)
+                if match is None:
+                    out.append(text[i:])
+                    break
+                out.append(text[i : match.start()])
+                self._obj = []
+                self._depth = 0
+                i = match.start()
+            i = self._scan(text, i, out)
+        return self._release(out)
+
+    def flush(self) -> str:
+        """Return held-back text at the end of the stream."""
+        if self.done:
+            return ""
+        rest = self._held + "".join(self._obj or [])
+        self._held = ""
+        self._obj = None
+        return rest
+
+    def _scan(self, text: str, i: int, out: List[str]) -> int:
+        """Consume candidate characters from text[i:]. Returns the new index."""
+        obj = self._obj
+        assert obj is not None, "_scan runs inside a candidate object"
+        n = len(text)
+        while i < n:
+            c = text[i]
+            if self._depth == 0:  # the opening bracket
+                self._expect = "{" if c == "[" else '"}'
+                self._in_str = self._escaped = False
+            elif self._expect:
+                if c in self._expect:
+                    self._expect = '"}' if c == "{" else ""
+                elif c.isspace():
+                    obj.append(c)
+                    i += 1
+                    continue
+                else:
+                    # Not a tool call: release the opener as prose, rescan from c.
+                    out.append("".join(obj))
+                    self._obj = None
+                    return i
+            if self._in_str:
+                if self._escaped:
+                    self._escaped = False
+                elif c == "\\":
+                    self._escaped = True
+                elif c == '"':
+                    self._in_str = False
+            elif c == '"':
+                self._in_str = True
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    obj.append(c)
+                    self._close(obj, out)
+                    return i + 1
+            obj.append(c)
+            i += 1
+        return i
+
+    def _close(self, obj: List[str], out: List[str]) -> None:
+        candidate = "".join(obj)
+        self._obj = None
+        try:
+            parsed = json.loads(candidate)
+        except ValueError:
+            parsed = None
+        if _is_naive_call(parsed):
+            self.tool_calls = [parsed]
+        elif isinstance(parsed, list) and parsed and all(map(_is_naive_call, parsed)):
+            self.tool_calls = parsed
+        else:
+            out.append(candidate)
+
+    def _release(self, out: List[str]) -> str:
+        text = self._held + "".join(out)
+        self._held = ""
+        if self.done:
+            return _FENCE_TAIL.sub("", text)
+        match = _FENCE_TAIL.search(text)
+        if match:
+            self._held = text[match.start() :]
+            text = text[: match.start()]
+        return text
+
+
+def close_stream(stream: Any) -> None:
+    """Close a completion stream early so the provider stops generating."""
+    close = getattr(stream, "close", None)
+    if close is None:
+        close = getattr(getattr(stream, "completion_stream", None), "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception:
+            pass
+
+
+async def aclose_stream(stream: Any) -> None:
+    aclose = getattr(stream, "aclose", None)
+    if aclose is None:
+        close_stream(stream)
+        return
+    try:
+        await aclose()
+    except Exception:
+        pass
+
+
+def _full(size: int, max_chars: Optional[int]) -> bool:
+    return max_chars is not None and size >= max_chars
+
+
+def coalesce(
+    deltas: Iterator[str],
+    max_chars: Optional[int] = None,
+    interval: Optional[float] = None,
+) -> Iterator[str]:
+    """Batch text deltas into chunks of at least ``max_chars`` characters, or
+    whatever arrived within ``interval`` seconds of the first buffered delta.
+
+    Pull-based, so a slow consumer simply reads the source more slowly. The
+    interval is checked as deltas arrive, not while waiting for one.
+    """
+    buffer: List[str] = []
+    size = 0
+    first_at = 0.0
+    try:
+        for delta in deltas:
+            if not buffer:
+                first_at = time.monotonic()
+            buffer.append(delta)
+            size += len(delta)
+            if _full(size, max_chars) or (
+                interval is not None and time.monotonic() - first_at >= interval
+            ):
+                yield "".join(buffer)
+                buffer, size = [], 0
+    except Exception:
+        if buffer:
+            yield "".join(buffer)
+        raise
+    finally:
+        close_stream(deltas)
+    if buffer:
+        yield "".join(buffer)
+
+
+class _StreamFailed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_STREAM_END = object()
+
+
+async def acoalesce(
+    deltas: AsyncIterator[str],
+    max_chars: Optional[int] = None,
+    interval: Optional[float] = None,
+    queue_size: int = 256,
+) -> AsyncIterator[str]:
+    """Async coalesce(). A background task reads ``deltas`` into a queue of
+    at most ``queue_size`` entries, so the interval is honoured even while
+    the source is quiet, and a slow consumer pauses the reads instead of
+    letting the queue grow.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+
+    async def produce() -> None:
+        try:
+            async for delta in deltas:
+                await queue.put(delta)
+        except Exception as e:
+            await queue.put(_StreamFailed(e))
+        else:
+            await queue.put(_STREAM_END)
+        finally:
+            await aclose_stream(deltas)
+
+    loop = asyncio.get_running_loop()
+    producer = asyncio.ensure_future(produce())
+    getter: Optional[asyncio.Future] = None
+    buffer: List[str] = []
+    size = 0
+    first_at = 0.0
+    try:
+        while True:
+            timeout = None
+            if buffer and interval is not None:
+                timeout = max(first_at + interval - loop.time(), 0)
+            if getter is None:
+                getter = asyncio.ensure_future(queue.get())
+            # Wait without cancelling the get, so no delta is lost on timeout.
+            done, _ = await asyncio.wait({getter}, timeout=timeout)
+            if not done:
+                yield "".join(buffer)
+                buffer, size = [], 0
+                continue
+            item, getter = getter.result(), None
+            if item is _STREAM_END:
+                break
+            if isinstance(item, _StreamFailed):
+                if buffer:
+                    yield "".join(buffer)
+                raise item.error
+            if not buffer:
+                first_at = loop.time()
+            buffer.append(item)
+            size += len(item)
+            if _full(size, max_chars):
+                yield "".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        for task in (getter, producer):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(
+            *(t for t in (getter, producer) if t is not None), return_exceptions=True
+        )
@@ -0,0 +1,266 @@
+"""Structured output: JSON-schema response formats and tool-based extraction"""
+
+import functools
+import re
+import typing
+from typing import Any, Dict, List, Optional, Type
+
+import litellm
+from pydantic import BaseModel, TypeAdapter, ValidationError, create_model
+from pydantic_core import from_json
+
+_SCHEMA_CACHE_SIZE = 256
+# A partial model is re-parsed once the text has grown by this fraction
+# since the last parse, keeping the total parsing work linear.
+_REPARSE_GROWTH = 0.125
+_FENCED = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_-]")
+
+
+def _schema_name(model_cls: Type[BaseModel]) -> str:
+    return _INVALID_NAME_CHARS.sub("_", model_cls.__name__)[:64]
+
+
+def list_item_type(annotation: Any) -> Optional[Any]:
+    """``X`` for ``List[X]`` / ``list[X]``, else None."""
+    if typing.get_origin(annotation) is list:
+        args = typing.get_args(annotation)
+        return args[0] if args else Any
+    return None
+
+
+def _model_type(annotation: Any) -> Optional[Type[BaseModel]]:
+    """The BaseModel subclass in ``M`` or ``Optional[M]``, else None."""
+    if typing.get_origin(annotation) is typing.Union:
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        annotation = args[0] if len(args) == 1 else None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    return None
+
+
+@functools.lru_cache(maxsize=_SCHEMA_CACHE_SIZE)
+def _schema_model(response_model: Any) -> Type[BaseModel]:
+    """Providers want an object at the top of a schema, so ``List[X]`` is
+    requested as ``{"items": [...]}``."""
+    item = list_item_type(response_model)
+    if item is None:
+        return response_model
+    name = getattr(item, "__name__", "Item")
+    return create_model(f"{name}List", items=(List[item], ...))  # type: ignore[valid-type]
+
+
+@functools.lru_cache(maxsize=_SCHEMA_CACHE_SIZE)
+def _adapter(annotation: Any) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+
+@functools.lru_cache(maxsize=_SCHEMA_CACHE_SIZE)
+def response_format_for(response_model: Any) -> Dict[str, Any]:
+    """``response_format`` constraining a completion to a model's JSON schema.
+
+    ``response_model`` is a BaseModel subclass or ``List`` of one. Built once
+    per model class. Callers must treat the result as read-only.
+    """
+    model_cls = _schema_model(response_model)
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": _schema_name(model_cls),
+            "schema": model_cls.model_json_schema(),
+        },
+    }
+
+
+@functools.lru_cache(maxsize=_SCHEMA_CACHE_SIZE)
+def extraction_tool_for(model_cls: Type[BaseModel]) -> Dict[str, Any]:
+    """Tool whose arguments are ``model_cls``, for providers without
+    ``response_format``. Cached like response_format_for."""
+    return {
+        "type": "function",
+        "function": {
+            "name": _schema_name(model_cls),
+            "description": f"Return the final answer as a {model_cls.__name__}.",
+            "parameters": model_cls.model_json_schema(),
+        },
+    }
+
+
+@functools.lru_cache(maxsize=_SCHEMA_CACHE_SIZE)
+def supports_json_schema(model: str) -> bool:
+    """Whether LiteLLM knows ``model`` to accept a JSON-schema response_format."""
+    try:
+        return bool(litellm.supports_response_schema(model=model))
+    except Exception:
+        return False
+
+
+def _json_candidate(content: str) -> Optional[str]:
+    """The JSON object inside prose or a code fence, if there is one."""
+    fenced = _FENCED.search(content)
+    if fenced:
+        content = fenced.group(1)
+    start, end = content.find("{"), content.rfind("}")
+    if start == -1 or end < start:
+        return None
+    return content[start : end + 1]
+
+
+def parse_structured(model_cls: Type[BaseModel], content: str) -> BaseModel:
+    """Validate ``content`` as ``model_cls``, tolerating prose or a code fence
+    around the JSON. Raises the original ValidationError if that fails too."""
+    try:
+        return model_cls.model_validate_json(content)
+    except ValidationError as error:
+        candidate = _json_candidate(content)
+        if candidate is None or candidate == content:
+            raise
+        try:
+            return model_cls.model_validate_json(candidate)
+        except ValidationError:
+            raise error from None
+
+
+def _construct_partial(model_cls: Type[BaseModel], data: Dict[str, Any]) -> BaseModel:
+    """Unvalidated instance holding the fields present in ``data``, with
+    nested models built the same way."""
+    values = {}
+    for name, field in model_cls.model_fields.items():
+        key = field.alias or name
+        if key in data:
+            values[name] = _partial_value(field.annotation, data[key])
+    return model_cls.model_construct(**values)
+
+
+def _partial_value(annotation: Any, value: Any) -> Any:
+    model_cls = _model_type(annotation)
+    if model_cls is not None and isinstance(value, dict):
+        return _construct_partial(model_cls, value)
+    item = list_item_type(annotation)
+    if item is not None and isinstance(value, list):
+        return [_partial_value(item, v) for v in value]
+    return value
+
+
+class StructuredStream:
+    """Incremental parser for a structured answer arriving as text deltas.
+
+    For a BaseModel, feed() returns a progressively more complete partial
+    instance whenever the parsed JSON has grown. The text is re-parsed only
+    once it has grown by an eighth, so long answers stay linear. Partial
+    instances are built with ``model_construct`` and are not validated, so
+    fields that have not arrived yet are unset; close() returns the final,
+    validated instance.
+
+    For ``List[X]``, feed() returns each element of the first JSON array,
+    validated as X, as soon as the element closes.
+    """
+
+    def __init__(self, response_model: Any):
+        self.response_model = response_model
+        self._item_type = list_item_type(response_model)
+        self._text: List[str] = []
+        # Partial-model state
+        self._last: Any = None
+        self._length = 0
+        self._parsed_length = 0
+        # List state: position in the buffer and nesting inside the array
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._item_start: Optional[int] = None
+        self._in_str = False
+        self._escaped = False
+        self._closed = False
+        self.items_yielded = 0
+
+    @property
+    def text(self) -> str:
+        return "".join(self._text)
+
+    def feed(self, text: str) -> List[Any]:
+        if not text:
+            return []
+        self._text.append(text)
+        if self._item_type is not None:
+            return self._feed_items(text)
+        return self._feed_partial(text)
+
+    def close(self) -> List[Any]:
+        """Validate the complete answer. Returns what is still owed to the caller."""
+        if self._item_type is None:
+            return [parse_structured(self.response_model, self.text)]
+        if self._closed:
+            return []
+        # No complete array was seen: let validation of the whole text raise,
+        # or return anything it holds beyond what was already yielded.
+        candidate = _json_candidate(self.text) or self.text
+        try:
+            items = _adapter(self.response_model).validate_json(candidate)
+        except ValidationError:
+            items = (
+                _adapter(_schema_model(self.response_model))
+                .validate_json(candidate)
+                .items
+            )
+        return list(items[self.items_yielded :])
+
+    def _feed_partial(self, text: str) -> List[Any]:
+        self._length += len(text)
+        if self._length - self._parsed_length < self._parsed_length * _REPARSE_GROWTH:
+            return []
+        self._parsed_length = self._length
+        text = self.text
+        start = text.find("{")
+        if start == -1:
+            return []
+        try:
+            data = from_json(text[start:], allow_partial="trailing-strings")
+        except ValueError:
+            return []
+        if not isinstance(data, dict) or data == self._last:
+            return []
+        self._last = data
+        return [_construct_partial(self.response_model, data)]
+
+    def _feed_items(self, text: str) -> List[Any]:
+        if self._closed:
+            return []
+        self._buffer += text
+        buffer = self._buffer
+        items: List[Any] = []
+        i = self._pos
+        while i < len(buffer) and not self._closed:
+            c = buffer[i]
+            if self._depth == 0:
+                if c == "[":
+                    self._depth = 1
+                    self._item_start = i + 1
+            elif self._in_str:
+                if self._escaped:
+                    self._escaped = False
+                elif c == "\\":
+                    self._escaped = True
+                elif c == '"':
+                    self._in_str = False
+            elif c == '"':
+                self._in_str = True
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0:  # the array's closing bracket
+                    self._take_item(buffer, i, items)
+                    self._closed = True
+            elif c == "," and self._depth == 1:
+                self._take_item(buffer, i, items)
+            i += 1
+        self._pos = i
+        self.items_yielded += len(items)
+        return items
+
+    def _take_item(self, buffer: str, end: int, items: List[Any]) -> None:
+        element = buffer[self._item_start : end].strip()
+        if element:
+            items.append(_adapter(self._item_type).validate_json(element))
+        self._item_start = end + 1
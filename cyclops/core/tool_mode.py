@@ -0,0 +1,157 @@
+"""Tool-calling mode detection and a mode cache shared between processes"""
+
+import functools
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import litellm
+
+_DEFAULT_PATH = os.path.join("~", ".cache", "cyclops", "tool_modes.db")
+_PATH_ENV = "CYCLOPS_TOOL_MODE_CACHE"
+_DEFAULT_TTL = 7 * 24 * 3600.0
+
+# Phrases providers use when a request's tools/functions are rejected. Bare
+# words like "function" also show up in unrelated errors, so they never
+# count on their own.
+_TOOL_REJECTED = re.compile(
+    r"(tools?|function[ _-]?calling|functions|tool[ _]choice)\b[^.]{0,60}?"
+    r"\b(not supported|unsupported|not available|not enabled|not allowed)"
+    r"|(does not|doesn't|do not|don't|cannot|can't) (support|use)\b[^.]{0,40}?"
+    r"\b(tools?|function[ _-]?calling|functions)\b"
+    r"|(unsupported|unrecognized|unknown|extra|invalid)[^.]{0,30}?"
+    r"(param|parameter|argument|field|input)s?[^.]{0,30}?['\"`]?(tools|tool_choice|functions)\b",
+    re.IGNORECASE,
+)
+# Statuses that cannot mean "this model rejects tools": auth, rate limits,
+# server errors and so on.
+_REJECTION_STATUSES = (400, 404, 422)
+
+
+def is_tool_unsupported_error(error: Exception) -> bool:
+    """True if ``error`` says the model or provider rejects tool calling."""
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int) and status not in _REJECTION_STATUSES:
+        return False
+    return _TOOL_REJECTED.search(str(error)) is not None
+
+
+@functools.lru_cache(maxsize=256)
+def supports_native_tools(model: str) -> Optional[bool]:
+    """Function-calling support according to LiteLLM's model map, or None if
+    the model is unknown or the map does not say."""
+    try:
+        info = litellm.get_model_info(model)
+    except Exception:
+        return None
+    value = info.get("supports_function_calling")
+    return value if isinstance(value, bool) else None
+
+
+class ToolModeCache:
+    """Tool modes learned at runtime, kept in a SQLite file all workers share.
+
+    A model is recorded as "naive" when a native tool request fails with an
+    error that says tools are unsupported. Entries expire after ``ttl``
+    seconds, so a misread error or a provider that adds tool support later
+    does not pin a model to naive mode forever. ``path=None`` keeps entries
+    in memory only.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = _DEFAULT_TTL):
+        self.path = os.path.expanduser(path) if path else None
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._memory: Dict[str, Tuple[str, float]] = {}
+
+    @classmethod
+    def from_env(cls) -> "ToolModeCache":
+        """Cache at $CYCLOPS_TOOL_MODE_CACHE, or ~/.cache/cyclops/tool_modes.db.
+
+        Set the variable to an empty string to keep modes in memory only.
+        """
+        return cls(os.environ.get(_PATH_ENV, _DEFAULT_PATH) or None)
+
+    def get(self, model: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(model)
+            if entry is None:
+                entry = self._read(model)
+            if entry is None:
+                return None
+            mode, updated_at = entry
+            if self.ttl is not None and time.time() - updated_at > self.ttl:
+                self._memory.pop(model, None)
+                return None
+            self._memory[model] = entry
+            return mode
+
+    def set(self, model: str, mode: str) -> None:
+        entry = (mode, time.time())
+        with self._lock:
+            self._memory[model] = entry
+            conn = self._connect(create=True)
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO tool_modes (model, mode, updated_at) "
+                        "VALUES (?, ?, ?)",
+                        (model, *entry),
+                    )
+            except sqlite3.Error:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            conn = self._connect()
+            if conn is not None:
+                try:
+                    with conn:
+                        conn.execute("DELETE FROM tool_modes")
+                except sqlite3.Error:
+                    pass
+
+    def _read(self, model: str) -> Optional[Tuple[str, float]]:
+        conn = self._connect()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT mode, updated_at FROM tool_modes WHERE model = ?", (model,)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        return (row[0], row[1]) if row else None
+
+    def _connect(self, create: bool = False) -> Optional[sqlite3.Connection]:
+        """Open the database on first use. The file is only created for a
+        write, and an unusable path degrades to memory."""
+        if self._conn is None and self.path is not None:
+            if not create and not os.path.exists(self.path):
+                return None
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                with conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS tool_modes (model TEXT PRIMARY KEY, "
+                        "mode TEXT NOT NULL, updated_at REAL NOT NULL)"
+                    )
+            except (OSError, sqlite3.Error):
+                self.path = None
+                return None
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
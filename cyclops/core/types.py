@@ -1,9 +1,13 @@
 """Core type definitions"""
 
-from typing import Any, Dict, List, Literal, Optional
-from pydantic import BaseModel, Field
+from typing import Any, Callable, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field, PrivateAttr, computed_field, model_validator
 
+from cyclops.core.cache import CompletionCache
+from cyclops.core.context import ContextWindow
+from cyclops.core.hedging import HedgingPolicy
 from cyclops.core.hooks import AgentHooks
+from cyclops.core.rate_limit import RateLimiter
 
 
 class AgentConfig(BaseModel):
@@ -18,7 +22,21 @@ class AgentConfig(BaseModel):
     tool_mode: Literal["auto", "native", "naive"] = "auto"
     router: Optional[Any] = None
     max_iterations: int = 10
+    max_tool_workers: int = 1
+    tool_timeout: Optional[float] = None
+    tool_iteration_timeout: Optional[float] = None
+    speculative_tools: bool = False
+    prompt_caching: bool = False
+    lazy_cost: bool = False
+    stream_coalesce_chars: Optional[int] = None
+    stream_coalesce_interval: Optional[float] = None
+    stream_queue_size: int = 256
     hooks: Optional[AgentHooks] = None
+    context_window: Optional[ContextWindow] = None
+    cache: Optional[CompletionCache] = None
+    rate_limiter: Optional[RateLimiter] = None
+    hedging: Optional[HedgingPolicy] = None
+    single_flight: bool = False
 
 
 class Message(BaseModel):
@@ -52,6 +70,32 @@ class ToolCall(BaseModel):
     )
 
 
+class IterationUsage(BaseModel):
+    """Usage of one completion within a run"""
+
+    index: int = Field(description="Position of the completion within the run")
+    latency: float = Field(description="Seconds spent waiting for the completion")
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    cache_creation_tokens: Optional[int] = None
+    cost: Optional[float] = Field(
+        default=None, description="Estimated cost; 0 for response-cache hits"
+    )
+    cache_hit: bool = Field(
+        default=False, description="Served from AgentConfig.cache, not billed"
+    )
+    hedge: bool = Field(
+        default=False,
+        description="Duplicate request from AgentConfig.hedging that lost the race",
+    )
+    coalesced: bool = Field(
+        default=False,
+        description="Shared an identical in-flight request's call; not billed",
+    )
+
+
 class AgentResponse(BaseModel):
     """Response from agent execution"""
 
@@ -63,12 +107,98 @@ class AgentResponse(BaseModel):
     tokens_used: Optional[int] = Field(
         default=None, description="Number of tokens used"
     )
-    cost: Optional[float] = Field(
-        default=None, description="Estimated cost of the API call"
-    )
     prompt_tokens: Optional[int] = Field(
         default=None, description="Number of prompt tokens used"
     )
     completion_tokens: Optional[int] = Field(
         default=None, description="Number of completion tokens used"
     )
+    cached_tokens: Optional[int] = Field(
+        default=None, description="Prompt tokens read from the provider's prompt cache"
+    )
+    cache_creation_tokens: Optional[int] = Field(
+        default=None, description="Prompt tokens written to the provider's prompt cache"
+    )
+    cache_hits: int = Field(
+        default=0, description="Completions served from the response cache"
+    )
+    cache_misses: int = Field(
+        default=0, description="Completions that missed the response cache"
+    )
+    iterations: List[IterationUsage] = Field(
+        default_factory=list,
+        description="Per-completion breakdown; totals sum the billed entries",
+    )
+
+    _cost: Optional[float] = PrivateAttr(default=None)
+    _cost_factory: Optional[Callable[[], Optional[float]]] = PrivateAttr(default=None)
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def _accept_cost(cls, data: Any, handler: Any) -> "AgentResponse":
+        if not isinstance(data, dict) or "cost" not in data:
+            return handler(data)
+        data = dict(data)
+        cost = data.pop("cost")
+        response = handler(data)
+        response._cost = cost
+        return response
+
+    @computed_field(description="Estimated cost of the API call")  # type: ignore[misc]
+    @property
+    def cost(self) -> Optional[float]:
+        """Estimated USD cost. With AgentConfig.lazy_cost it is computed on
+        first access."""
+        if self._cost_factory is not None:
+            factory, self._cost_factory = self._cost_factory, None
+            self._cost = factory()
+        return self._cost
+
+    @cost.setter
+    def cost(self, value: Optional[float]) -> None:
+        self._cost_factory = None
+        self._cost = value
+
+
+class BatchItem(BaseModel):
+    """Outcome of one input in a batch run"""
+
+    index: int = Field(description="Position of the input in the batch")
+    input: str = Field(description="The input message")
+    response: Optional[AgentResponse] = Field(
+        default=None, description="Agent response, if the run succeeded"
+    )
+    error: Optional[str] = Field(
+        default=None, description="Error description, if the run failed"
+    )
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BatchResponse(BaseModel):
+    """Results of a batch run, in input order, with aggregated usage"""
+
+    items: List[BatchItem] = Field(default_factory=list)
+    succeeded: int = 0
+    failed: int = 0
+    tokens_used: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+    @classmethod
+    def from_items(cls, items: List[BatchItem]) -> "BatchResponse":
+        batch = cls(items=sorted(items, key=lambda item: item.index))
+        for item in batch.items:
+            if item.response is None:
+                batch.failed += 1
+                continue
+            batch.succeeded += 1
+            r = item.response
+            batch.tokens_used += r.tokens_used or 0
+            batch.prompt_tokens += r.prompt_tokens or 0
+            batch.completion_tokens += r.completion_tokens or 0
+            batch.cost += r.cost or 0.0
+        return batch
@@ -1,31 +1,37 @@
-"""Sync bridge for async MCPClient — runs a persistent event loop in a background thread."""
+"""Sync bridge for async MCPClient — runs on the shared background event loop."""
 
 import asyncio
 import logging
-import threading
 from typing import Any, Dict, List, Optional
 
 from cyclops.mcp.client import MCPClient
+from cyclops.utils.loop import get_background_loop
 
 logger = logging.getLogger(__name__)
 
 
 class MCPBridge:
-    """Keeps one asyncio event loop alive in a daemon thread.
+    """Runs async MCP operations from sync code.
 
-    All async MCP operations are submitted to that loop via
-    run_coroutine_threadsafe so callers don't need to manage event loops.
+    All operations are submitted to the process-wide background loop
+    (cyclops.utils.loop), which coroutine tools called from sync code use
+    too, so callers don't need to manage event loops and bridges don't
+    each start a thread.
     """
 
     def __init__(self) -> None:
-        self._loop = asyncio.new_event_loop()
-        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
-        self._thread.start()
         self._clients: Dict[str, MCPClient] = {}
 
     def _run(self, coro) -> Any:
-        fut = asyncio.run_coroutine_threadsafe(coro, self._loop)
-        return fut.result()
+        loop = get_background_loop()
+        if loop.in_loop_thread():
+            coro.close()
+            # The clients live on this loop; waiting here would block it.
+            raise RuntimeError(
+                "MCPBridge cannot be called from the background loop; "
+                "await the MCPClient instead"
+            )
+        return loop.run(coro)
 
     # ── Connection management ─────────────────────────────────────────────────
 
@@ -50,7 +56,7 @@ class MCPBridge:
             del self._clients[name]
 
     def stop(self) -> None:
-        """Disconnect all clients and stop the background loop."""
+        """Disconnect this bridge's clients. The shared loop keeps running."""
         if self._clients:
 
             async def _disconnect_all() -> None:
@@ -66,9 +72,6 @@ class MCPBridge:
                 self._clients.clear()
 
             self._run(_disconnect_all())
-        self._loop.call_soon_threadsafe(self._loop.stop)
-        self._thread.join(timeout=3)
-        self._loop.close()
 
     # ── Tool operations ───────────────────────────────────────────────────────
 
@@ -1,11 +1,12 @@
 """MCP Server implementation"""
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool as MCPTool, TextContent
 
+from cyclops.toolkit.cache import TTLCache
 from cyclops.toolkit.registry import ToolRegistry
 from cyclops.toolkit.tool import BaseTool
 from cyclops.toolkit.plugins import PluginManager
@@ -68,9 +69,11 @@ class MCPServer:
         """Add a tool to the server"""
         self.tool_registry.register(tool)
 
-    def add_function_tool(self, name: str, description: str, func) -> None:
+    def add_function_tool(
+        self, name: str, description: str, func, cache: Optional[TTLCache] = None
+    ) -> None:
         """Add a function as a tool"""
-        self.tool_registry.register_function(name, description, func)
+        self.tool_registry.register_function(name, description, func, cache)
 
     async def run_stdio(self):
         """Run the MCP server with stdio transport"""
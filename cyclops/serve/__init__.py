@@ -0,0 +1,10 @@
+"""HTTP serving for agents (requires the ``serve`` extra)"""
+
+try:
+    from cyclops.serve.app import AgentServer, create_app
+except ImportError as e:  # pragma: no cover - depends on the environment
+    raise ImportError(
+        "cyclops.serve needs Starlette and Uvicorn: pip install 'cyclops-ai[serve]'"
+    ) from e
+
+__all__ = ["AgentServer", "create_app"]
@@ -0,0 +1,281 @@
+"""ASGI app exposing an Agent over HTTP: run, SSE streaming and sessions"""
+
+import asyncio
+import contextlib
+import json
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Union
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from cyclops.core.agent import Agent, Session
+from cyclops.core.streaming import aclose_stream
+
+# Status for requests whose client went away before the answer was ready
+_CLIENT_CLOSED = 499
+_DISCONNECTED = object()
+
+
+class _RunBody:
+    """Validated JSON body of /run and /stream."""
+
+    def __init__(self, input: str, session_id: Optional[str]):
+        self.input = input
+        self.session_id = session_id
+
+
+def _sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+class AgentServer:
+    """Request handling for create_app().
+
+    Each request runs in a session of the configured agent: the one named
+    by ``session_id``, or a throwaway session that is ended afterwards.
+    At most ``max_concurrency`` runs execute at once; others wait for a
+    slot. Runs on one session are serialized so its history stays
+    consistent. A run is cancelled as soon as its client disconnects.
+
+    At most ``max_sessions`` named sessions are kept; opening one more ends
+    the least recently used session that is not running.
+    """
+
+    def __init__(
+        self,
+        agent: Agent,
+        max_concurrency: int = 16,
+        keepalive: float = 15.0,
+        max_sessions: int = 1000,
+    ):
+        self.agent = agent
+        self.keepalive = keepalive
+        self.max_sessions = max(1, max_sessions)
+        self._slots = asyncio.Semaphore(max(1, max_concurrency))
+        # Named sessions opened here, least recently used first
+        self._session_locks: "OrderedDict[str, asyncio.Lock]" = OrderedDict()
+
+    # -- request helpers ------------------------------------------------
+
+    @staticmethod
+    async def _parse(request: Request) -> Union[_RunBody, Response]:
+        try:
+            body = await request.json()
+        except ValueError:
+            return JSONResponse({"error": "body must be JSON"}, status_code=400)
+        if not isinstance(body, dict) or not isinstance(body.get("input"), str):
+            return JSONResponse({"error": "'input' must be a string"}, status_code=400)
+        session_id = body.get("session_id")
+        if session_id is not None and not isinstance(session_id, str):
+            return JSONResponse(
+                {"error": "'session_id' must be a string"}, status_code=400
+            )
+        return _RunBody(body["input"], session_id)
+
+    def _open(self, session_id: Optional[str]) -> Session:
+        session = self.agent.session(session_id)
+        if session_id is not None:
+            if session_id not in self._session_locks:
+                self._session_locks[session_id] = asyncio.Lock()
+            self._session_locks.move_to_end(session_id)
+            self._evict()
+        return session
+
+    def _evict(self) -> None:
+        """End idle sessions, oldest first, until at most max_sessions remain."""
+        excess = len(self._session_locks) - self.max_sessions
+        for session_id, lock in list(self._session_locks.items())[:-1]:
+            if excess <= 0:
+                break
+            if not lock.locked():
+                del self._session_locks[session_id]
+                self.agent.end_session(session_id)
+                excess -= 1
+
+    def _close(self, session: Session, session_id: Optional[str]) -> None:
+        if session_id is None:
+            self.agent.end_session(session.id)
+
+    def _lock(self, session_id: Optional[str]) -> Any:
+        """Lock serializing runs on a named session. Throwaway sessions need none."""
+        if session_id is None:
+            return contextlib.nullcontext()
+        return self._session_locks[session_id]
+
+    @staticmethod
+    async def _disconnected(request: Request) -> None:
+        """Return once the client has disconnected."""
+        while True:
+            message = await request.receive()
+            if message["type"] == "http.disconnect":
+                return
+
+    async def _until_disconnect(
+        self, request: Request, work: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Run ``work()``, cancelling it if the client leaves first.
+
+        Returns its result, or _DISCONNECTED if it was cancelled.
+        """
+        task = asyncio.ensure_future(work())
+        watcher = asyncio.ensure_future(self._disconnected(request))
+        try:
+            await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            watcher.cancel()
+            if not task.done():
+                task.cancel()
+            await asyncio.gather(watcher, task, return_exceptions=True)
+        if task.cancelled():
+            return _DISCONNECTED
+        return task.result()
+
+    # -- endpoints --------------------------------------------------------
+
+    async def run(self, request: Request) -> Response:
+        body = await self._parse(request)
+        if isinstance(body, Response):
+            return body
+
+        async def work():
+            async with self._slots:
+                session = self._open(body.session_id)
+                try:
+                    async with self._lock(body.session_id):
+                        return await session.arun_with_response(body.input)
+                finally:
+                    self._close(session, body.session_id)
+
+        try:
+            response = await self._until_disconnect(request, work)
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, status_code=500)
+        if response is _DISCONNECTED:
+            return Response(status_code=_CLIENT_CLOSED)
+        data = response.model_dump(mode="json")
+        if body.session_id is not None:
+            data["session_id"] = body.session_id
+        return JSONResponse(data)
+
+    async def stream(self, request: Request) -> Response:
+        body = await self._parse(request)
+        if isinstance(body, Response):
+            return body
+        return StreamingResponse(
+            self._events(body),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    async def _events(self, body: _RunBody) -> AsyncIterator[str]:
+        """SSE body. Starlette cancels this generator when the client
+        disconnects, which closes the agent stream and the provider's."""
+        async with self._slots:
+            session = self._open(body.session_id)
+            try:
+                async with self._lock(body.session_id):
+                    async for event in self._session_events(session, body):
+                        yield event
+            finally:
+                self._close(session, body.session_id)
+
+    async def _session_events(
+        self, session: Session, body: _RunBody
+    ) -> AsyncIterator[str]:
+        deltas = session.astream(body.input)
+        pending: Optional[asyncio.Future] = None
+        try:
+            while True:
+                if pending is None:
+                    pending = asyncio.ensure_future(deltas.__anext__())
+                done, _ = await asyncio.wait({pending}, timeout=self.keepalive)
+                if not done:
+                    yield ": keep-alive\n\n"
+                    continue
+                task, pending = pending, None
+                try:
+                    delta = task.result()
+                except StopAsyncIteration:
+                    break
+                except Exception as e:
+                    yield _sse({"error": str(e)}, event="error")
+                    return
+                yield _sse({"delta": delta})
+            done_event: Dict[str, Any] = {}
+            if body.session_id is not None:
+                done_event["session_id"] = session.id
+            yield _sse(done_event, event="done")
+        finally:
+            if pending is not None:
+                pending.cancel()
+                await asyncio.gather(pending, return_exceptions=True)
+            await aclose_stream(deltas)
+
+    async def list_sessions(self, request: Request) -> Response:
+        return JSONResponse({"sessions": self.agent.sessions})
+
+    async def get_session(self, request: Request) -> Response:
+        session_id = request.path_params["session_id"]
+        if session_id not in self.agent.sessions:
+            return JSONResponse({"error": "unknown session"}, status_code=404)
+        session = self.agent.session(session_id)
+        return JSONResponse({"session_id": session_id, "messages": session.messages})
+
+    async def delete_session(self, request: Request) -> Response:
+        session_id = request.path_params["session_id"]
+        if not self.agent.end_session(session_id):
+            return JSONResponse({"error": "unknown session"}, status_code=404)
+        self._session_locks.pop(session_id, None)
+        return Response(status_code=204)
+
+    async def health(self, request: Request) -> Response:
+        return JSONResponse({"status": "ok"})
+
+
+def create_app(
+    agent: Union[Agent, Callable[[], Agent]],
+    max_concurrency: int = 16,
+    keepalive: float = 15.0,
+    max_sessions: int = 1000,
+) -> Starlette:
+    """Build an ASGI app serving ``agent`` (or the Agent a factory returns).
+
+    Routes:
+        POST   /run                     {"input", "session_id"?} -> AgentResponse JSON
+        POST   /stream                  same body -> Server-Sent Events
+        GET    /sessions                open session ids
+        GET    /sessions/{session_id}   a session's messages
+        DELETE /sessions/{session_id}   end a session
+        GET    /health
+
+    Without ``session_id`` each request gets a fresh conversation. The
+    stream sends ``data: {"delta": ...}`` events, then ``event: done`` or
+    ``event: error``, with ``: keep-alive`` comments every ``keepalive``
+    seconds while the agent is quiet (e.g. running tools). Beyond
+    ``max_sessions`` named sessions, the least recently used idle one is
+    ended.
+    """
+    if not isinstance(agent, Agent):
+        agent = agent()
+    server = AgentServer(
+        agent,
+        max_concurrency=max_concurrency,
+        keepalive=keepalive,
+        max_sessions=max_sessions,
+    )
+    app = Starlette(
+        routes=[
+            Route("/run", server.run, methods=["POST"]),
+            Route("/stream", server.stream, methods=["POST"]),
+            Route("/sessions", server.list_sessions, methods=["GET"]),
+            Route("/sessions/{session_id}", server.get_session, methods=["GET"]),
+            Route("/sessions/{session_id}", server.delete_session, methods=["DELETE"]),
+            Route("/health", server.health, methods=["GET"]),
+        ]
+    )
+    app.state.agent_server = server
+    return app
@@ -0,0 +1,94 @@
+"""``cyclops`` command line: ``cyclops serve``"""
+
+import argparse
+import importlib
+import sys
+from typing import Any, List, Optional
+
+
+def _load(target: str) -> Any:
+    """Import ``module:attribute``, e.g. ``myapp.agents:support_agent``."""
+    module_name, _, attr = target.partition(":")
+    if not module_name or not attr:
+        raise SystemExit(f"Expected 'module:attribute', got {target!r}")
+    if "" not in sys.path:
+        sys.path.insert(0, "")  # like uvicorn: resolve modules from the cwd
+    obj: Any = importlib.import_module(module_name)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _build_agent(args: argparse.Namespace) -> Any:
+    if args.agent:
+        return _load(args.agent)
+    if not args.model:
+        raise SystemExit("Pass an agent as module:attribute, or --model")
+    from cyclops.core.agent import Agent
+    from cyclops.core.types import AgentConfig
+
+    return Agent(AgentConfig(model=args.model, system_prompt=args.system_prompt))
+
+
+def _serve(args: argparse.Namespace) -> None:
+    import uvicorn
+
+    from cyclops.serve import create_app
+
+    app = create_app(
+        _build_agent(args),
+        max_concurrency=args.max_concurrency,
+        keepalive=args.keepalive,
+        max_sessions=args.max_sessions,
+    )
+    uvicorn.run(
+        app,
+        host=args.host,
+        port=args.port,
+        timeout_keep_alive=args.http_keepalive,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="cyclops")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Serve an agent over HTTP and SSE")
+    serve.add_argument(
+        "agent",
+        nargs="?",
+        help="Agent, or a function returning one, as module:attribute",
+    )
+    serve.add_argument("--model", help="Serve a tool-less agent for this model")
+    serve.add_argument("--system-prompt", default=None)
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument(
+        "--max-concurrency", type=int, default=16, help="Runs executing at once"
+    )
+    serve.add_argument(
+        "--max-sessions",
+        type=int,
+        default=1000,
+        help="Named sessions kept before the least recently used is ended",
+    )
+    serve.add_argument(
+        "--keepalive",
+        type=float,
+        default=15.0,
+        help="Seconds between SSE keep-alive comments",
+    )
+    serve.add_argument(
+        "--http-keepalive",
+        type=int,
+        default=5,
+        help="Seconds an idle HTTP connection is kept open",
+    )
+    serve.set_defaults(func=_serve)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
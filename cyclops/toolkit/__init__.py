@@ -1,6 +1,7 @@
 """Toolkit for agents - tools and utilities"""
 
-from cyclops.toolkit.tool import BaseTool
+from cyclops.toolkit.tool import BaseTool, ToolTimeoutError
+from cyclops.toolkit.cache import TTLCache
 from cyclops.toolkit.decorators import tool
 from cyclops.toolkit.types import ToolResult
 from cyclops.toolkit.registry import ToolRegistry
@@ -8,6 +9,8 @@ from cyclops.toolkit.plugins import PluginManager, Toolkit
 
 __all__ = [
     "BaseTool",
+    "TTLCache",
+    "ToolTimeoutError",
     "tool",
     "ToolResult",
     "ToolRegistry",
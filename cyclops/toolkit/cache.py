@@ -0,0 +1,86 @@
+"""Result caching for tools"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+def args_key(args: Dict[str, Any]) -> str:
+    """Canonical JSON for a tool's arguments, independent of key order."""
+    return json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ToolCacheStats:
+    """Hit/miss counters for a tool cache."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class TTLCache:
+    """Thread-safe LRU cache of tool results with an optional TTL (seconds).
+
+    Keys are built from the call's arguments as normalized JSON, so
+    ``{"a": 1, "b": 2}`` and ``{"b": 2, "a": 1}`` share an entry. Pass
+    ``key`` to customize this, e.g. to ignore an argument or normalize case.
+    Only successful results are cached. One cache may be shared by several
+    tools only if their keys cannot collide.
+
+    Usage:
+        @tool(cache=TTLCache(max_size=256, ttl=600))
+        def geocode(address: str) -> str: ...
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = 1024,
+        ttl: Optional[float] = None,
+        key: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._key = key or args_key
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = ToolCacheStats()
+
+    def make_key(self, args: Dict[str, Any]) -> Hashable:
+        return self._key(args)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (hit, value) and update the hit/miss stats."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None:
+                if time.monotonic() - entry[0] > self.ttl:
+                    del self._entries[key]
+                    entry = None
+            if entry is None:
+                self.stats.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return True, entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            if self.max_size is not None:
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
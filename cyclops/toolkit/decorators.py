@@ -1,6 +1,7 @@
 """Decorators for creating tools"""
 
 from typing import Callable, Optional, Union
+from cyclops.toolkit.cache import TTLCache
 from cyclops.toolkit.tool import Tool
 from cyclops.toolkit.registry import ToolRegistry
 
@@ -11,6 +12,8 @@ def tool(
     name: Optional[str] = None,
     description: Optional[str] = None,
     registry: Optional[ToolRegistry] = None,
+    cache: Optional[TTLCache] = None,
+    timeout: Optional[float] = None,
 ) -> Union[Tool, Callable[[Callable], Tool]]:
     """Decorator to convert a function into a tool
 
@@ -31,6 +34,11 @@ def tool(
         @tool(name="custom_name", description="Custom description")
         def my_function():
             pass
+
+        # Memoize results by arguments, give up after 5 seconds
+        @tool(cache=TTLCache(max_size=256, ttl=600), timeout=5)
+        def lookup(key: str):
+            pass
     """
 
     def decorator(f: Callable) -> Tool:
@@ -39,7 +47,7 @@ def tool(
             f.__doc__.strip() if f.__doc__ else f"Tool: {tool_name}"
         )
 
-        created_tool = Tool(tool_name, tool_description, f)
+        created_tool = Tool(tool_name, tool_description, f, cache, timeout)
 
         if registry:
             registry.register(created_tool)
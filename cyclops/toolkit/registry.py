@@ -1,6 +1,7 @@
 """Tool registry for managing available tools"""
 
 from typing import Dict, List, Optional, Any
+from cyclops.toolkit.cache import TTLCache
 from cyclops.toolkit.tool import BaseTool, Tool, ToolDefinition
 
 
@@ -14,9 +15,11 @@ class ToolRegistry:
         """Register a tool in the registry"""
         self._tools[tool.name] = tool
 
-    def register_function(self, name: str, description: str, func) -> None:
+    def register_function(
+        self, name: str, description: str, func, cache: Optional[TTLCache] = None
+    ) -> None:
         """Register a function as a tool"""
-        tool = Tool(name, description, func)
+        tool = Tool(name, description, func, cache)
         self.register(tool)
 
     def get_tool(self, name: str) -> Optional[BaseTool]:
@@ -37,7 +40,7 @@ class ToolRegistry:
         if not tool:
             raise ValueError(f"Tool '{tool_name}' not found")
 
-        return await tool.execute(**kwargs)
+        return await tool.execute_cached(**kwargs)
 
     def remove_tool(self, name: str) -> bool:
         """Remove a tool from registry"""
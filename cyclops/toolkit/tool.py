@@ -4,8 +4,9 @@ import inspect
 import types
 import typing
 from abc import ABC
-from typing import Any, Callable, Dict, get_args, get_origin
+from typing import Any, Callable, Dict, Optional, get_args, get_origin
 
+from cyclops.toolkit.cache import TTLCache
 from cyclops.toolkit.types import ToolParameter, ToolDefinition
 
 
@@ -59,18 +60,57 @@ def _params_from_sig(sig) -> Dict[str, ToolParameter]:
     return parameters
 
 
-class BaseTool(ABC):
-    """Abstract base tool class"""
+class ToolTimeoutError(TimeoutError):
+    """A tool call exceeded its time limit and was cancelled or abandoned."""
+
+    def __init__(self, tool_name: str, timeout: float):
+        self.tool_name = tool_name
+        self.timeout = timeout
+        super().__init__(f"Tool '{tool_name}' timed out after {timeout:g}s")
 
-    def __init__(self, name: str, description: str):
+
+class BaseTool(ABC):
+    """Abstract base tool class
+
+    Set ``cache`` to a TTLCache to memoize results by arguments. Use it only
+    for pure or slowly changing tools. Set ``timeout`` (seconds) to override
+    AgentConfig.tool_timeout for this tool.
+    """
+
+    cache: Optional[TTLCache] = None
+    timeout: Optional[float] = None
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        cache: Optional[TTLCache] = None,
+        timeout: Optional[float] = None,
+    ):
         self.name = name
         self.description = description
+        if cache is not None:
+            self.cache = cache
+        if timeout is not None:
+            self.timeout = timeout
         self._definition = self._build_definition()
 
     async def execute(self, **kwargs):
         """Execute the tool. Subclasses should override with their own signature."""
         raise NotImplementedError(f"Tool '{self.name}' must implement execute()")
 
+    async def execute_cached(self, **kwargs) -> Any:
+        """Execute the tool, serving repeated arguments from ``cache`` if set."""
+        if self.cache is None:
+            return await self.execute(**kwargs)
+        key = self.cache.make_key(kwargs)
+        hit, result = self.cache.get(key)
+        if hit:
+            return result
+        result = await self.execute(**kwargs)
+        self.cache.set(key, result)
+        return result
+
     def _build_definition(self) -> ToolDefinition:
         parameters = _params_from_sig(inspect.signature(self.execute))
         return ToolDefinition(
@@ -82,14 +122,37 @@ class BaseTool(ABC):
         """Get tool definition"""
         return self._definition
 
+    @property
+    def openai_schema(self) -> Dict[str, Any]:
+        """OpenAI function-calling schema, built once per tool and cached."""
+        schema = self.__dict__.get("_openai_schema")
+        if schema is None:
+            schema = {
+                "type": "function",
+                "function": {
+                    "name": self.name,
+                    "description": self.description,
+                    "parameters": self.definition.to_json_schema(),
+                },
+            }
+            self._openai_schema = schema
+        return schema
+
 
 class Tool(BaseTool):
     """Simple function-based tool"""
 
-    def __init__(self, name: str, description: str, func: Callable):
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        func: Callable,
+        cache: Optional[TTLCache] = None,
+        timeout: Optional[float] = None,
+    ):
         self.func = func
         self._is_async = inspect.iscoroutinefunction(func)
-        super().__init__(name, description)
+        super().__init__(name, description, cache, timeout)
 
     def _build_definition(self) -> ToolDefinition:
         parameters = _params_from_sig(inspect.signature(self.func))
@@ -1,5 +1,17 @@
 """Utility functions and helpers"""
 
 from cyclops.utils.logging import get_logger
+from cyclops.utils.loop import (
+    BackgroundLoop,
+    get_background_loop,
+    run_sync,
+    shutdown_background_loop,
+)
 
-__all__ = ["get_logger"]
+__all__ = [
+    "get_logger",
+    "BackgroundLoop",
+    "get_background_loop",
+    "run_sync",
+    "shutdown_background_loop",
+]
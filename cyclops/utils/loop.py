@@ -0,0 +1,121 @@
+"""Process-wide background event loop for running coroutines from sync code."""
+
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Coroutine, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundLoop:
+    """Keeps one asyncio event loop alive in a daemon thread, started on first use.
+
+    Every coroutine submitted from sync code runs on the same loop, so
+    loop-bound resources (aiohttp sessions, async DB pools) stay valid
+    between calls and no thread or loop is created per call.
+    """
+
+    def __init__(self, name: str = "cyclops-loop") -> None:
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name=self._name, daemon=True
+                )
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def in_loop_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> concurrent.futures.Future:
+        """Schedule a coroutine on the loop and return a concurrent Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+
+    def run(self, coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None):
+        """Run a coroutine on the loop and block until it finishes.
+
+        On timeout the coroutine is cancelled and TimeoutError is raised.
+        """
+        if self.in_loop_thread():
+            # Sync code called from a coroutine already running on this loop
+            # would wait on its own thread forever; use a private loop instead.
+            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+                return pool.submit(asyncio.run, coro).result(timeout)
+        fut = self.submit(coro)
+        try:
+            return fut.result(timeout)
+        except concurrent.futures.TimeoutError:
+            fut.cancel()
+            raise
+
+    def stop(self, timeout: float = 3.0) -> None:
+        """Cancel outstanding tasks, stop the loop and join its thread.
+
+        The loop restarts lazily if used again after stop().
+        """
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or thread is None:
+            return
+
+        async def _drain() -> None:
+            current = asyncio.current_task()
+            tasks = [t for t in asyncio.all_tasks() if t is not current]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await loop.shutdown_asyncgens()
+
+        if thread is not threading.current_thread():
+            try:
+                asyncio.run_coroutine_threadsafe(_drain(), loop).result(timeout)
+            except Exception as e:
+                logger.warning("Error draining background loop: %s", e)
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not threading.current_thread():
+            thread.join(timeout=timeout)
+        if not loop.is_running():
+            loop.close()
+
+
+_default_loop: Optional[BackgroundLoop] = None
+_default_lock = threading.Lock()
+
+
+def get_background_loop() -> BackgroundLoop:
+    """Return the process-wide BackgroundLoop, creating it on first call."""
+    global _default_loop
+    with _default_lock:
+        if _default_loop is None:
+            _default_loop = BackgroundLoop()
+            atexit.register(_default_loop.stop)
+        return _default_loop
+
+
+def run_sync(coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+    """Run a coroutine to completion from sync code on the shared background loop."""
+    return get_background_loop().run(coro, timeout)
+
+
+def shutdown_background_loop(timeout: float = 3.0) -> None:
+    """Stop the process-wide loop if it was started. Safe to call repeatedly."""
+    with _default_lock:
+        loop = _default_loop
+    if loop is not None:
+        loop.stop(timeout)
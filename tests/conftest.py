@@ -0,0 +1,120 @@
+"""Shared fakes for LiteLLM completions and streams."""
+
+import asyncio
+from typing import Any, Iterable, List, Optional
+from unittest.mock import MagicMock
+
+import litellm
+import pytest
+
+
+def completion_response(
+    content: Optional[str] = "ok",
+    tool_calls=None,
+    prompt_tokens: int = 10,
+    completion_tokens: int = 2,
+) -> MagicMock:
+    """Mock non-streamed completion with integer usage."""
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    response.choices[0].message.tool_calls = tool_calls or []
+    response.usage.prompt_tokens = prompt_tokens
+    response.usage.completion_tokens = completion_tokens
+    response.usage.total_tokens = prompt_tokens + completion_tokens
+    return response
+
+
+def model_response(
+    content: str = "ok", model: str = "gpt-4o", usage=None
+) -> litellm.ModelResponse:
+    """Real ModelResponse, for code that serializes or prices it."""
+    return litellm.ModelResponse(
+        choices=[
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }
+        ],
+        model=model,
+        usage=usage or {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7},
+    )
+
+
+def stream_chunk(text: Optional[str]) -> MagicMock:
+    """Mock stream chunk carrying a text delta."""
+    chunk = MagicMock()
+    chunk.choices = [MagicMock()]
+    chunk.choices[0].delta.content = text
+    chunk.choices[0].delta.tool_calls = None
+    return chunk
+
+
+def model_chunks(*texts: str) -> List[Any]:
+    """Real stream chunks, for code that assembles them into a response."""
+    from litellm.types.utils import Delta, ModelResponseStream, StreamingChoices
+
+    return [
+        ModelResponseStream(choices=[StreamingChoices(delta=Delta(content=t))])
+        for t in texts
+    ]
+
+
+class FakeStream:
+    """Sync and async provider stream that records reads and closing.
+
+    Strings become text chunks, exceptions are raised when reached and
+    anything else is yielded as is. ``first_delay`` holds back the first
+    item; ``pause`` precedes every async item.
+    """
+
+    def __init__(
+        self, items: Iterable[Any], pause: float = 0.0, first_delay: float = 0.0
+    ):
+        self.items: List[Any] = list(items)
+        self.pause = pause
+        self.first_delay = first_delay
+        self.reads = 0
+        self.closed = False
+
+    def _next(self) -> Any:
+        if not self.items:
+            raise StopIteration
+        self.reads += 1
+        item = self.items.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return stream_chunk(item) if isinstance(item, str) else item
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self._next()
+
+    def close(self):
+        self.closed = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.first_delay:
+            await asyncio.sleep(self.first_delay)
+            self.first_delay = 0.0
+        if self.pause:
+            await asyncio.sleep(self.pause)
+        try:
+            return self._next()
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_stream():
+    """FakeStream factory: ``fake_stream(["He", "llo"], pause=0.01)``."""
+    return FakeStream
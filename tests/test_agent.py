@@ -6,7 +6,11 @@ import pytest
 from pydantic import BaseModel
 
 from cyclops.core.agent import Agent
+from cyclops.core.pricing import ModelPricing
 from cyclops.core.types import AgentConfig
+from tests.conftest import FakeStream, model_chunks
+
+_PRICING = ModelPricing(input=1e-6, output=2e-6)
 
 
 # ---------------------------------------------------------------------------
@@ -193,6 +197,140 @@ def test_run_with_response_model():
     assert result.confidence == pytest.approx(0.99)
 
 
+def test_run_sends_json_schema_response_format():
+    from cyclops.core.structured import response_format_for
+
+    agent = Agent(config=_make_config("gpt-4o"))
+    response = _make_completion_response('{"answer": "Paris", "confidence": 1}')
+
+    with patch("litellm.completion", return_value=response) as mock_comp:
+        result = agent.run("Capital of France?", response_model=AnswerModel)
+
+    sent = mock_comp.call_args.kwargs["response_format"]
+    assert sent is response_format_for(AnswerModel)
+    assert sent["json_schema"]["schema"]["required"] == ["answer", "confidence"]
+    assert result.answer == "Paris"
+
+
+def test_run_response_model_tolerates_prose_around_json():
+    agent = Agent(config=_make_config())
+    content = 'Sure!\n```json\n{"answer": "Paris", "confidence": 0.5}\n```'
+
+    with patch("litellm.completion", return_value=_make_completion_response(content)):
+        result = agent.run("Capital of France?", response_model=AnswerModel)
+
+    assert result.confidence == pytest.approx(0.5)
+
+
+def test_run_response_model_falls_back_to_tool_extraction():
+    agent = Agent(config=_make_config())
+    extracted = _make_tool_call(
+        "x", "AnswerModel", '{"answer": "Paris", "confidence": 0.9}'
+    )
+    responses = [
+        _make_completion_response("The capital is Paris, I am fairly sure."),
+        _make_completion_response(None, tool_calls=[extracted]),
+    ]
+
+    with patch("litellm.completion", side_effect=responses) as mock_comp:
+        result = agent.run("Capital of France?", response_model=AnswerModel)
+
+    assert "response_format" not in mock_comp.call_args_list[0].kwargs
+    forced = mock_comp.call_args_list[1].kwargs
+    assert forced["tool_choice"]["function"]["name"] == "AnswerModel"
+    assert forced["tools"][0]["function"]["name"] == "AnswerModel"
+    assert result == AnswerModel(answer="Paris", confidence=0.9)
+    assert len(agent.messages) == 2  # the extraction turn is not kept
+
+
+@pytest.mark.parametrize("model", ["gpt-4o", "claude-sonnet-4-20250514"])
+def test_run_response_model_with_tool_loop(model):
+    agent = Agent(config=_make_config(model), tools=[_make_simple_tool()])
+    tool_call = _make_tool_call("tc_1", "add", '{"a": 2, "b": 3}')
+    extracted = _make_tool_call("x", "AnswerModel", '{"answer": "5", "confidence": 1}')
+    responses = [
+        _make_completion_response(None, tool_calls=[tool_call]),
+        _make_completion_response("It is 5."),
+        _make_completion_response(None, tool_calls=[extracted]),
+    ]
+
+    with patch("litellm.completion", side_effect=responses) as mock_comp:
+        result = agent.run("2+3?", response_model=AnswerModel)
+
+    # A schema sent with tools would become a forced tool call on Anthropic.
+    calls = mock_comp.call_args_list
+    assert not any("response_format" in c.kwargs for c in calls)
+    assert calls[1].kwargs["tools"][0]["function"]["name"] == "add"
+    assert calls[2].kwargs["tool_choice"]["function"]["name"] == "AnswerModel"
+    assert result.answer == "5"
+
+
+async def _astream_chunks(text, size):
+    for i in range(0, len(text), size):
+        yield _make_delta_chunk(text[i : i + size])
+
+
+@pytest.mark.asyncio
+async def test_astream_structured_yields_growing_partials():
+    agent = Agent(config=_make_config())
+    text = '{"answer": "Paris", "confidence": 0.75}'
+
+    with patch(
+        "litellm.acompletion", new=AsyncMock(return_value=_astream_chunks(text, 6))
+    ):
+        results = [r async for r in agent.astream_structured("Capital?", AnswerModel)]
+
+    assert results[0].model_fields_set <= {"answer"}
+    assert any(r.model_fields_set == {"answer"} for r in results)
+    assert results[-1] == AnswerModel(answer="Paris", confidence=0.75)
+    assert len(results) > 3
+
+
+def test_structured_stream_reparses_long_answers_sparingly():
+    from cyclops.core import structured
+    from cyclops.core.structured import StructuredStream
+
+    text = '{"answer": "%s", "confidence": 0.5}' % ("x" * 20000)
+    parser = StructuredStream(AnswerModel)
+    with patch.object(structured, "from_json", wraps=structured.from_json) as from_json:
+        partials = [
+            p for i in range(0, len(text), 8) for p in parser.feed(text[i : i + 8])
+        ]
+
+    assert from_json.call_count < 100  # one per delta would be 2,500
+    assert partials[-1].answer.startswith("xxx")
+    assert parser.close() == [AnswerModel(answer="x" * 20000, confidence=0.5)]
+
+
+@pytest.mark.asyncio
+async def test_astream_structured_yields_list_items_as_they_close():
+    from typing import List
+
+    agent = Agent(config=_make_config("gpt-4o"))
+    text = (
+        '{"items": [{"answer": "a", "confidence": 1}, '
+        '{"answer": "b]", "confidence": 0.5}]}'
+    )
+    seen = []
+
+    async def chunks():
+        for i in range(0, len(text), 4):
+            seen.append(i)
+            yield _make_delta_chunk(text[i : i + 4])
+
+    with patch("litellm.acompletion", new=AsyncMock(return_value=chunks())) as mock:
+        stream = agent.astream_structured("Two answers", List[AnswerModel])
+        first = await stream.__anext__()
+        read_at_first = len(seen)
+        rest = [r async for r in stream]
+
+    assert first == AnswerModel(answer="a", confidence=1)
+    assert read_at_first < len(seen)  # yielded before the stream ended
+    assert rest == [AnswerModel(answer="b]", confidence=0.5)]
+    schema = mock.call_args.kwargs["response_format"]["json_schema"]["schema"]
+    assert schema["required"] == ["items"]
+
+
 # ---------------------------------------------------------------------------
 # test_reset
 # ---------------------------------------------------------------------------
@@ -289,7 +427,7 @@ def test_run_with_response_method():
     response = _make_completion_response("Hello!")
 
     with patch("litellm.completion", return_value=response):
-        with patch("litellm.completion_cost", return_value=0.0001):
+        with patch("cyclops.core.agent.get_pricing", return_value=_PRICING):
             agent_response = agent.run_with_response("Hi")
 
     assert agent_response.content == "Hello!"
@@ -297,4 +435,965 @@ def test_run_with_response_method():
     assert agent_response.prompt_tokens == 10
     assert agent_response.completion_tokens == 20
     assert agent_response.tokens_used == 30
+    assert agent_response.cost == pytest.approx(5e-5)  # 10 * 1e-6 + 20 * 2e-6
+
+
+def test_run_with_response_cost_falls_back_to_litellm():
+    agent = Agent(config=_make_config())
+    with patch("litellm.completion", return_value=_make_completion_response("Hi")):
+        with patch("cyclops.core.agent.get_pricing", return_value=None):
+            with patch("litellm.completion_cost", return_value=0.0001):
+                agent_response = agent.run_with_response("Hi")
     assert agent_response.cost == pytest.approx(0.0001)
+
+
+def test_run_with_response_lazy_cost():
+    agent = Agent(config=_make_config(lazy_cost=True))
+    with patch("litellm.completion", return_value=_make_completion_response("Hi")):
+        with patch("cyclops.core.agent.get_pricing", return_value=_PRICING) as lookup:
+            agent_response = agent.run_with_response("Hi")
+            assert lookup.call_count == 0
+            assert agent_response.cost == pytest.approx(5e-5)
+            assert agent_response.cost == pytest.approx(5e-5)
+            assert lookup.call_count == 1
+    assert agent_response.iterations[0].cost == pytest.approx(5e-5)
+
+
+def test_run_with_response_sums_every_iteration():
+    """Usage and cost cover all tool-loop completions, with a per-call breakdown."""
+    agent = Agent(config=_make_config(), tools=[_make_simple_tool()])
+    tool_turn = _make_completion_response(
+        content=None, tool_calls=[_make_tool_call("tc_1", "add", '{"a": 1, "b": 2}')]
+    )
+    responses = [tool_turn, _make_completion_response("3")]
+
+    with patch("litellm.completion", side_effect=responses):
+        with patch("cyclops.core.agent.get_pricing", return_value=_PRICING):
+            agent_response = agent.run_with_response("1 + 2?")
+
+    assert agent_response.tokens_used == 60
+    assert agent_response.prompt_tokens == 20
+    assert agent_response.completion_tokens == 40
+    assert agent_response.cost == pytest.approx(1e-4)
+    assert [it.cost for it in agent_response.iterations] == pytest.approx([5e-5] * 2)
+    assert [it.index for it in agent_response.iterations] == [0, 1]
+    assert all(it.latency >= 0 for it in agent_response.iterations)
+
+
+@pytest.mark.asyncio
+async def test_arun_with_response_counts_naive_mode():
+    agent = Agent(config=_make_config(tool_mode="naive"), tools=[_make_simple_tool()])
+    responses = [
+        _make_completion_response('{"tool": "add", "args": {"a": 1, "b": 2}}'),
+        _make_completion_response("3"),
+    ]
+    with patch("litellm.acompletion", new=AsyncMock(side_effect=responses)):
+        with patch("cyclops.core.agent.get_pricing", return_value=_PRICING):
+            agent_response = await agent.arun_with_response("1 + 2?")
+
+    assert agent_response.content == "3"
+    assert agent_response.tokens_used == 60
+    assert agent_response.cost == pytest.approx(1e-4)
+    assert len(agent_response.iterations) == 2
+
+
+# ---------------------------------------------------------------------------
+# test_run_parallel_tool_calls
+# ---------------------------------------------------------------------------
+
+
+def test_run_parallel_tool_calls_keep_order():
+    """With max_tool_workers > 1, one turn's tool calls overlap but keep order."""
+    import threading
+
+    from cyclops.core.hooks import AgentHooks
+    from cyclops.toolkit.tool import Tool
+
+    barrier = threading.Barrier(3, timeout=5)
+
+    def slow_echo(text: str) -> str:
+        barrier.wait()  # deadlocks unless all three calls run concurrently
+        return text
+
+    class DenyC(AgentHooks):
+        def __init__(self):
+            self.ended = []
+
+        def on_tool_start(self, tool_name, args):
+            return "deny" if args.get("text") == "c" else None
+
+        def on_tool_end(self, tool_name, args, result):
+            self.ended.append((threading.current_thread(), result))
+
+    hooks = DenyC()
+    echo = Tool(name="echo", description="Echo", func=slow_echo)
+    agent = Agent(config=_make_config(max_tool_workers=4, hooks=hooks), tools=[echo])
+
+    calls = [
+        _make_tool_call(f"tc_{t}", "echo", f'{{"text": "{t}"}}')
+        for t in ("a", "b", "c", "d")
+    ]
+    first_response = _make_completion_response(content=None, tool_calls=calls)
+    second_response = _make_completion_response(content="done")
+
+    with patch("litellm.completion", side_effect=[first_response, second_response]):
+        with patch("litellm.completion_cost", return_value=0.0):
+            response = agent.run_with_response("echo things")
+
+    assert [tc.id for tc in response.tool_calls] == ["tc_a", "tc_b", "tc_c", "tc_d"]
+    assert [tc.result for tc in response.tool_calls] == [
+        "a",
+        "b",
+        "[Tool 'echo' was not approved]",
+        "d",
+    ]
+    tool_msgs = [m for m in agent.messages if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in tool_msgs] == ["tc_a", "tc_b", "tc_c", "tc_d"]
+    # Hooks fire on the calling thread only
+    assert {t for t, _ in hooks.ended} == {threading.current_thread()}
+    assert sorted(r for _, r in hooks.ended) == ["a", "b", "d"]
+
+
+# ---------------------------------------------------------------------------
+# test_run_async_tool_shares_loop
+# ---------------------------------------------------------------------------
+
+
+def test_run_async_tool_shares_loop():
+    """Coroutine tools called from run() reuse one event loop across calls."""
+    import asyncio
+
+    from cyclops.toolkit.tool import Tool
+
+    seen_loops = []
+
+    async def where() -> str:
+        seen_loops.append(asyncio.get_running_loop())
+        return "here"
+
+    agent = Agent(
+        config=_make_config(),
+        tools=[Tool(name="where", description="Where", func=where)],
+    )
+    responses = []
+    for i in range(2):
+        tc = _make_tool_call(f"tc_{i}", "where", "{}")
+        responses.append(_make_completion_response(content=None, tool_calls=[tc]))
+        responses.append(_make_completion_response(content="ok"))
+
+    with patch("litellm.completion", side_effect=responses):
+        agent.run("first")
+        agent.run("second")
+
+    assert len(seen_loops) == 2
+    assert seen_loops[0] is seen_loops[1]
+    assert not seen_loops[0].is_closed()
+
+
+# ---------------------------------------------------------------------------
+# test_tools_schema_cache
+# ---------------------------------------------------------------------------
+
+
+def test_tools_schema_shared_and_invalidated_on_change():
+    """Agents with the same tool set share one schema list; changes rebuild it."""
+    add = _make_simple_tool()
+    sub = _make_simple_tool(name="sub", description="Subtract")
+    a = Agent(config=_make_config(), tools=[add])
+    b = Agent(config=_make_config(), tools=[add])
+
+    schema = a._get_tools_schema()
+    assert schema is b._get_tools_schema()
+    assert schema is a._get_tools_schema()
+    assert a._build_tools_prompt() is b._build_tools_prompt()
+
+    a.tools.append(sub)
+    new_schema = a._get_tools_schema()
+    assert new_schema is not schema
+    assert [s["function"]["name"] for s in new_schema] == ["add", "sub"]
+    assert "- sub: Subtract" in a._build_tools_prompt()
+    assert a._tools_by_name["sub"] is sub
+
+
+# ---------------------------------------------------------------------------
+# test_stream_with_tools
+# ---------------------------------------------------------------------------
+
+
+def _make_delta_chunk(content=None, tool_calls=None):
+    delta = MagicMock()
+    delta.content = content
+    delta.tool_calls = tool_calls
+    choice = MagicMock()
+    choice.delta = delta
+    chunk = MagicMock()
+    chunk.choices = [choice]
+    return chunk
+
+
+def _make_tool_call_delta(index, id=None, name=None, arguments=None):
+    fn = MagicMock()
+    fn.name = name
+    fn.arguments = arguments
+    tc = MagicMock()
+    tc.index = index
+    tc.id = id
+    tc.function = fn
+    return tc
+
+
+def _tool_turn_chunks():
+    """A streamed turn with two tool calls whose arguments arrive in pieces."""
+    return [
+        _make_delta_chunk(tool_calls=[_make_tool_call_delta(0, "tc_1", "add", "")]),
+        _make_delta_chunk(tool_calls=[_make_tool_call_delta(0, arguments='{"a": 2,')]),
+        _make_delta_chunk(tool_calls=[_make_tool_call_delta(0, arguments=' "b": 3}')]),
+        _make_delta_chunk(
+            tool_calls=[_make_tool_call_delta(1, "tc_2", "add", '{"a": 1, "b": 1}')]
+        ),
+    ]
+
+
+def test_stream_with_tools_single_pass():
+    """Tool turns are streamed and the final turn is passed through, with no extra call."""
+    agent = Agent(config=_make_config(), tools=[_make_simple_tool()])
+    final = [_make_delta_chunk("Sum"), _make_delta_chunk("s: 5, 2")]
+
+    with patch(
+        "litellm.completion", side_effect=[iter(_tool_turn_chunks()), iter(final)]
+    ) as mock_comp:
+        result = list(agent.stream("Add things"))
+
+    assert result == ["Sum", "s: 5, 2"]
+    assert mock_comp.call_count == 2
+    assert all(c.kwargs["stream"] for c in mock_comp.call_args_list)
+
+    roles = [m["role"] for m in agent.messages]
+    assert roles == ["user", "assistant", "tool", "tool", "assistant"]
+    call_msg = agent.messages[1]
+    assert [tc["function"]["arguments"] for tc in call_msg["tool_calls"]] == [
+        '{"a": 2, "b": 3}',
+        '{"a": 1, "b": 1}',
+    ]
+    assert [m["content"] for m in agent.messages[2:4]] == ["5", "2"]
+    assert agent.messages[-1]["content"] == "Sums: 5, 2"
+
+
+@pytest.mark.asyncio
+async def test_astream_with_tools_single_pass():
+    agent = Agent(config=_make_config(), tools=[_make_simple_tool()])
+
+    async def _aiter(chunks):
+        for c in chunks:
+            yield c
+
+    responses = [_aiter(_tool_turn_chunks()), _aiter([_make_delta_chunk("Done")])]
+    with patch(
+        "litellm.acompletion", new=AsyncMock(side_effect=responses)
+    ) as mock_comp:
+        result = [c async for c in agent.astream("Add things")]
+
+    assert result == ["Done"]
+    assert mock_comp.call_count == 2
+    assert [m["content"] for m in agent.messages if m["role"] == "tool"] == ["5", "2"]
+
+
+# ---------------------------------------------------------------------------
+# test_stream_coalescing
+# ---------------------------------------------------------------------------
+
+
+def test_stream_coalesces_deltas_by_size():
+    agent = Agent(config=_make_config(stream_coalesce_chars=4))
+    chunks = [_make_delta_chunk(c) for c in "abcdefghij"]
+
+    with patch("litellm.completion", return_value=iter(chunks)):
+        result = list(agent.stream("letters"))
+
+    assert result == ["abcd", "efgh", "ij"]
+    assert agent.messages[-1]["content"] == "abcdefghij"
+
+
+@pytest.mark.asyncio
+async def test_astream_flushes_on_interval_while_source_is_quiet():
+    import asyncio
+
+    agent = Agent(
+        config=_make_config(stream_coalesce_chars=64, stream_coalesce_interval=0.02)
+    )
+
+    async def chunks():
+        yield _make_delta_chunk("a")
+        yield _make_delta_chunk("b")
+        await asyncio.sleep(0.2)
+        yield _make_delta_chunk("c")
+
+    with patch("litellm.acompletion", new=AsyncMock(return_value=chunks())):
+        result = [c async for c in agent.astream("hi")]
+
+    assert result == ["ab", "c"]
+
+
+@pytest.mark.asyncio
+async def test_acoalesce_queue_bounds_read_ahead():
+    import asyncio
+
+    from cyclops.core.streaming import acoalesce
+
+    produced = []
+
+    async def deltas():
+        for i in range(100):
+            produced.append(i)
+            yield "x"
+
+    stream = acoalesce(deltas(), max_chars=1, queue_size=4)
+    assert await stream.__anext__() == "x"
+    await asyncio.sleep(0.05)  # a slow consumer
+    assert len(produced) <= 7
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_acoalesce_yields_buffer_before_error():
+    from cyclops.core.streaming import acoalesce
+
+    async def deltas():
+        yield "partial"
+        raise RuntimeError("provider dropped")
+
+    received = []
+    with pytest.raises(RuntimeError, match="dropped"):
+        async for chunk in acoalesce(deltas(), max_chars=64):
+            received.append(chunk)
+    assert received == ["partial"]
+
+
+# ---------------------------------------------------------------------------
+# test_stream_naive
+# ---------------------------------------------------------------------------
+
+
+def test_naive_detector_passes_prose_and_holds_tool_json():
+    from cyclops.core.streaming import NaiveToolCallDetector
+
+    detector = NaiveToolCallDetector()
+    pieces = ["Let me ", 'check.\n```json\n{"to', 'ol": "add", "args": {"a": "}"', "}}"]
+    out = [detector.feed(p) for p in pieces]
+
+    assert out == ["Let me ", "check.\n", "", ""]
+    assert detector.tool_calls == [{"tool": "add", "args": {"a": "}"}}]
+    assert detector.feed("\n```\nignored") == ""
+
+
+def test_naive_detector_releases_non_tool_braces():
+    from cyclops.core.streaming import NaiveToolCallDetector
+
+    detector = NaiveToolCallDetector()
+    out = detector.feed("A set {x} and ") + detector.feed('{"k": 1} done {')
+    assert out + detector.flush() == 'A set {x} and {"k": 1} done {'
+    assert detector.tool_calls is None
+
+
+def test_naive_detector_parses_array_of_calls():
+    from cyclops.core.streaming import NaiveToolCallDetector
+
+    detector = NaiveToolCallDetector()
+    out = detector.feed('See [1]. [ {"tool": "a", "args": {}},') + detector.feed(
+        ' {"tool": "b", "args": {"x": [1]}}] done'
+    )
+    assert out == "See [1]. "
+    assert [c["tool"] for c in detector.tool_calls] == ["a", "b"]
+
+
+def test_naive_tool_calls_carry_json_arguments():
+    from cyclops.core.agent import _naive_tool_calls
+
+    calls = _naive_tool_calls([{"tool": "add", "args": {"a": 1}}, {"tool": "now"}])
+    assert [c.function.arguments for c in calls] == ['{"a": 1}', "{}"]
+
+
+def test_stream_naive_yields_prose_and_stops_at_tool_json():
+    agent = Agent(config=_make_config(tool_mode="naive"), tools=[_make_simple_tool()])
+    first = MagicMock()
+    first.__iter__.return_value = iter(
+        [
+            _make_delta_chunk("Adding "),
+            _make_delta_chunk('now. {"tool": "add", '),
+            _make_delta_chunk('"args": {"a": 2, "b": 3}}'),
+            _make_delta_chunk("never read"),
+        ]
+    )
+    final = [_make_delta_chunk("The sum "), _make_delta_chunk("is 5.")]
+
+    with patch("litellm.completion", side_effect=[first, iter(final)]) as mock_comp:
+        result = list(agent.stream("Add 2 and 3"))
+
+    assert result == ["Adding ", "now. ", "The sum ", "is 5."]
+    assert all(c.kwargs["stream"] for c in mock_comp.call_args_list)
+    first.close.assert_called_once()
+    assert agent.messages[1] == {"role": "assistant", "content": "[Used tool: add]"}
+    assert agent.messages[2] == {"role": "user", "content": "Tool result: 5"}
+    assert agent.messages[-1]["content"] == "The sum is 5."
+
+
+def test_run_naive_executes_array_of_calls_in_one_turn():
+    import threading
+
+    from cyclops.toolkit.tool import Tool
+
+    barrier = threading.Barrier(2, timeout=5)
+
+    def lookup(key: str) -> str:
+        barrier.wait()  # both calls must be in flight at once
+        return key.upper()
+
+    tool = Tool(name="lookup", description="Look up", func=lookup)
+    agent = Agent(
+        config=_make_config(tool_mode="naive", max_tool_workers=2), tools=[tool]
+    )
+    calls = '[{"tool": "lookup", "args": {"key": "a"}}, {"tool": "lookup", "args": {"key": "b"}}]'
+    responses = [_make_completion_response(calls), _make_completion_response("A B")]
+
+    with patch("litellm.completion", side_effect=responses) as mock_comp:
+        result = agent.run("look up a and b")
+
+    assert result == "A B"
+    assert mock_comp.call_count == 2
+    assert agent.messages[1] == {
+        "role": "assistant",
+        "content": "[Used tools: lookup, lookup]",
+    }
+    assert agent.messages[2] == {
+        "role": "user",
+        "content": "Tool results:\n1. lookup: A\n2. lookup: B",
+    }
+
+
+@pytest.mark.asyncio
+async def test_arun_naive_gathers_array_of_calls():
+    import asyncio
+
+    from cyclops.toolkit.tool import Tool
+
+    running = []
+
+    async def slow_add(a: int, b: int) -> int:
+        running.append(a)
+        await asyncio.sleep(0.05)
+        assert len(running) == 2  # the other call started meanwhile
+        return a + b
+
+    tool = Tool(name="add", description="Add", func=slow_add)
+    agent = Agent(config=_make_config(tool_mode="naive"), tools=[tool])
+    calls = '[{"tool": "add", "args": {"a": 1, "b": 2}}, {"tool": "add", "args": {"a": 3, "b": 4}}]'
+    responses = [_make_completion_response(calls), _make_completion_response("3, 7")]
+
+    with patch("litellm.acompletion", new=AsyncMock(side_effect=responses)):
+        result = await agent.arun("add")
+
+    assert result == "3, 7"
+    assert agent.messages[2]["content"] == "Tool results:\n1. add: 3\n2. add: 7"
+
+
+@pytest.mark.asyncio
+async def test_astream_naive_closes_stream_after_tool_json():
+    agent = Agent(config=_make_config(tool_mode="naive"), tools=[_make_simple_tool()])
+    read = []
+
+    async def _aiter(chunks):
+        for c in chunks:
+            read.append(c)
+            yield c
+
+    tool_turn = [
+        _make_delta_chunk('{"tool": "add", "args": {"a": 1, "b": 1}}'),
+        _make_delta_chunk("trailing"),
+    ]
+    responses = [_aiter(tool_turn), _aiter([_make_delta_chunk("Two")])]
+    with patch("litellm.acompletion", new=AsyncMock(side_effect=responses)):
+        result = [c async for c in agent.astream("1+1")]
+
+    assert result == ["Two"]
+    assert len(read) == 2  # the tool turn stopped after its first chunk
+    assert agent.messages[2] == {"role": "user", "content": "Tool result: 2"}
+
+
+def test_stream_naive_closes_provider_stream_behind_cache():
+    from cyclops.core.cache import InMemoryCompletionCache
+
+    agent = Agent(
+        config=_make_config(tool_mode="naive", cache=InMemoryCompletionCache()),
+        tools=[_make_simple_tool()],
+    )
+    tool_turn = FakeStream(
+        model_chunks('{"tool": "add", "args": {"a": 1, "b": 1}}', "trailing")
+    )
+    final = FakeStream(model_chunks("Two"))
+
+    with patch("litellm.completion", side_effect=[tool_turn, final]):
+        assert list(agent.stream("1+1")) == ["Two"]
+
+    assert tool_turn.closed and tool_turn.reads == 1
+
+
+@pytest.mark.asyncio
+async def test_astream_naive_closes_provider_stream_behind_cache():
+    from cyclops.core.cache import InMemoryCompletionCache
+
+    agent = Agent(
+        config=_make_config(tool_mode="naive", cache=InMemoryCompletionCache()),
+        tools=[_make_simple_tool()],
+    )
+    tool_turn = FakeStream(
+        model_chunks('{"tool": "add", "args": {"a": 1, "b": 1}}', "trailing")
+    )
+    final = FakeStream(model_chunks("Two"))
+
+    with patch("litellm.acompletion", new=AsyncMock(side_effect=[tool_turn, final])):
+        assert [c async for c in agent.astream("1+1")] == ["Two"]
+
+    assert tool_turn.closed and tool_turn.reads == 1
+
+
+# ---------------------------------------------------------------------------
+# test_build_messages_does_not_copy
+# ---------------------------------------------------------------------------
+
+
+def test_build_messages_reuses_request_list():
+    """Consecutive requests share one growing list instead of copying history."""
+    tool = _make_simple_tool()
+    agent = Agent(config=_make_config(system_prompt="Be brief."), tools=[tool])
+
+    tc = _make_tool_call("tc_1", "add", '{"a": 2, "b": 3}')
+    responses = [
+        _make_completion_response(content=None, tool_calls=[tc]),
+        _make_completion_response(content="5"),
+    ]
+    sent = []
+
+    def _fake_completion(**kwargs):
+        sent.append((kwargs["messages"], len(kwargs["messages"])))
+        return responses.pop(0)
+
+    with patch("litellm.completion", side_effect=_fake_completion):
+        agent.run("2 + 3?")
+
+    (first, first_len), (second, second_len) = sent
+    assert first is second
+    assert (first_len, second_len) == (2, 4)
+    assert first[0] == {"role": "system", "content": "Be brief."}
+    assert agent.messages == first[1:]
+
+
+# ---------------------------------------------------------------------------
+# test_run_many / test_arun_many
+# ---------------------------------------------------------------------------
+
+
+def _echo_completion(**kwargs):
+    text = kwargs["messages"][-1]["content"]
+    if text == "boom":
+        raise RuntimeError("provider exploded")
+    return _make_completion_response(text.upper())
+
+
+def test_run_many_isolates_items_and_aggregates():
+    agent = Agent(config=_make_config())
+
+    with patch("litellm.completion", side_effect=_echo_completion):
+        with patch("cyclops.core.agent.get_pricing", return_value=_PRICING):
+            batch = agent.run_many(["a", "boom", "c"], max_concurrency=2)
+
+    assert [item.index for item in batch.items] == [0, 1, 2]
+    assert [item.ok for item in batch.items] == [True, False, True]
+    assert batch.items[0].response.content == "A"
+    assert "provider exploded" in batch.items[1].error
+    assert (batch.succeeded, batch.failed) == (2, 1)
+    assert batch.tokens_used == 60
+    assert batch.cost == pytest.approx(1e-4)
+    # Items ran in their own conversations; the parent agent is untouched
+    assert agent.messages == []
+
+
+@pytest.mark.asyncio
+async def test_arun_many_bounds_concurrency_and_streams_items():
+    import asyncio
+
+    agent = Agent(config=_make_config())
+    active = 0
+    peak = 0
+
+    async def _fake(**kwargs):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return _echo_completion(**kwargs)
+
+    with patch("litellm.acompletion", new=AsyncMock(side_effect=_fake)):
+        with patch("litellm.completion_cost", return_value=0.0):
+            batch = agent.arun_many([str(i) for i in range(10)] + ["boom"], 3)
+            seen = [item async for item in batch]
+
+    assert peak == 3
+    assert len(seen) == 11
+    assert batch.response.succeeded == 10
+    assert batch.response.failed == 1
+    assert [i.input for i in batch.response.items][:3] == ["0", "1", "2"]
+    assert all(len(i.response.content) >= 1 for i in batch.response.items if i.ok)
+
+
+# ---------------------------------------------------------------------------
+# test_sessions
+# ---------------------------------------------------------------------------
+
+
+def test_session_get_or_create_and_end():
+    agent = Agent(config=_make_config(), tools=[_make_simple_tool()])
+    s1 = agent.session("alice")
+    assert agent.session("alice") is s1
+    assert s1.id == "alice"
+    assert s1.config is agent.config
+    assert s1.tools is agent.tools
+    assert s1._get_tools_schema() is agent._get_tools_schema()
+
+    anon = agent.session()
+    assert anon.id in agent.sessions
+    assert agent.end_session("alice") is True
+    assert agent.end_session("alice") is False
+    assert agent.session("alice") is not s1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sessions_do_not_interleave():
+    import asyncio
+
+    agent = Agent(config=_make_config())
+
+    async def _fake(**kwargs):
+        text = kwargs["messages"][-1]["content"]
+        await asyncio.sleep(0.01)
+        return _make_completion_response(f"re: {text}")
+
+    sessions = [agent.session(f"user-{i}") for i in range(5)]
+    with patch("litellm.acompletion", new=AsyncMock(side_effect=_fake)):
+        for turn in range(2):
+            await asyncio.gather(*[s.arun(f"{s.id} turn {turn}") for s in sessions])
+
+    for s in sessions:
+        assert [m["content"] for m in s.messages] == [
+            f"{s.id} turn 0",
+            f"re: {s.id} turn 0",
+            f"{s.id} turn 1",
+            f"re: {s.id} turn 1",
+        ]
+    assert agent.messages == []
+
+
+# ---------------------------------------------------------------------------
+# test_tool_result_cache
+# ---------------------------------------------------------------------------
+
+
+def test_cached_tool_runs_once_and_reports_hits():
+    from cyclops.core.hooks import AgentHooks
+    from cyclops.toolkit.cache import TTLCache
+    from cyclops.toolkit.decorators import tool
+
+    calls = []
+
+    @tool(cache=TTLCache(max_size=8))
+    def geocode(city: str) -> str:
+        """Look up coordinates"""
+        calls.append(city)
+        return f"coords of {city}"
+
+    class Recorder(AgentHooks):
+        def __init__(self):
+            self.events = []
+
+        def on_tool_cache_hit(self, tool_name, args, stats):
+            self.events.append(("hit", stats.hit_rate))
+
+        def on_tool_cache_miss(self, tool_name, args, stats):
+            self.events.append(("miss", stats.hit_rate))
+
+    hooks = Recorder()
+    agent = Agent(config=_make_config(hooks=hooks), tools=[geocode])
+    turn = _make_completion_response(
+        content=None,
+        tool_calls=[
+            _make_tool_call("tc_1", "geocode", '{"city": "Oslo"}'),
+            _make_tool_call("tc_2", "geocode", '{ "city":"Oslo" }'),
+        ],
+    )
+    with patch(
+        "litellm.completion",
+        side_effect=[turn, _make_completion_response("done")],
+    ):
+        with patch("litellm.completion_cost", return_value=0.0):
+            response = agent.run_with_response("where is Oslo?")
+
+    assert calls == ["Oslo"]
+    assert [tc.result for tc in response.tool_calls] == ["coords of Oslo"] * 2
+    assert hooks.events == [("miss", 0.0), ("hit", 0.5)]
+
+
+# ---------------------------------------------------------------------------
+# test_tool_timeouts
+# ---------------------------------------------------------------------------
+
+
+def _fast_and_slow_tools(slow_seconds: float, slow_timeout=None, is_async=True):
+    import asyncio
+    import time
+
+    from cyclops.toolkit.tool import Tool
+
+    async def fast_async() -> str:
+        return "fast"
+
+    async def slow_async() -> str:
+        await asyncio.sleep(slow_seconds)
+        return "slow"
+
+    def slow_sync() -> str:
+        time.sleep(slow_seconds)
+        return "slow"
+
+    fast = Tool(name="fast", description="Fast", func=fast_async)
+    slow = Tool(
+        name="slow",
+        description="Slow",
+        func=slow_async if is_async else slow_sync,
+        timeout=slow_timeout,
+    )
+    calls = [
+        _make_tool_call("tc_f", "fast", "{}"),
+        _make_tool_call("tc_s", "slow", "{}"),
+    ]
+    return [fast, slow], calls
+
+
+@pytest.mark.asyncio
+async def test_arun_per_tool_timeout_cancels_straggler():
+    from cyclops.core.hooks import AgentHooks
+    from cyclops.toolkit.tool import ToolTimeoutError
+
+    class Recorder(AgentHooks):
+        errors = []
+
+        def on_tool_error(self, tool_name, args, error):
+            self.errors.append(error)
+
+    hooks = Recorder()
+    tools, calls = _fast_and_slow_tools(5, slow_timeout=0.05)
+    agent = Agent(config=_make_config(hooks=hooks), tools=tools)
+    responses = [
+        _make_completion_response(content=None, tool_calls=calls),
+        _make_completion_response("done"),
+    ]
+    with patch("litellm.acompletion", new=AsyncMock(side_effect=responses)):
+        with patch("litellm.completion_cost", return_value=0.0):
+            response = await agent.arun_with_response("go")
+
+    assert [tc.result for tc in response.tool_calls] == [
+        "fast",
+        "Error executing slow: Tool 'slow' timed out after 0.05s",
+    ]
+    assert isinstance(hooks.errors[0], ToolTimeoutError)
+
+
+@pytest.mark.asyncio
+async def test_arun_iteration_timeout_keeps_finished_results():
+    tools, calls = _fast_and_slow_tools(5)
+    agent = Agent(config=_make_config(tool_iteration_timeout=0.05), tools=tools)
+    responses = [
+        _make_completion_response(content=None, tool_calls=calls),
+        _make_completion_response("done"),
+    ]
+    with patch("litellm.acompletion", new=AsyncMock(side_effect=responses)):
+        with patch("litellm.completion_cost", return_value=0.0):
+            response = await agent.arun_with_response("go")
+
+    assert response.tool_calls[0].result == "fast"
+    assert "timed out" in response.tool_calls[1].result
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limit", ["tool", "iteration"])
+async def test_arun_sync_tool_timeout(limit):
+    import time
+
+    if limit == "tool":
+        tools, calls = _fast_and_slow_tools(2, slow_timeout=0.05, is_async=False)
+        config = _make_config()
+    else:
+        tools, calls = _fast_and_slow_tools(2, is_async=False)
+        config = _make_config(tool_iteration_timeout=0.05)
+    agent = Agent(config=config, tools=tools)
+    responses = [
+        _make_completion_response(content=None, tool_calls=calls),
+        _make_completion_response("done"),
+    ]
+    start = time.monotonic()
+    with patch("litellm.acompletion", new=AsyncMock(side_effect=responses)):
+        with patch("litellm.completion_cost", return_value=0.0):
+            response = await agent.arun_with_response("go")
+
+    assert time.monotonic() - start < 1
+    assert response.tool_calls[0].result == "fast"
+    assert "timed out after 0.05s" in response.tool_calls[1].result
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_run_sync_tool_timeout(workers):
+    import time
+
+    tools, calls = _fast_and_slow_tools(2, is_async=False)
+    agent = Agent(
+        config=_make_config(tool_timeout=0.05, max_tool_workers=workers), tools=tools
+    )
+    responses = [
+        _make_completion_response(content=None, tool_calls=calls),
+        _make_completion_response("done"),
+    ]
+    start = time.monotonic()
+    with patch("litellm.completion", side_effect=responses):
+        with patch("litellm.completion_cost", return_value=0.0):
+            response = agent.run_with_response("go")
+
+    assert time.monotonic() - start < 1
+    assert [tc.result for tc in response.tool_calls] == [
+        "fast",
+        "Error executing slow: Tool 'slow' timed out after 0.05s",
+    ]
+
+
+# ---------------------------------------------------------------------------
+# test_speculative_tools
+# ---------------------------------------------------------------------------
+
+
+def _ping_tool_chunks():
+    """Turn whose first call completes before the stream goes on."""
+    return [
+        _make_delta_chunk(
+            tool_calls=[_make_tool_call_delta(0, "tc_1", "ping", '{"n": 1}')]
+        ),
+        _make_delta_chunk(
+            tool_calls=[_make_tool_call_delta(1, "tc_2", "ping", '{"n": 2}')]
+        ),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_astream_starts_tools_before_turn_ends():
+    import asyncio
+
+    from cyclops.core.hooks import AgentHooks
+    from cyclops.toolkit.tool import Tool
+
+    first_started = asyncio.Event()
+    ran = []
+
+    async def ping(n: int) -> str:
+        ran.append(n)
+        first_started.set()
+        return f"pong {n}"
+
+    class DenySecond(AgentHooks):
+        def on_tool_start(self, tool_name, args):
+            return "deny" if args["n"] == 2 else None
+
+    async def tool_turn():
+        chunks = _ping_tool_chunks()
+        yield chunks[0]
+        # Only reachable if the first call was started mid-stream
+        await asyncio.wait_for(first_started.wait(), 1)
+        yield chunks[1]
+
+    async def final_turn():
+        yield _make_delta_chunk("Done")
+
+    agent = Agent(
+        config=_make_config(speculative_tools=True, hooks=DenySecond()),
+        tools=[Tool(name="ping", description="Ping", func=ping)],
+    )
+    with patch(
+        "litellm.acompletion",
+        new=AsyncMock(side_effect=[tool_turn(), final_turn()]),
+    ):
+        chunks = [c async for c in agent.astream("ping twice")]
+
+    assert "".join(chunks) == "Done"
+    assert ran == [1]
+    tool_msgs = [m["content"] for m in agent.messages if m["role"] == "tool"]
+    assert tool_msgs == ["pong 1", "[Tool 'ping' was not approved]"]
+
+
+@pytest.mark.asyncio
+async def test_astream_cancels_speculative_tools_on_stream_error():
+    import asyncio
+
+    from cyclops.toolkit.tool import Tool
+
+    cancelled = asyncio.Event()
+
+    async def ping(n: int) -> str:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return "pong"
+
+    async def broken_turn():
+        yield _ping_tool_chunks()[0]
+        await asyncio.sleep(0.01)
+        raise RuntimeError("connection reset")
+
+    agent = Agent(
+        config=_make_config(speculative_tools=True),
+        tools=[Tool(name="ping", description="Ping", func=ping)],
+    )
+    with patch("litellm.acompletion", new=AsyncMock(return_value=broken_turn())):
+        with pytest.raises(RuntimeError):
+            async for _ in agent.astream("ping"):
+                pass
+
+    assert cancelled.is_set()
+
+
+def test_stream_starts_tools_before_turn_ends():
+    import threading
+
+    from cyclops.toolkit.tool import Tool
+
+    first_started = threading.Event()
+
+    def ping(n: int) -> str:
+        first_started.set()
+        return f"pong {n}"
+
+    def tool_turn():
+        chunks = _ping_tool_chunks()
+        yield chunks[0]
+        assert first_started.wait(1)
+        yield chunks[1]
+
+    agent = Agent(
+        config=_make_config(speculative_tools=True),
+        tools=[Tool(name="ping", description="Ping", func=ping)],
+    )
+    with patch(
+        "litellm.completion",
+        side_effect=[tool_turn(), iter([_make_delta_chunk("Done")])],
+    ):
+        assert "".join(agent.stream("ping twice")) == "Done"
+
+    tool_msgs = [m["content"] for m in agent.messages if m["role"] == "tool"]
+    assert tool_msgs == ["pong 1", "pong 2"]
@@ -0,0 +1,154 @@
+"""Tests for the completion response cache."""
+
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from cyclops.core.agent import Agent
+from cyclops.core.cache import (
+    InMemoryCompletionCache,
+    SQLiteCompletionCache,
+    completion_cache_key,
+)
+from cyclops.core.hooks import AgentHooks
+from cyclops.core.types import AgentConfig
+from tests.conftest import model_chunks, model_response
+
+
+def _request(content="hi", **params):
+    return {"messages": [{"role": "user", "content": content}], **params}
+
+
+# ---------------------------------------------------------------------------
+# completion_cache_key
+# ---------------------------------------------------------------------------
+
+
+class TestCompletionCacheKey:
+    def test_stable_and_ignores_stream(self):
+        a = completion_cache_key("m", _request(temperature=0))
+        b = completion_cache_key("m", _request(temperature=0, stream=True))
+        assert a == b
+
+    def test_varies_with_model_messages_and_params(self):
+        base = completion_cache_key("m", _request(temperature=0))
+        assert completion_cache_key("n", _request(temperature=0)) != base
+        assert completion_cache_key("m", _request("yo", temperature=0)) != base
+        assert completion_cache_key("m", _request(temperature=1)) != base
+        assert completion_cache_key("m", _request(temperature=0, tools=[{}])) != base
+
+    def test_normalizes_message_extras(self):
+        plain = _request()
+        noisy = {"messages": [{"role": "user", "content": "hi", "name": None}]}
+        assert completion_cache_key("m", plain) == completion_cache_key("m", noisy)
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+
+class TestInMemoryCompletionCache:
+    def test_lru_eviction(self):
+        cache = InMemoryCompletionCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+    def test_ttl_expiry(self):
+        cache = InMemoryCompletionCache(ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_stats(self):
+        cache = InMemoryCompletionCache()
+        cache.get("a")
+        cache.set("a", 1)
+        cache.get("a")
+        assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+        assert cache.stats.hit_rate == 0.5
+
+
+class TestSQLiteCompletionCache:
+    def test_round_trip_across_instances(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        SQLiteCompletionCache(path).set("k", model_response("from disk"))
+        restored = SQLiteCompletionCache(path).get("k")
+        assert restored.choices[0].message.content == "from disk"
+        assert restored.usage.total_tokens == 7
+
+    def test_ttl_expiry(self, tmp_path):
+        cache = SQLiteCompletionCache(str(tmp_path / "cache.db"), ttl=0.01)
+        cache.set("k", model_response("cached answer"))
+        time.sleep(0.02)
+        assert cache.get("k") is None
+
+
+# ---------------------------------------------------------------------------
+# Agent integration
+# ---------------------------------------------------------------------------
+
+
+def _agent(**kwargs):
+    config = AgentConfig(
+        model="gpt-4o", temperature=0, cache=InMemoryCompletionCache(), **kwargs
+    )
+    return Agent(config)
+
+
+def test_run_hits_cache_on_identical_prompt():
+    hooks = MagicMock(spec=AgentHooks)
+    first, second = _agent(hooks=hooks), _agent(hooks=hooks)
+    second.config.cache = first.config.cache
+
+    with patch(
+        "litellm.completion", return_value=model_response("cached answer")
+    ) as mock_comp:
+        with patch("litellm.completion_cost", return_value=0.0):
+            r1 = first.run_with_response("hi")
+            r2 = second.run_with_response("hi")
+
+    mock_comp.assert_called_once()
+    assert r1.content == r2.content == "cached answer"
+    assert (r1.cache_hits, r1.cache_misses) == (0, 1)
+    assert (r2.cache_hits, r2.cache_misses) == (1, 0)
+    hooks.on_cache_miss.assert_called_once()
+    hooks.on_cache_hit.assert_called_once()
+
+
+def test_stream_miss_populates_cache_and_replays():
+    cache = InMemoryCompletionCache()
+    first = Agent(AgentConfig(model="gpt-4o", temperature=0, cache=cache))
+    second = Agent(AgentConfig(model="gpt-4o", temperature=0, cache=cache))
+
+    with patch(
+        "litellm.completion", return_value=iter(model_chunks("Hel", "lo"))
+    ) as mock_comp:
+        assert "".join(first.stream("hi")) == "Hello"
+        assert "".join(second.stream("hi")) == "Hello"
+
+    mock_comp.assert_called_once()
+    assert second.messages[1]["content"] == "Hello"
+
+
+@pytest.mark.asyncio
+async def test_astream_replays_cached_response():
+    agent = _agent()
+    with patch(
+        "litellm.acompletion", new=AsyncMock(return_value=model_response("hey"))
+    ):
+        await agent.arun("hi")
+    agent.reset()
+
+    with patch("litellm.acompletion", new=AsyncMock()) as mock_acomp:
+        chunks = [c async for c in agent.astream("hi")]
+
+    mock_acomp.assert_not_called()
+    assert "".join(chunks) == "hey"
@@ -0,0 +1,145 @@
+"""Tests for token-budgeted context window management."""
+
+from unittest.mock import MagicMock, patch
+
+from cyclops.core.agent import Agent
+from cyclops.core.context import (
+    ContextWindow,
+    DropOldest,
+    KeepToolPairs,
+    SummarizeOlder,
+)
+from cyclops.core.history import ConversationHistory
+from cyclops.core.types import AgentConfig
+from tests.conftest import completion_response
+
+
+def _count(message, model):
+    """One token per character of content keeps the arithmetic obvious."""
+    return len(message.get("content") or "")
+
+
+def _msg(role, content, **extra):
+    return {"role": role, "content": content, **extra}
+
+
+def _history(*messages):
+    return ConversationHistory(messages)
+
+
+def _fit(window, history, system=None):
+    return window.fit(history, history.request_messages(system), None, "m")
+
+
+class TestStrategies:
+    def test_within_budget_is_untouched(self):
+        h = _history(_msg("user", "aaaa"), _msg("assistant", "bbbb"))
+        assert _fit(ContextWindow(100, token_counter=_count), h) == 0
+        assert len(h) == 2
+
+    def test_drop_oldest_evicts_until_fit(self):
+        h = _history(
+            _msg("user", "a" * 10),
+            _msg("assistant", "b" * 10),
+            _msg("user", "c" * 10),
+            _msg("assistant", "d" * 10),
+            _msg("user", "e" * 10),
+        )
+        window = ContextWindow(35, strategy=DropOldest(), token_counter=_count)
+        assert _fit(window, h) == 2
+        assert [m["content"][0] for m in h] == ["c", "d", "e"]
+
+    def test_system_prompt_counts_toward_budget(self):
+        h = _history(_msg("user", "a" * 10), _msg("user", "b" * 10))
+        window = ContextWindow(25, strategy=DropOldest(), token_counter=_count)
+        view = h.request_messages("s" * 10)
+        assert window.fit(h, view, None, "m") == 1
+        assert view == [_msg("system", "s" * 10), _msg("user", "b" * 10)]
+
+    def test_current_turn_is_never_evicted(self):
+        h = _history(
+            _msg("user", "old"),
+            _msg("user", "q" * 50),
+            _msg("assistant", None, tool_calls=[]),
+            _msg("tool", "r" * 50),
+        )
+        window = ContextWindow(10, strategy=DropOldest(), token_counter=_count)
+        assert _fit(window, h) == 1
+        assert h[0]["content"] == "q" * 50
+
+    def test_keep_tool_pairs_skips_orphan_results(self):
+        call = _msg(
+            "assistant",
+            None,
+            tool_calls=[{"id": "1", "function": {"name": "f", "arguments": "{}"}}],
+        )
+        h = _history(
+            _msg("user", "a" * 10),
+            call,
+            _msg("tool", "r" * 10),
+            _msg("tool", "s" * 10),
+            _msg("assistant", "done"),
+            _msg("user", "next"),
+        )
+        window = ContextWindow(25, strategy=KeepToolPairs(), token_counter=_count)
+        assert _fit(window, h) == 4
+        assert [m["role"] for m in h] == ["assistant", "user"]
+
+    def test_summarize_older_replaces_prefix(self):
+        seen = []
+
+        def _summarize(messages):
+            seen.append(messages)
+            return "they talked"
+
+        h = _history(
+            _msg("user", "a" * 10),
+            _msg("assistant", "b" * 10),
+            _msg("user", "c" * 10),
+            _msg("assistant", "d" * 10),
+            _msg("user", "e" * 10),
+        )
+        strategy = SummarizeOlder(fraction=0.5, summarizer=_summarize)
+        window = ContextWindow(45, strategy=strategy, token_counter=_count)
+        assert _fit(window, h) == 2
+        assert [m["content"][0] for m in seen[0]] == ["a", "b"]
+        assert h[0]["role"] == "user"
+        assert h[0]["content"].endswith("they talked")
+        assert [m["content"][0] for m in list(h)[1:]] == ["c", "d", "e"]
+
+    def test_counts_are_memoized_per_message(self):
+        counter = MagicMock(side_effect=_count)
+        h = _history(_msg("user", "a"), _msg("assistant", "b"))
+        window = ContextWindow(100, token_counter=counter)
+        _fit(window, h)
+        h.append(_msg("user", "c"))
+        _fit(window, h)
+        assert counter.call_count == 3
+
+    def test_system_prompt_is_counted_once(self):
+        counter = MagicMock(side_effect=_count)
+        h = _history(_msg("user", "a"))
+        window = ContextWindow(100, token_counter=counter)
+        _fit(window, h, system="be brief")
+        h.append(_msg("assistant", "b"))
+        _fit(window, h, system="be brief")
+        assert counter.call_count == 3
+        _fit(window, h, system="be verbose")
+        assert counter.call_count == 4
+
+
+def test_agent_trims_history_before_completion():
+    window = ContextWindow(15, strategy=DropOldest(), token_counter=_count)
+    agent = Agent(AgentConfig(model="gpt-4o", context_window=window))
+    sent = []
+
+    def _fake(**kwargs):
+        sent.append([m["content"] for m in kwargs["messages"]])
+        return completion_response("r" * 10)
+
+    with patch("litellm.completion", side_effect=_fake):
+        agent.run("a" * 10)
+        agent.run("b" * 10)
+
+    assert sent[1] == ["b" * 10]
+    assert [m["content"] for m in agent.messages] == ["b" * 10, "r" * 10]
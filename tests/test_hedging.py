@@ -0,0 +1,177 @@
+"""Tests for hedged completion requests."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from cyclops.core.agent import Agent
+from cyclops.core.hedging import HedgingPolicy, run_hedged
+from cyclops.core.rate_limit import RateLimiter
+from cyclops.core.types import AgentConfig
+from tests.conftest import FakeStream, completion_response
+
+
+class TestHedgingPolicy:
+    def test_threshold_needs_samples(self):
+        policy = HedgingPolicy(min_samples=20)
+        for latency in range(1, 20):
+            policy.observe("m", float(latency))
+        assert policy.threshold("m") is None
+        policy.observe("m", 20.0)
+        assert policy.threshold("m") == 20.0
+        assert policy.threshold("other") is None
+
+    def test_threshold_tracks_recent_latencies(self):
+        policy = HedgingPolicy(percentile=0.5, min_samples=1, window=4)
+        for latency in (9.0, 9.0, 9.0, 9.0, 1.0, 1.0, 1.0):
+            policy.observe("m", latency)
+        assert policy.threshold("m") == 1.0
+
+    def test_fixed_and_minimum_delay(self):
+        assert HedgingPolicy(delay=0.5).threshold("m") == 0.5
+        policy = HedgingPolicy(min_samples=1, min_delay=0.2)
+        policy.observe("m", 0.01)
+        assert policy.threshold("m") == 0.2
+
+
+class TestRunHedged:
+    async def test_fast_primary_is_not_hedged(self):
+        calls = []
+
+        async def attempt(hedge):
+            calls.append(hedge)
+            return "primary"
+
+        outcome = await run_hedged(attempt, delay=0.05)
+        assert outcome.result == "primary"
+        assert not outcome.hedged
+        assert calls == [False]
+
+    async def test_slow_primary_loses_to_hedge(self):
+        cancelled = []
+
+        async def attempt(hedge):
+            if hedge:
+                return "hedge"
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        outcome = await run_hedged(attempt, delay=0.01)
+        assert outcome.result == "hedge"
+        assert outcome.hedged and outcome.winner == 1
+        assert cancelled == [True]
+        assert outcome.latencies[0] >= 0.01
+
+    async def test_hedge_covers_a_failed_primary(self):
+        async def attempt(hedge):
+            if hedge:
+                await asyncio.sleep(0.02)
+                return "hedge"
+            await asyncio.sleep(0.01)
+            raise RuntimeError("primary failed")
+
+        outcome = await run_hedged(attempt, delay=0.005)
+        assert outcome.result == "hedge"
+
+    async def test_raises_primary_error_when_all_fail(self):
+        async def attempt(hedge):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("hedge failed" if hedge else "primary failed")
+
+        with pytest.raises(RuntimeError, match="primary failed"):
+            await run_hedged(attempt, delay=0.005)
+
+
+class TestAgentHedging:
+    async def test_usage_counts_both_requests(self):
+        agent = Agent(AgentConfig(model="m", hedging=HedgingPolicy(delay=0.01)))
+        calls = []
+
+        async def acompletion(**kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                await asyncio.sleep(10)
+            return completion_response("fast")
+
+        with patch("litellm.acompletion", new=acompletion):
+            with patch("litellm.completion_cost", return_value=0.0):
+                response = await agent.arun_with_response("hi")
+
+        assert response.content == "fast"
+        assert [it.hedge for it in response.iterations] == [True, False]
+        assert response.prompt_tokens == 20
+        assert response.completion_tokens == 2
+
+    async def test_losing_hedge_settles_its_rate_limit_reservation(self):
+        limiter = RateLimiter(tpm=1000)
+        hedging = HedgingPolicy(delay=0.01)
+        agent = Agent(AgentConfig(model="m", hedging=hedging, rate_limiter=limiter))
+        calls = []
+
+        async def acompletion(**kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                await asyncio.sleep(10)
+            return completion_response("fast", prompt_tokens=10, completion_tokens=2)
+
+        with patch("litellm.token_counter", return_value=50):
+            with patch("litellm.acompletion", new=acompletion):
+                with patch("litellm.completion_cost", return_value=0.0):
+                    await agent.arun("hi")
+
+        # 12 for the winner and the cancelled request's 10 prompt tokens,
+        # instead of the hedge's estimate of 50
+        assert limiter._tokens.level == pytest.approx(978, abs=1)
+
+    async def test_hedge_held_by_the_rate_limiter_is_not_billed(self):
+        limiter = RateLimiter(rpm=1)
+        hedging = HedgingPolicy(delay=0.05)
+        agent = Agent(AgentConfig(model="m", hedging=hedging, rate_limiter=limiter))
+        calls = []
+
+        async def acompletion(**kwargs):
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return completion_response("slow")
+
+        with patch("litellm.acompletion", new=acompletion):
+            with patch("litellm.completion_cost", return_value=0.0):
+                response = await agent.arun_with_response("hi")
+
+        assert calls == [1]  # the hedge never got a request slot
+        assert [it.hedge for it in response.iterations] == [False]
+        assert response.tokens_used == 12
+        assert limiter._requests.level == pytest.approx(0.0, abs=0.01)
+
+    async def test_policy_learns_from_requests(self):
+        policy = HedgingPolicy(min_samples=2)
+        agent = Agent(AgentConfig(model="m", hedging=policy))
+
+        async def acompletion(**kwargs):
+            return completion_response()
+
+        with patch("litellm.acompletion", new=acompletion):
+            await agent.arun("a")
+            assert policy.threshold("m") is None
+            await agent.arun("b")
+        assert policy.threshold("m") is not None
+
+    async def test_stream_races_on_first_chunk(self):
+        agent = Agent(AgentConfig(model="m", hedging=HedgingPolicy(delay=0.01)))
+        slow = FakeStream(["slow"], first_delay=10)
+        fast = FakeStream(["fa", "st"])
+        streams = [slow, fast]
+
+        async def acompletion(**kwargs):
+            return streams.pop(0)
+
+        with patch("litellm.acompletion", new=acompletion):
+            deltas = [delta async for delta in agent.astream("hi")]
+
+        assert "".join(deltas) == "fast"
+        assert slow.closed
+        assert fast.closed
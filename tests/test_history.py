@@ -0,0 +1,50 @@
+"""Tests for the ConversationHistory buffer."""
+
+from cyclops.core.history import ConversationHistory
+
+
+def _msg(role, content):
+    return {"role": role, "content": content}
+
+
+class TestConversationHistory:
+    def test_no_system_prompt_returns_backing_list(self):
+        h = ConversationHistory([_msg("user", "hi")])
+        view = h.request_messages()
+        assert view == [_msg("user", "hi")]
+        h.append(_msg("assistant", "hello"))
+        assert h.request_messages() is view
+        assert len(view) == 2
+
+    def test_system_view_is_extended_not_rebuilt(self):
+        h = ConversationHistory()
+        h.append(_msg("user", "a"))
+        view = h.request_messages("sys")
+        assert view == [_msg("system", "sys"), _msg("user", "a")]
+        h.append(_msg("assistant", "b"))
+        assert h.request_messages("sys") is view
+        assert view[-1] == _msg("assistant", "b")
+
+    def test_changing_system_prompt_swaps_first_slot(self):
+        h = ConversationHistory([_msg("user", "a")])
+        view = h.request_messages("one")
+        assert h.request_messages("two") is view
+        assert view[0] == _msg("system", "two")
+        assert h.request_messages(None) == [_msg("user", "a")]
+
+    def test_pop_keeps_views_in_sync(self):
+        h = ConversationHistory([_msg("user", "a"), _msg("assistant", "b")])
+        view = h.request_messages("sys")
+        assert h.pop() == _msg("assistant", "b")
+        assert view == [_msg("system", "sys"), _msg("user", "a")]
+        assert h.pop(0) == _msg("user", "a")
+        assert view == [_msg("system", "sys")]
+
+    def test_sequence_protocol_and_clear(self):
+        h = ConversationHistory([_msg("user", "a"), _msg("assistant", "b")])
+        assert len(h) == 2
+        assert h[-1]["content"] == "b"
+        assert [m["role"] for m in h] == ["user", "assistant"]
+        h.clear()
+        assert not h
+        assert h.request_messages("sys") == [_msg("system", "sys")]
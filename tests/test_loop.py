@@ -0,0 +1,83 @@
+"""Tests for the shared background event loop."""
+
+import asyncio
+import concurrent.futures
+
+import pytest
+
+from cyclops.utils.loop import BackgroundLoop, get_background_loop, run_sync
+
+
+async def _current_loop():
+    return asyncio.get_running_loop()
+
+
+class TestBackgroundLoop:
+    def test_starts_lazily(self):
+        bg = BackgroundLoop()
+        assert not bg.is_running
+        assert bg.run(asyncio.sleep(0, result=7)) == 7
+        assert bg.is_running
+        bg.stop()
+
+    def test_reuses_one_loop_across_calls(self):
+        bg = BackgroundLoop()
+        try:
+            assert bg.run(_current_loop()) is bg.run(_current_loop())
+        finally:
+            bg.stop()
+
+    def test_stop_joins_thread_and_restarts_on_demand(self):
+        bg = BackgroundLoop()
+        first = bg.run(_current_loop())
+        thread = bg._thread
+        bg.stop()
+        assert not thread.is_alive()
+        assert first.is_closed()
+        assert bg.run(_current_loop()) is not first
+        bg.stop()
+
+    def test_stop_cancels_pending_tasks(self):
+        bg = BackgroundLoop()
+        fut = bg.submit(asyncio.sleep(60))
+        bg.stop()
+        assert fut.cancelled()
+
+    def test_timeout_cancels_coroutine(self):
+        bg = BackgroundLoop()
+        cancelled = []
+
+        async def _hang():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        try:
+            with pytest.raises(concurrent.futures.TimeoutError):
+                bg.run(_hang(), timeout=0.05)
+            bg.run(asyncio.sleep(0.05))
+            assert cancelled == [True]
+        finally:
+            bg.stop()
+
+    def test_reentrant_call_from_loop_thread(self):
+        bg = BackgroundLoop()
+
+        async def _outer():
+            return bg.run(asyncio.sleep(0, result="inner"))
+
+        try:
+            assert bg.run(_outer(), timeout=5) == "inner"
+        finally:
+            bg.stop()
+
+    def test_usable_while_caller_loop_is_running(self):
+        async def _main():
+            return run_sync(asyncio.sleep(0, result="ok"))
+
+        assert asyncio.run(_main()) == "ok"
+
+    def test_default_loop_is_shared(self):
+        assert get_background_loop() is get_background_loop()
@@ -3,6 +3,7 @@
 import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import pytest
 
 from cyclops.mcp.bridge import MCPBridge
 from cyclops.mcp.tools import MCPClientTool, _mcp_schema_to_params
@@ -165,16 +166,44 @@ class TestMCPClientTool:
 class TestMCPBridgeUnit:
     """Test MCPBridge sync/async bridging logic without a real MCP server."""
 
-    def test_bridge_starts_background_thread(self):
+    def test_bridges_share_the_background_loop(self):
+        from cyclops.utils.loop import get_background_loop
+
+        async def _loop():
+            return asyncio.get_running_loop()
+
+        first, second = MCPBridge(), MCPBridge()
+        try:
+            assert first._run(_loop()) is second._run(_loop())
+            assert get_background_loop().is_running
+        finally:
+            first.stop()
+            second.stop()
+
+    def test_bridge_stop_leaves_the_shared_loop_running(self):
+        from cyclops.utils.loop import get_background_loop
+
         bridge = MCPBridge()
-        assert bridge._thread.is_alive()
+        with patch("cyclops.mcp.bridge.MCPClient") as MockClass:
+            MockClass.return_value.connect_stdio = AsyncMock()
+            MockClass.return_value.disconnect = AsyncMock()
+            bridge.connect("myserver", ["echo", "hello"])
         bridge.stop()
 
-    def test_bridge_stop_terminates_thread(self):
+        MockClass.return_value.disconnect.assert_awaited_once()
+        assert bridge.connected_names == []
+        assert get_background_loop().is_running
+
+    def test_run_refuses_the_loop_thread(self):
+        from cyclops.utils.loop import run_sync
+
         bridge = MCPBridge()
-        bridge.stop()
-        bridge._thread.join(timeout=2)
-        assert not bridge._thread.is_alive()
+
+        async def _nested():
+            return bridge._run(asyncio.sleep(0))
+
+        with pytest.raises(RuntimeError, match="background loop"):
+            run_sync(_nested())
 
     def test_run_coroutine_returns_value(self):
         bridge = MCPBridge()
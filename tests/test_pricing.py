@@ -0,0 +1,54 @@
+"""Tests for the cached per-model pricing table."""
+
+from unittest.mock import patch
+
+import pytest
+
+from cyclops.core import pricing
+from cyclops.core.pricing import ModelPricing, get_pricing, register_pricing
+
+
+@pytest.fixture(autouse=True)
+def _fresh_table():
+    pricing.clear_pricing_cache()
+    yield
+    pricing.clear_pricing_cache()
+
+
+def test_cost_from_token_counts():
+    p = ModelPricing(input=1e-6, output=4e-6, cache_read=1e-7, cache_creation=2e-6)
+    # 1000 prompt tokens of which 600 read from cache and 100 written to it
+    cost = p.cost(1000, 50, cached_tokens=600, cache_creation_tokens=100)
+    assert cost == pytest.approx(300 * 1e-6 + 600 * 1e-7 + 100 * 2e-6 + 50 * 4e-6)
+
+
+def test_cache_rates_default_to_input_rate():
+    p = ModelPricing(input=1e-6, output=2e-6)
+    assert p.cost(100, 0, cached_tokens=40) == pytest.approx(100 * 1e-6)
+
+
+def test_lookup_resolves_once_per_model():
+    info = {
+        "input_cost_per_token": 2.5e-6,
+        "output_cost_per_token": 1e-5,
+        "cache_read_input_token_cost": 1.25e-6,
+    }
+    with patch("litellm.get_model_info", return_value=info) as lookup:
+        first = get_pricing("gpt-4o")
+        assert get_pricing("gpt-4o") is first
+    assert lookup.call_count == 1
+    assert first.cache_read == 1.25e-6
+    assert first.cache_creation == 2.5e-6
+
+
+def test_unknown_model_is_cached_as_none():
+    with patch("litellm.get_model_info", side_effect=Exception("not mapped")) as lookup:
+        assert get_pricing("my-finetune") is None
+        assert get_pricing("my-finetune") is None
+    assert lookup.call_count == 1
+
+
+def test_registered_pricing_wins():
+    custom = ModelPricing(input=1e-9, output=1e-9)
+    register_pricing("gpt-4o", custom)
+    assert get_pricing("gpt-4o") is custom
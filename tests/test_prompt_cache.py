@@ -0,0 +1,122 @@
+"""Tests for provider prompt-caching breakpoints."""
+
+from unittest.mock import patch
+
+import litellm
+
+from cyclops.core.agent import Agent
+from cyclops.core.prompt_cache import cached_token_counts, mark_messages, mark_tools
+from cyclops.core.types import AgentConfig
+from cyclops.toolkit.tool import Tool
+from tests.conftest import model_response
+
+_EPHEMERAL = {"type": "ephemeral"}
+
+
+# ---------------------------------------------------------------------------
+# mark_messages / mark_tools
+# ---------------------------------------------------------------------------
+
+
+class TestMarkMessages:
+    def test_marks_system_and_newest_message_without_mutating(self):
+        messages = [
+            {"role": "system", "content": "be brief"},
+            {"role": "user", "content": "hi"},
+            {"role": "assistant", "content": "hello"},
+            {"role": "user", "content": "weather?"},
+        ]
+        marked = mark_messages(messages)
+
+        assert marked is not messages
+        assert marked[0]["content"] == [
+            {"type": "text", "text": "be brief", "cache_control": _EPHEMERAL}
+        ]
+        assert marked[3]["content"][0]["cache_control"] == _EPHEMERAL
+        assert marked[1] is messages[1] and marked[2] is messages[2]
+        assert messages[0]["content"] == "be brief"
+
+    def test_skips_messages_without_content(self):
+        messages = [
+            {"role": "user", "content": "add"},
+            {"role": "assistant", "content": None, "tool_calls": [{"id": "t"}]},
+        ]
+        marked = mark_messages(messages)
+        assert marked[1] is messages[1]
+        assert marked[0]["content"][0]["cache_control"] == _EPHEMERAL
+
+    def test_mark_tools_marks_last_tool_only(self):
+        tools = [{"type": "function", "function": {"name": n}} for n in ("a", "b")]
+        marked = mark_tools(tools)
+        assert "cache_control" not in marked[0]
+        assert marked[1]["cache_control"] == _EPHEMERAL
+        assert "cache_control" not in tools[1]
+
+
+class TestCachedTokenCounts:
+    def test_openai_usage(self):
+        usage = litellm.Usage(
+            prompt_tokens=2000,
+            completion_tokens=5,
+            total_tokens=2005,
+            prompt_tokens_details={"cached_tokens": 1536},
+        )
+        assert cached_token_counts(usage) == (1536, None)
+
+    def test_anthropic_usage(self):
+        usage = litellm.Usage(
+            prompt_tokens=2000,
+            completion_tokens=5,
+            total_tokens=2005,
+            cache_read_input_tokens=1800,
+            cache_creation_input_tokens=150,
+        )
+        assert cached_token_counts(usage) == (1800, 150)
+
+
+# ---------------------------------------------------------------------------
+# Agent integration
+# ---------------------------------------------------------------------------
+
+
+def test_agent_sends_breakpoints_and_reports_cached_tokens():
+    def lookup(q: str) -> str:
+        return q
+
+    tool = Tool(name="lookup", description="Look up", func=lookup)
+    agent = Agent(
+        AgentConfig(
+            model="claude-3-5-sonnet", system_prompt="sys", prompt_caching=True
+        ),
+        tools=[tool],
+    )
+    usage = {
+        "prompt_tokens": 1200,
+        "completion_tokens": 3,
+        "total_tokens": 1203,
+        "cache_read_input_tokens": 1024,
+        "cache_creation_input_tokens": 100,
+    }
+    with patch(
+        "litellm.completion",
+        return_value=model_response(model="claude-3-5-sonnet", usage=usage),
+    ) as mock:
+        with patch("litellm.completion_cost", return_value=0.0):
+            response = agent.run_with_response("hi")
+
+    sent = mock.call_args.kwargs
+    assert sent["messages"][0]["content"][0]["cache_control"] == _EPHEMERAL
+    assert sent["messages"][-1]["content"][0]["cache_control"] == _EPHEMERAL
+    assert sent["tools"][-1]["cache_control"] == _EPHEMERAL
+    assert agent.messages[0] == {"role": "user", "content": "hi"}
+    assert response.cached_tokens == 1024
+    assert response.cache_creation_tokens == 100
+
+
+def test_agent_leaves_request_alone_by_default():
+    agent = Agent(AgentConfig(model="gpt-4o", system_prompt="sys"))
+    with patch(
+        "litellm.completion", return_value=model_response(model="claude-3-5-sonnet")
+    ) as mock:
+        agent.run("hi")
+    assert mock.call_args.kwargs["messages"][0]["content"] == "sys"
@@ -0,0 +1,115 @@
+"""Tests for the completion rate limiter."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from cyclops.core.agent import Agent
+from cyclops.core.rate_limit import RateLimiter, shared_rate_limiter
+from cyclops.core.types import AgentConfig
+from tests.conftest import completion_response
+
+
+@pytest.fixture
+def clock():
+    """Freeze the limiter's clock and record sleeps instead of sleeping."""
+    sleeps = []
+    with patch("cyclops.core.rate_limit.time.monotonic", return_value=0.0):
+        with patch("cyclops.core.rate_limit.time.sleep", side_effect=sleeps.append):
+            yield sleeps
+
+
+class TestRateLimiter:
+    def test_requests_queue_in_arrival_order(self, clock):
+        limiter = RateLimiter(rpm=2)
+        for _ in range(4):
+            limiter.acquire()
+        assert clock == [30.0, 60.0]
+
+    def test_settle_refunds_overestimated_tokens(self, clock):
+        limiter = RateLimiter(tpm=600)
+        limiter.acquire(600)
+        limiter.settle(600, 100)
+        limiter.acquire(500)
+        assert clock == []
+        limiter.acquire(100)
+        assert clock == [10.0]
+
+    def test_oversized_request_waits_for_a_full_bucket(self, clock):
+        limiter = RateLimiter(tpm=100)
+        limiter.acquire(10)
+        limiter.acquire(1000)
+        assert clock == [6.0]
+
+    async def test_cancelled_waiter_gives_back_its_slot(self):
+        limiter = RateLimiter(rpm=1)
+        await limiter.aacquire()
+        waiter = asyncio.ensure_future(limiter.aacquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter._requests.level == pytest.approx(0.0, abs=0.01)
+
+    async def test_cancelled_oversized_waiter_gives_back_what_it_took(self):
+        limiter = RateLimiter(tpm=100)
+        await limiter.aacquire(150)
+        waiter = asyncio.ensure_future(limiter.aacquire(150))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter._tokens.level == pytest.approx(0.0, abs=0.1)
+
+    def test_rejects_non_positive_limits(self):
+        with pytest.raises(ValueError):
+            RateLimiter(rpm=0)
+
+    def test_shared_limiter_per_key(self):
+        first = shared_rate_limiter("test-key-a", rpm=10)
+        assert shared_rate_limiter("test-key-a") is first
+        assert shared_rate_limiter("test-key-b", rpm=10) is not first
+
+
+class TestAgentRateLimit:
+    def test_agents_share_a_limiter(self, clock):
+        limiter = RateLimiter(rpm=1)
+        agents = [Agent(AgentConfig(model="m", rate_limiter=limiter)) for _ in range(2)]
+        with patch("litellm.completion", return_value=completion_response()):
+            for agent in agents:
+                agent.run("hi")
+        assert clock == [60.0]
+
+    def test_reported_usage_replaces_estimate(self, clock):
+        limiter = RateLimiter(tpm=1000)
+        agent = Agent(AgentConfig(model="m", max_tokens=200, rate_limiter=limiter))
+        with patch("litellm.token_counter", return_value=50):
+            with patch(
+                "litellm.completion", return_value=completion_response(prompt_tokens=28)
+            ):
+                agent.run("hi")
+        assert limiter._tokens.level == 970
+
+    def test_failed_request_uses_no_tokens(self, clock):
+        limiter = RateLimiter(rpm=10, tpm=1000)
+        agent = Agent(AgentConfig(model="m", rate_limiter=limiter))
+        with patch("litellm.token_counter", return_value=50):
+            with patch("litellm.completion", side_effect=RuntimeError("boom")):
+                with pytest.raises(RuntimeError):
+                    agent.run("hi")
+        assert limiter._tokens.level == 1000
+        assert limiter._requests.level == 9
+
+    async def test_arun_waits_for_the_limiter(self):
+        limiter = RateLimiter(rpm=600)
+        limiter._requests.level = 0.0
+        agent = Agent(AgentConfig(model="m", rate_limiter=limiter))
+
+        async def acompletion(**kwargs):
+            return completion_response()
+
+        with patch("litellm.acompletion", new=acompletion):
+            started = asyncio.get_running_loop().time()
+            assert await agent.arun("hi") == "ok"
+        assert asyncio.get_running_loop().time() - started >= 0.09
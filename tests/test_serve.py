@@ -0,0 +1,168 @@
+"""Tests for the HTTP/SSE serving app, against a fake LiteLLM backend."""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from starlette.requests import Request
+from starlette.testclient import TestClient
+
+from cyclops.core.agent import Agent
+from cyclops.core.types import AgentConfig
+from cyclops.serve import create_app
+from cyclops.serve.cli import main
+from tests.conftest import FakeStream, completion_response
+
+
+def _events(lines):
+    """Parse an SSE body into (event, data) pairs and comment lines."""
+    events, comments, event = [], [], "message"
+    for line in lines:
+        if line.startswith(":"):
+            comments.append(line)
+        elif line.startswith("event: "):
+            event = line[len("event: ") :]
+        elif line.startswith("data: "):
+            events.append((event, json.loads(line[len("data: ") :])))
+            event = "message"
+    return events, comments
+
+
+@pytest.fixture
+def agent():
+    return Agent(AgentConfig(model="gpt-4o-mini"))
+
+
+def test_run_returns_agent_response(agent):
+    client = TestClient(create_app(agent))
+    with patch(
+        "litellm.acompletion", new=AsyncMock(return_value=completion_response("Hi!"))
+    ):
+        with patch("litellm.completion_cost", return_value=0.0):
+            res = client.post("/run", json={"input": "hello"})
+
+    assert res.status_code == 200
+    assert res.json()["content"] == "Hi!"
+    assert res.json()["tokens_used"] == 12
+    assert agent.sessions == []  # throwaway conversation was ended
+
+
+def test_run_with_session_keeps_history(agent):
+    client = TestClient(create_app(agent))
+    responses = [completion_response("one"), completion_response("two")]
+    with patch("litellm.acompletion", new=AsyncMock(side_effect=responses)):
+        with patch("litellm.completion_cost", return_value=0.0):
+            client.post("/run", json={"input": "a", "session_id": "s1"})
+            res = client.post("/run", json={"input": "b", "session_id": "s1"})
+
+    assert res.json()["session_id"] == "s1"
+    assert client.get("/sessions").json() == {"sessions": ["s1"]}
+    messages = client.get("/sessions/s1").json()["messages"]
+    assert [m["content"] for m in messages] == ["a", "one", "b", "two"]
+    assert client.delete("/sessions/s1").status_code == 204
+    assert client.get("/sessions/s1").status_code == 404
+
+
+def test_least_recently_used_sessions_are_ended(agent):
+    client = TestClient(create_app(agent, max_sessions=2))
+    responses = [completion_response(str(i)) for i in range(4)]
+    with patch("litellm.acompletion", new=AsyncMock(side_effect=responses)):
+        with patch("litellm.completion_cost", return_value=0.0):
+            for session_id in ("s1", "s2", "s1", "s3"):
+                client.post("/run", json={"input": "hi", "session_id": session_id})
+
+    assert sorted(agent.sessions) == ["s1", "s3"]
+    assert list(client.app.state.agent_server._session_locks) == ["s1", "s3"]
+
+
+def test_run_rejects_bad_body(agent):
+    client = TestClient(create_app(agent))
+    assert client.post("/run", json={"text": "hi"}).status_code == 400
+    assert client.post("/run", content=b"not json").status_code == 400
+
+
+def test_stream_sends_sse_deltas_and_keepalives(agent):
+    client = TestClient(create_app(agent, keepalive=0.01))
+    stream = FakeStream(["Hel", "lo"], pause=0.05)
+    with patch("litellm.acompletion", new=AsyncMock(return_value=stream)):
+        with client.stream("POST", "/stream", json={"input": "hi"}) as res:
+            assert res.headers["content-type"].startswith("text/event-stream")
+            events, comments = _events(list(res.iter_lines()))
+
+    assert events == [
+        ("message", {"delta": "Hel"}),
+        ("message", {"delta": "lo"}),
+        ("done", {}),
+    ]
+    assert comments and comments[0] == ": keep-alive"
+
+
+def test_stream_reports_errors_as_events(agent):
+    client = TestClient(create_app(agent))
+    with patch(
+        "litellm.acompletion", new=AsyncMock(side_effect=RuntimeError("backend down"))
+    ):
+        with client.stream("POST", "/stream", json={"input": "hi"}) as res:
+            events, _ = _events(list(res.iter_lines()))
+
+    assert events == [("error", {"error": "backend down"})]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded_and_disconnect_cancels(agent):
+    server = create_app(agent, max_concurrency=1).state.agent_server
+    running, cancelled = [], []
+
+    async def slow_completion(**kwargs):
+        running.append(1)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    def request(disconnect: asyncio.Event):
+        body = json.dumps({"input": "hi"}).encode()
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        scope = {"type": "http", "method": "POST", "path": "/run", "headers": []}
+        return Request(scope, receive)
+
+    first_gone, second_gone = asyncio.Event(), asyncio.Event()
+    with patch("litellm.acompletion", new=slow_completion):
+        first = asyncio.ensure_future(server.run(request(first_gone)))
+        second = asyncio.ensure_future(server.run(request(second_gone)))
+        await asyncio.sleep(0.05)
+        assert len(running) == 1  # the second run waits for a slot
+
+        first_gone.set()
+        assert (await first).status_code == 499
+        assert cancelled == [1]
+        await asyncio.sleep(0.05)
+        assert len(running) == 2
+
+        second_gone.set()
+        assert (await second).status_code == 499
+    assert agent.sessions == []
+
+
+def test_cli_serves_agent_from_module_path(monkeypatch):
+    served = {}
+    monkeypatch.setattr(
+        "uvicorn.run", lambda app, **kwargs: served.update(app=app, **kwargs)
+    )
+    main(["serve", "tests.test_serve:_cli_agent", "--port", "9001"])
+
+    assert served["port"] == 9001
+    assert served["app"].state.agent_server.agent.config.model == "cli-model"
+
+
+def _cli_agent():
+    return Agent(AgentConfig(model="cli-model"))
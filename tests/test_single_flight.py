@@ -0,0 +1,153 @@
+"""Tests for single-flight sharing of identical in-flight completions."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from cyclops.core.agent import Agent
+from cyclops.core.single_flight import SingleFlight, is_deterministic
+from cyclops.core.types import AgentConfig
+from tests.conftest import FakeStream, completion_response, stream_chunk
+
+
+@pytest.fixture
+def flights(monkeypatch):
+    flights = SingleFlight()
+    monkeypatch.setattr(Agent, "_single_flight", flights)
+    return flights
+
+
+def test_is_deterministic():
+    assert is_deterministic({"temperature": 0})
+    assert not is_deterministic({"temperature": 0.1})
+    assert not is_deterministic({})
+    assert not is_deterministic({"temperature": 0, "n": 3})
+
+
+class TestSingleFlight:
+    async def test_concurrent_calls_share_one_result(self):
+        flights, calls = SingleFlight(), []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        results = await asyncio.gather(*(flights.call("k", fn) for _ in range(3)))
+        assert results == [("answer", False), ("answer", True), ("answer", True)]
+        assert calls == [1]
+        assert len(flights) == 0
+
+    async def test_call_survives_until_the_last_waiter_leaves(self):
+        flights, cancelled = SingleFlight(), []
+
+        async def fn():
+            try:
+                await asyncio.sleep(0.05)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+            return "answer"
+
+        leader = asyncio.ensure_future(flights.call("k", fn))
+        follower = asyncio.ensure_future(flights.call("k", fn))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await follower == ("answer", True)
+        assert cancelled == []
+
+        lone = asyncio.ensure_future(flights.call("k2", fn))
+        await asyncio.sleep(0)
+        lone.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await lone
+        await asyncio.sleep(0)
+        assert cancelled == [1]
+        assert len(flights) == 0
+
+    async def test_stream_fans_out_from_the_first_chunk(self):
+        chunks = [stream_chunk(text) for text in "abc"]
+        flights, source = SingleFlight(), FakeStream(chunks, pause=0.01)
+
+        async def open_stream():
+            return source
+
+        first, shared_first = await flights.stream("k", open_stream)
+        got = [await first.__anext__()]
+        second, shared_second = await flights.stream("k", open_stream)
+        got += [chunk async for chunk in first]
+
+        assert (shared_first, shared_second) == (False, True)
+        assert got == chunks
+        assert [chunk async for chunk in second] == chunks
+        assert source.reads == 3 and source.closed
+
+    async def test_stream_error_reaches_every_subscriber(self):
+        flights = SingleFlight()
+
+        async def open_stream():
+            return FakeStream(["a", RuntimeError("stream broke")], pause=0.01)
+
+        streams = [(await flights.stream("k", open_stream))[0] for _ in range(2)]
+        for stream in streams:
+            with pytest.raises(RuntimeError, match="stream broke"):
+                [chunk async for chunk in stream]
+
+    async def test_open_error_is_raised_for_the_leader(self):
+        async def open_stream():
+            raise RuntimeError("rejected")
+
+        with pytest.raises(RuntimeError, match="rejected"):
+            await SingleFlight().stream("k", open_stream)
+
+
+class TestAgentSingleFlight:
+    async def test_identical_requests_share_a_call(self, flights):
+        config = AgentConfig(model="m", temperature=0, single_flight=True)
+        calls = []
+
+        async def acompletion(**kwargs):
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return completion_response("shared")
+
+        with patch("litellm.acompletion", new=acompletion):
+            with patch("litellm.completion_cost", return_value=0.0):
+                responses = await asyncio.gather(
+                    Agent(config).arun_with_response("hi"),
+                    Agent(config).arun_with_response("hi"),
+                )
+
+        assert calls == [1]
+        assert [r.content for r in responses] == ["shared", "shared"]
+        assert [r.iterations[0].coalesced for r in responses] == [False, True]
+        assert [r.tokens_used for r in responses] == [12, None]
+
+    async def test_sampled_requests_are_not_shared(self, flights):
+        config = AgentConfig(model="m", temperature=0.7, single_flight=True)
+        calls = []
+
+        async def acompletion(**kwargs):
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return completion_response("sampled")
+
+        with patch("litellm.acompletion", new=acompletion):
+            await asyncio.gather(Agent(config).arun("hi"), Agent(config).arun("hi"))
+        assert calls == [1, 1]
+
+    async def test_streams_fan_out(self, flights):
+        config = AgentConfig(model="m", temperature=0, single_flight=True)
+        sources = []
+
+        async def acompletion(**kwargs):
+            sources.append(FakeStream(["he", "llo"], pause=0.01))
+            return sources[-1]
+
+        async def collect():
+            return "".join([d async for d in Agent(config).astream("hi")])
+
+        with patch("litellm.acompletion", new=acompletion):
+            assert await asyncio.gather(collect(), collect()) == ["hello", "hello"]
+        assert len(sources) == 1 and sources[0].closed
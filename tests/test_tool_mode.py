@@ -0,0 +1,131 @@
+"""Tests for tool-mode detection and the shared mode cache."""
+
+from unittest.mock import patch
+
+import litellm
+import pytest
+
+from cyclops.core.agent import Agent
+from cyclops.core.tool_mode import (
+    ToolModeCache,
+    is_tool_unsupported_error,
+    supports_native_tools,
+)
+from cyclops.core.types import AgentConfig
+from cyclops.toolkit.tool import Tool
+from tests.conftest import completion_response
+
+
+@pytest.fixture
+def mode_cache(tmp_path, monkeypatch):
+    cache = ToolModeCache(str(tmp_path / "modes.db"))
+    monkeypatch.setattr(Agent, "_tool_mode_cache", cache)
+    supports_native_tools.cache_clear()
+    yield cache
+    cache.close()
+    supports_native_tools.cache_clear()
+
+
+def _agent(model="local/llama"):
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    return Agent(
+        AgentConfig(model=model), tools=[Tool(name="add", description="Add", func=add)]
+    )
+
+
+class TestToolUnsupportedError:
+    @pytest.mark.parametrize(
+        "message",
+        [
+            "This model does not support tools",
+            "registry.ollama.ai/library/llama2 does not support tools",
+            "Function calling is not supported for this model.",
+            "tool_choice is not supported",
+            "Unrecognized request argument supplied: tools",
+        ],
+    )
+    def test_matches_tool_rejections(self, message):
+        assert is_tool_unsupported_error(Exception(message))
+
+    @pytest.mark.parametrize(
+        "message",
+        [
+            "Error in function handler: connection reset",
+            "Unsupported image format",
+            "Tool output too large for context window",
+        ],
+    )
+    def test_ignores_unrelated_errors(self, message):
+        assert not is_tool_unsupported_error(Exception(message))
+
+    def test_ignores_non_request_errors(self):
+        error = litellm.RateLimitError(
+            "tools are not supported right now", "openai", "gpt-4o"
+        )
+        assert not is_tool_unsupported_error(error)
+
+
+class TestToolModeCache:
+    def test_shared_through_the_file(self, tmp_path):
+        path = str(tmp_path / "modes.db")
+        writer, reader = ToolModeCache(path), ToolModeCache(path)
+        assert reader.get("m") is None
+        writer.set("m", "naive")
+        assert reader.get("m") == "naive"
+        writer.close()
+        reader.close()
+
+    def test_entries_expire(self, tmp_path):
+        cache = ToolModeCache(str(tmp_path / "modes.db"), ttl=60)
+        with patch("cyclops.core.tool_mode.time.time", return_value=1000.0):
+            cache.set("m", "naive")
+        with patch("cyclops.core.tool_mode.time.time", return_value=1061.0):
+            assert cache.get("m") is None
+        cache.close()
+
+    def test_reads_do_not_create_the_file(self, tmp_path):
+        path = tmp_path / "sub" / "modes.db"
+        assert ToolModeCache(str(path)).get("m") is None
+        assert not path.exists()
+
+
+class TestAgentToolMode:
+    def test_metadata_selects_naive_without_a_failed_request(self, mode_cache):
+        with patch(
+            "litellm.get_model_info", return_value={"supports_function_calling": False}
+        ):
+            with patch(
+                "litellm.completion", return_value=completion_response("hi")
+            ) as mock:
+                _agent().run("hello")
+        assert "tools" not in mock.call_args.kwargs
+
+    def test_learned_naive_mode_is_persisted(self, mode_cache):
+        error = Exception("llama does not support tools")
+        with patch("litellm.get_model_info", side_effect=Exception("not mapped")):
+            with patch(
+                "litellm.completion", side_effect=[error, completion_response("hi")]
+            ):
+                assert _agent().run("hello") == "hi"
+        assert ToolModeCache(mode_cache.path).get("local/llama") == "naive"
+
+    def test_error_does_not_override_metadata(self, mode_cache):
+        error = Exception("tools are not supported")
+        with patch(
+            "litellm.get_model_info", return_value={"supports_function_calling": True}
+        ):
+            with patch(
+                "litellm.completion", side_effect=[error, completion_response("hi")]
+            ):
+                assert _agent().run("hello") == "hi"
+        assert mode_cache.get("local/llama") is None
+
+    def test_unrelated_error_is_raised(self, mode_cache):
+        error = Exception("function handler crashed")
+        with patch("litellm.get_model_info", side_effect=Exception("not mapped")):
+            with patch("litellm.completion", side_effect=error):
+                with pytest.raises(Exception, match="handler crashed"):
+                    _agent().run("hello")
+        assert mode_cache.get("local/llama") is None
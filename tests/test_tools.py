@@ -225,6 +225,17 @@ class TestBaseTool:
         t = SimpleTool(name="simple", description="Simple tool")
         assert t.definition is t._definition
 
+    def test_openai_schema_built_once(self):
+        class SimpleTool(BaseTool):
+            async def execute(self, x: str) -> str:  # type: ignore[override]
+                return x
+
+        t = SimpleTool(name="simple", description="Simple tool")
+        schema = t.openai_schema
+        assert schema["function"]["name"] == "simple"
+        assert schema["function"]["parameters"] == t.definition.to_json_schema()
+        assert t.openai_schema is schema
+
 
 # ---------------------------------------------------------------------------
 # Tool (function-based)
@@ -297,3 +308,80 @@ class TestFunctionTool:
         assert params["b"].type == "boolean"
         assert params["lst"].type == "array"
         assert params["dct"].type == "object"
+
+
+# ---------------------------------------------------------------------------
+# TTLCache
+# ---------------------------------------------------------------------------
+
+
+class TestTTLCache:
+    def test_key_ignores_argument_order(self):
+        from cyclops.toolkit.cache import TTLCache
+
+        cache = TTLCache()
+        assert cache.make_key({"a": 1, "b": [2]}) == cache.make_key({"b": [2], "a": 1})
+
+    def test_lru_eviction(self):
+        from cyclops.toolkit.cache import TTLCache
+
+        cache = TTLCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") == (False, None)
+        assert cache.get("a") == (True, 1)
+        assert len(cache) == 2
+
+    def test_ttl_expiry(self, monkeypatch):
+        from cyclops.toolkit import cache as cache_module
+
+        now = [100.0]
+        monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+        cache = cache_module.TTLCache(ttl=10)
+        cache.set("k", "v")
+        now[0] += 5
+        assert cache.get("k") == (True, "v")
+        now[0] += 6
+        assert cache.get("k") == (False, None)
+        assert cache.stats.hits == 1 and cache.stats.misses == 1
+
+    def test_custom_key(self):
+        from cyclops.toolkit.cache import TTLCache
+
+        cache = TTLCache(key=lambda args: args["city"].lower())
+        assert cache.make_key({"city": "Oslo"}) == cache.make_key({"city": "OSLO"})
+
+    def test_registry_execute_uses_cache(self):
+        from cyclops.toolkit.cache import TTLCache
+        from cyclops.toolkit.registry import ToolRegistry
+
+        calls = []
+
+        def quote(symbol: str) -> float:
+            calls.append(symbol)
+            return 1.5
+
+        registry = ToolRegistry()
+        registry.register_function("quote", "Price", quote, cache=TTLCache())
+        for _ in range(3):
+            assert asyncio.run(registry.execute_tool("quote", symbol="X")) == 1.5
+        assert calls == ["X"]
+
+    def test_errors_are_not_cached(self):
+        from cyclops.toolkit.cache import TTLCache
+
+        attempts = []
+
+        @tool(cache=TTLCache())
+        def flaky(x: int) -> int:
+            attempts.append(x)
+            if len(attempts) == 1:
+                raise RuntimeError("boom")
+            return x
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(flaky.execute_cached(x=1))
+        assert asyncio.run(flaky.execute_cached(x=1)) == 1
+        assert len(attempts) == 2
@@ -35,6 +35,7 @@ export default defineConfig({
             { label: 'Agents', slug: 'guides/agents' },
             { label: 'Tools', slug: 'guides/tools' },
             { label: 'Streaming', slug: 'guides/streaming' },
+            { label: 'Serving over HTTP', slug: 'guides/serving' },
             { label: 'Structured Output', slug: 'guides/structured-output' },
             { label: 'Memory', slug: 'guides/memory' },
             { label: 'MCP', slug: 'guides/mcp' },